@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Sparse Aggregation-Matrix Engine
+================================
+
+Every output column of the demand and supply pipelines is a signed sum of
+SUMIFS terms over the ticker matrix (country totals, Industrial / LDZ /
+Gas-to-Power, supply routes, Total_Supply, and differences such as
+Germany_Industrial = Germany_Total - Germany_GtP).
+
+The engine compiles all output definitions into one tickers × outputs
+coefficient matrix W and evaluates the full history as
+
+    outputs = nan_to_num(values) @ W
+
+i.e. a single pass over the data with Excel's NaN-as-zero SUMIFS semantics.
+W is held as a scipy.sparse CSC matrix when scipy is installed, dense otherwise.
+
+Totals and differences reference earlier outputs (OutputRef) and are added
+after the multiply in their original order, so results match the previous
+column-by-column sums exactly. References flagged if_positive reproduce the
+pipeline rule "add this country only if its series sums to more than zero".
+
+Series that change source over time ("calculated to 30/6/22 then actual")
+are TemporalSwitch columns: each gets a boolean date mask, precomputed from
+the cutoffs declared in its metadata, and all switched columns are blended
+between their actual and calculated values in one np.where before the
+multiply.
+
+The value matrix may be float64 or float32 (compact mode); sums are always
+accumulated in float64 and rounding_bound() bounds the error float32
+storage can introduce in every output.
+"""
+
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sumifs_index import SumifsCriteriaIndex
+
+try:
+    from scipy import sparse
+except ImportError:  # dense fallback
+    sparse = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class SumifsTerm(NamedTuple):
+    """One signed SUMIFS term (subcategory None or '*' = two-criteria match)."""
+    category: str
+    region: str
+    subcategory: Optional[str] = None
+    sign: float = 1.0
+
+
+class OutputRef(NamedTuple):
+    """
+    Signed reference to an earlier output. With if_positive the output is only
+    added when it sums to more than zero over the whole history.
+    """
+    name: str
+    sign: float = 1.0
+    if_positive: bool = False
+
+
+TEMPORAL_METHODS = ('calculated', 'actual')
+
+# Metadata fields that declare a temporal switch (see temporal_declaration)
+TEMPORAL_FIELDS = ('temporal_logic', 'cutoff_date', 'pre_cutoff_method', 'post_cutoff_method',
+                   'cutoff_dates', 'period_methods', 'calculated_terms')
+
+# Largest rounding error compact (float32) mode may introduce at a validation date
+COMPACT_TOLERANCE = 0.01
+
+
+class TemporalSwitch(NamedTuple):
+    """
+    Date-dependent source of one matrix column.
+
+    The cutoffs (ascending) split the history into len(cutoffs) + 1 periods, a
+    cutoff date closing the period before it. methods[i] is 'actual' (the
+    column's own values) or 'calculated' for period i; calculated periods use
+    the signed SUMIFS terms in `calculated`, or the column's own values when
+    no calculation is declared.
+    """
+    column: int
+    cutoffs: Tuple[np.datetime64, ...]
+    methods: Tuple[str, ...]
+    calculated: Tuple[SumifsTerm, ...] = ()
+
+
+class AggregationEngine:
+    """
+    Compiles named outputs into one tickers × outputs coefficient matrix.
+
+    An output is a list of SumifsTerm (compiled into its column of W) and/or
+    OutputRef terms (added after the multiply, in order, from already computed
+    outputs - so totals keep the summation order of the original column sums).
+    """
+
+    def __init__(self, index: SumifsCriteriaIndex, use_sparse: Optional[bool] = None):
+        """
+        Args:
+            index: Criteria index over the columns of the matrix to aggregate
+            use_sparse: Force sparse/dense W (default: sparse when scipy is available)
+        """
+        self.index = index
+        self.use_sparse = (sparse is not None) if use_sparse is None else (use_sparse and sparse is not None)
+        self.definitions: Dict[str, list] = {}
+        self.output_names: List[str] = []
+        self.weights = None
+        self.conditions: Dict[str, bool] = {}
+        self.switches: List[TemporalSwitch] = []
+
+    def define(self, name: str, terms: Sequence):
+        """Add (or replace) an output definition; invalidates the compiled matrix."""
+        for term in terms:
+            if isinstance(term, OutputRef) and term.name not in self.definitions:
+                raise ValueError(f"Output '{name}' references undefined output '{term.name}'")
+        if name not in self.definitions:
+            self.output_names.append(name)
+        self.definitions[name] = list(terms)
+        self.weights = None
+
+    def define_all(self, definitions: Dict[str, Sequence]):
+        """Add several output definitions, keeping their order."""
+        for name, terms in definitions.items():
+            self.define(name, terms)
+
+    def set_temporal_switches(self, switches: Sequence[TemporalSwitch]):
+        """Replace the date-dependent columns (evaluation then needs the row dates)."""
+        for switch in switches:
+            if len(switch.methods) != len(switch.cutoffs) + 1:
+                raise ValueError(f"Column {switch.column}: {len(switch.cutoffs)} cutoffs need "
+                                 f"{len(switch.cutoffs) + 1} methods, got {len(switch.methods)}")
+            unknown = set(switch.methods) - set(TEMPORAL_METHODS)
+            if unknown:
+                raise ValueError(f"Column {switch.column}: unknown temporal methods {sorted(unknown)}")
+            if list(switch.cutoffs) != sorted(switch.cutoffs):
+                raise ValueError(f"Column {switch.column}: cutoffs must be ascending")
+        self.switches = list(switches)
+
+    def temporal_masks(self, dates: np.ndarray) -> np.ndarray:
+        """Boolean (rows × switches) mask, True where a switched column uses its actual values."""
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        masks = np.empty((len(dates), len(self.switches)), dtype=bool)
+        for position, switch in enumerate(self.switches):
+            # Period of every date: number of cutoffs strictly before it
+            periods = np.searchsorted(np.asarray(switch.cutoffs, dtype='datetime64[ns]'), dates, side='left')
+            masks[:, position] = (np.asarray(switch.methods) == 'actual')[periods]
+        return masks
+
+    def _apply_temporal_switches(self, data: np.ndarray, dates: Optional[np.ndarray],
+                                 absolute: bool = False) -> np.ndarray:
+        """
+        Blend every switched column between its actual and calculated values
+        (in place). With absolute=True `data` holds |values| and calculated
+        components become error magnitudes (|terms|, rounded once more when
+        stored back into a float32 matrix) for rounding_bound().
+        """
+        if dates is None:
+            raise ValueError("Temporal switches need the row dates (pass dates=)")
+        if len(dates) != len(data):
+            raise ValueError(f"{len(dates)} dates for {len(data)} rows")
+
+        columns = [switch.column for switch in self.switches]
+        actual = data[:, columns]
+        # Calculated components from the unswitched inputs, accumulated in float64
+        calculated = actual.astype(np.float64)
+        for position, switch in enumerate(self.switches):
+            if switch.calculated:
+                calculated[:, position] = 0.0
+                for term in switch.calculated:
+                    positions = self.index.positions(term.category, term.region, term.subcategory)
+                    sign = abs(term.sign) if absolute else term.sign
+                    calculated[:, position] += sign * np.add.reduce(data[:, positions], axis=1, dtype=np.float64)
+                if absolute:
+                    calculated[:, position] *= 2.0
+
+        data[:, columns] = np.where(self.temporal_masks(dates), actual, calculated)
+        return data
+
+    def compile(self):
+        """Build the tickers × outputs coefficient matrix from the SUMIFS terms."""
+        rows, cols, coefficients = [], [], []
+
+        for out_col, name in enumerate(self.output_names):
+            for term in self.definitions[name]:
+                if not isinstance(term, SumifsTerm):
+                    continue
+                positions = self.index.positions(term.category, term.region, term.subcategory)
+                rows.extend(positions.tolist())
+                cols.extend([out_col] * len(positions))
+                coefficients.extend([term.sign] * len(positions))
+
+        shape = (self.index.n_columns, len(self.output_names))
+        if self.use_sparse:
+            # Duplicate (row, col) entries are summed, as repeated terms should be
+            self.weights = sparse.csc_matrix((coefficients, (rows, cols)), shape=shape, dtype=np.float64)
+        else:
+            self.weights = np.zeros(shape, dtype=np.float64)
+            np.add.at(self.weights, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+                      np.asarray(coefficients, dtype=np.float64))
+
+        logger.debug(f"Compiled aggregation matrix {shape} with {len(coefficients)} coefficients")
+        return self.weights
+
+    def evaluate(self, values: np.ndarray, prefix: Optional[np.ndarray] = None,
+                 only: Optional[Sequence[str]] = None, base: Optional[np.ndarray] = None,
+                 dates: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        All outputs for every row of `values` in one multiply.
+
+        Args:
+            values: Data rows (rows × indexed columns)
+            prefix: Outputs already computed for the rows preceding `values`
+                (tail evaluation); if_positive references are then decided on
+                the sum over prefix and tail rows, as a full evaluation would
+            only: Recompute just these outputs (see affected_outputs); the
+                others are copied from `base`
+            base: Previous outputs for the same rows (required with `only`)
+            dates: Date of every row of `values` (required with temporal switches)
+
+        Returns:
+            float64 array (rows × outputs) in definition order. The decision
+            taken for each recomputed if_positive reference is left in
+            self.conditions.
+        """
+        if self.weights is None:
+            self.compile()
+
+        if only is None:
+            out_cols = list(range(len(self.output_names)))
+            outputs = np.zeros((len(values), len(self.output_names)), dtype=np.float64, order='F')
+        else:
+            selected = set(only)
+            out_cols = [i for i, name in enumerate(self.output_names) if name in selected]
+            outputs = np.array(base, dtype=np.float64, order='F')
+
+        data = np.nan_to_num(self._as_matrix(values), nan=0.0)
+        if self.switches:
+            data = self._apply_temporal_switches(data, dates)
+        if self.use_sparse:
+            # (W^T X^T)^T keeps the sparse operand on the left
+            outputs[:, out_cols] = (self.weights[:, out_cols].T @ data.T).T
+        else:
+            for out_col in out_cols:
+                outputs[:, out_col] = self._evaluate_dense_column(data, out_col)
+
+        # Output references, in definition order (outputs only reference earlier ones)
+        position = {name: i for i, name in enumerate(self.output_names)}
+        self.conditions = {}
+        for out_col in out_cols:
+            name = self.output_names[out_col]
+            for term in self.definitions[name]:
+                if not isinstance(term, OutputRef):
+                    continue
+                component = outputs[:, position[term.name]]
+                if term.if_positive:
+                    history = component if prefix is None else np.concatenate([prefix[:, position[term.name]], component])
+                    positive = bool(history.sum() > 0)
+                    self.conditions[f'{name}:{term.name}'] = positive
+                    if not positive:
+                        continue
+                outputs[:, out_col] += term.sign * component
+
+        return outputs
+
+    def _evaluate_dense_column(self, data: np.ndarray, out_col: int) -> np.ndarray:
+        """
+        Column out_col of data @ W, summed over the non-zero rows of W.
+
+        Columns are added strictly left to right. Unlike a BLAS matmul or a
+        row-wise reduce (whose summation order changes with the number of
+        rows), each row's result is independent of how many rows are evaluated
+        together, so a tail evaluation matches the full-history one bit for bit.
+        """
+        result = np.zeros(data.shape[0], dtype=np.float64)
+        positions = np.flatnonzero(self.weights[:, out_col])
+        for position in positions:
+            coefficient = self.weights[position, out_col]
+            if coefficient == 1.0:
+                result += data[:, position]
+            else:
+                result += coefficient * np.asarray(data[:, position], dtype=np.float64)
+        return result
+
+    @staticmethod
+    def _as_matrix(values: np.ndarray) -> np.ndarray:
+        """float32 matrices are kept as they are (compact mode), anything else becomes float64."""
+        values = np.asarray(values)
+        if values.dtype == np.float32:
+            return values
+        return np.asarray(values, dtype=np.float64)
+
+    def rounding_bound(self, values: np.ndarray, dates: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Upper bound on |evaluate(values) - exact| for every row and output
+        when `values` holds float32-rounded inputs.
+
+        Each stored value is off by at most 2**-24 of its magnitude and sums
+        are accumulated in float64, so an output can be off by at most
+        (2**-24 + float64 rounding) times the same aggregation over |values|
+        with |coefficients|; references add the bounds of the outputs they use.
+        """
+        if self.weights is None:
+            self.compile()
+
+        data = np.abs(np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0))
+        if self.switches:
+            data = self._apply_temporal_switches(data, dates, absolute=True)
+
+        abs_weights = abs(self.weights)
+        if self.use_sparse:
+            magnitude = np.array((abs_weights.T @ data.T).T, dtype=np.float64, order='F')
+        else:
+            magnitude = np.asfortranarray(data @ abs_weights)
+
+        position = {name: i for i, name in enumerate(self.output_names)}
+        for out_col, name in enumerate(self.output_names):
+            for term in self.definitions[name]:
+                if isinstance(term, OutputRef):
+                    magnitude[:, out_col] += abs(term.sign) * magnitude[:, position[term.name]]
+
+        unit = float(np.finfo(np.float32).eps) / 2
+        relative = unit / (1 - unit) + (self.index.n_columns + len(self.output_names)) * float(np.finfo(np.float64).eps)
+        return magnitude * relative
+
+    def output_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Matrix columns each output depends on, directly, through the outputs
+        it references or through the calculation of a switched column.
+        """
+        if self.weights is None:
+            self.compile()
+
+        sources = {
+            switch.column: [self.index.positions(term.category, term.region, term.subcategory)
+                             for term in switch.calculated]
+            for switch in self.switches
+        }
+        columns: Dict[str, np.ndarray] = {}
+        for out_col, name in enumerate(self.output_names):
+            weights = self.weights[:, out_col]
+            direct = np.asarray(weights.nonzero()[0] if self.use_sparse else np.flatnonzero(weights), dtype=np.int64)
+            parts = [direct]
+            for position in direct.tolist():
+                parts.extend(sources.get(position, []))
+            parts.extend(columns[term.name] for term in self.definitions[name] if isinstance(term, OutputRef))
+            columns[name] = np.unique(np.concatenate(parts))
+        return columns
+
+    def reverse_dependencies(self) -> Dict[int, List[str]]:
+        """{matrix column: outputs that reference it} - the ticker -> outputs map."""
+        reverse: Dict[int, List[str]] = {}
+        for name, positions in self.output_columns().items():
+            for position in positions.tolist():
+                reverse.setdefault(position, []).append(name)
+        return reverse
+
+    def affected_outputs(self, changed_columns: Sequence[int]) -> List[str]:
+        """Outputs (in definition order) whose inputs include any of the changed columns."""
+        changed = np.asarray(list(changed_columns), dtype=np.int64)
+        return [name for name, positions in self.output_columns().items()
+                if len(np.intersect1d(positions, changed, assume_unique=False))]
+
+    def switched_outputs(self) -> List[str]:
+        """Outputs (in definition order) that depend on a switched column, i.e. on the row dates."""
+        return self.affected_outputs([switch.column for switch in self.switches])
+
+    def evaluate_frame(self, values: np.ndarray, index: pd.Index,
+                       prefix: Optional[np.ndarray] = None, dates: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """All outputs as a DataFrame on `index`."""
+        return pd.DataFrame(self.evaluate(values, prefix, dates=dates), index=index, columns=self.output_names)
+
+
+def temporal_declaration(info: Dict) -> Optional[tuple]:
+    """
+    (cutoffs, methods, calculated terms) declared in a column's metadata, or
+    None for a column without date-dependent logic.
+
+    Any number of cutoffs: 'cutoff_dates' with one 'period_methods' entry per
+    period. A single switch: 'cutoff_date' with 'pre_cutoff_method' and
+    'post_cutoff_method' (as tagged by the category reshuffler).
+    'calculated_terms' holds (category, region, subcategory, sign) tuples.
+    """
+    if not info.get('temporal_logic'):
+        return None
+    if info.get('cutoff_dates'):
+        cutoffs = tuple(info['cutoff_dates'])
+        methods = tuple(info.get('period_methods', ()))
+    else:
+        cutoffs = (info['cutoff_date'],)
+        methods = (info.get('pre_cutoff_method', 'calculated'), info.get('post_cutoff_method', 'actual'))
+    calculated = tuple(SumifsTerm(*term) for term in info.get('calculated_terms', ()))
+    return cutoffs, methods, calculated
+
+
+def temporal_switches(metadata: Dict, columns: Sequence) -> List[TemporalSwitch]:
+    """TemporalSwitch for every indexed column whose metadata declares temporal logic."""
+    switches = []
+    for position, col in enumerate(columns):
+        declaration = temporal_declaration(metadata.get(col, {}))
+        if declaration is None:
+            continue
+        cutoffs, methods, calculated = declaration
+        switches.append(TemporalSwitch(
+            position,
+            tuple(np.datetime64(pd.Timestamp(cutoff), 'ns') for cutoff in cutoffs),
+            methods,
+            calculated
+        ))
+    return switches
+
+
+def demand_output_definitions() -> Dict[str, list]:
+    """
+    Output definitions of RestoredDemandPipeline (same criteria and summation
+    order as the original per-column SUMIFS calls).
+    """
+    T, R = SumifsTerm, OutputRef
+    definitions: Dict[str, list] = {}
+
+    # Industrial (columns C:L of the Industrial sheet)
+    definitions.update({
+        'France_Industrial': [T('Demand', 'France', 'Industrial')],
+        'Belgium_Industrial': [T('Demand', 'Belgium', 'Industrial')],
+        'Italy_Industrial': [T('Demand', 'Italy', 'Industrial')],
+        'GB_Industrial': [T('Demand', 'GB', 'Industrial')],
+        'Netherlands_IndPower': [T('Demand', 'Netherlands', 'Industrial and Power')],
+        'Netherlands_Zebra': [T('Demand', 'Netherlands', 'Zebra')],
+        'Germany_Total': [T('Demand', 'Germany', 'Industrial and Power')],
+        'Germany_GtP': [T('Intermediate Calculation', '#Germany', 'Gas-to-Power')],
+    })
+    definitions['Germany_Industrial'] = [R('Germany_Total'), R('Germany_GtP', sign=-1.0)]
+    definitions['Total_Industrial_Demand'] = [
+        R(name) for name in ['France_Industrial', 'Belgium_Industrial', 'Italy_Industrial', 'GB_Industrial',
+                             'Netherlands_IndPower', 'Netherlands_Zebra', 'Germany_Industrial']
+    ]
+
+    # Gas-to-Power: countries only if non-zero, Netherlands excluded from the total
+    gtp_countries = ['France', 'Belgium', 'Italy', 'GB']
+    for country in gtp_countries:
+        definitions[f'{country}_GtP'] = [T('Demand', country, 'Gas-to-Power')]
+    definitions['Total_Gas_to_Power_Demand'] = (
+        [R(f'{country}_GtP', if_positive=True) for country in gtp_countries] + [R('Germany_GtP')]
+    )
+
+    # LDZ: standard countries and special cases only if non-zero
+    ldz_components = [(country, 'LDZ') for country in ['France', 'Belgium', 'Italy', 'Netherlands', 'GB', 'Germany']]
+    special_cases = [(country, country) for country in ['Austria', 'Switzerland', 'Luxembourg']]
+    for country, subcategory in ldz_components + special_cases:
+        definitions[f'{country}_LDZ'] = [T('Demand', country, subcategory)]
+    definitions['Italy_Other'] = [T('Demand', 'Italy', 'Other')]
+    definitions['Ireland_LDZ'] = [T('Demand (Net)', 'Island of Ireland', 'Island of Ireland')]
+    definitions['Total_LDZ_Demand'] = (
+        [R(f'{country}_LDZ', if_positive=True) for country, _ in ldz_components]
+        + [R('Italy_Other')]
+        + [R(f'{country}_LDZ', if_positive=True) for country, _ in special_cases]
+        + [R('Ireland_LDZ')]
+    )
+
+    # Country totals (two-criteria SUMIFS)
+    countries = ['France', 'Belgium', 'Italy', 'Netherlands', 'GB',
+                 'Austria', 'Germany', 'Switzerland', 'Luxembourg']
+    for country in countries:
+        definitions[country] = [T('Demand', country)]
+    definitions['Ireland'] = [T('Demand (Net)', 'Island of Ireland')]
+    definitions['Total'] = [R(country) for country in countries + ['Ireland']]
+
+    return definitions
+
+
+# (output, category, region, subcategory) for the 18 LiveSheet supply routes
+SUPPLY_ROUTES = [
+    ('Slovakia_Austria', 'Import', 'Slovakia', 'Austria'),
+    ('Russia_NordStream_Germany', 'Import', 'Russia (Nord Stream)', 'Germany'),
+    ('Norway_Europe', 'Import', 'Norway', 'Europe'),
+    ('Netherlands_Production', 'Production', 'Netherlands', 'Netherlands'),
+    ('GB_Production', 'Production', 'GB', 'GB'),
+    ('LNG_Total', 'Import', 'LNG', '*'),
+    ('Algeria_Italy', 'Import', 'Algeria', 'Italy'),
+    ('Libya_Italy', 'Import', 'Libya', 'Italy'),
+    ('Spain_France', 'Import', 'Spain', 'France'),
+    ('Denmark_Germany', 'Import', 'Denmark', 'Germany'),
+    ('Czech_Poland_Germany', 'Import', 'Czech and Poland', 'Germany'),
+    ('Austria_Hungary_Export', 'Export', 'Austria', 'Hungary'),
+    ('Slovenia_Austria', 'Import', 'Slovenia', 'Austria'),
+    ('MAB_Austria', 'Import', 'MAB', 'Austria'),
+    ('TAP_Italy', 'Import', 'TAP', 'Italy'),
+    ('Austria_Production', 'Production', 'Austria', 'Austria'),
+    ('Italy_Production', 'Production', 'Italy', 'Italy'),
+    ('Germany_Production', 'Production', 'Germany', 'Germany')
+]
+
+
+def supply_output_definitions(supply_routes: Sequence[tuple] = SUPPLY_ROUTES,
+                              include_total: bool = True) -> Dict[str, list]:
+    """Output definitions for the supply routes (and Total_Supply = sum of all routes)."""
+    definitions = {
+        name: [SumifsTerm(category, region, subcategory)]
+        for name, category, region, subcategory in supply_routes
+    }
+    if include_total:
+        definitions['Total_Supply'] = [OutputRef(name) for name, _, _, _ in supply_routes]
+    return definitions
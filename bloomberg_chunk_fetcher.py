@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Concurrent Chunked Bloomberg Fetcher
+====================================
+
+Runs chunked xbbg.bdh requests through a bounded thread pool instead of one
+chunk after another with a fixed sleep. Request rate is enforced by a
+token bucket shared across workers, and chunk results are assembled in ticker
+order regardless of completion order.
+
+With a checkpoint directory, every finished chunk is written to disk under a
+key for its date range, fields and tickers. A restart with the same date range
+loads completed chunks instead of re-requesting them, so a download that fails
+late resumes with only the missing chunks.
+
+fetch_partial() and fetch_plan() isolate failures per chunk: each request has
+a timeout, a circuit breaker stops issuing requests after repeated consecutive
+failures, and the caller gets the chunks that succeeded plus the tickers that
+did not.
+
+The bdh callable is injectable, so the fetcher can be benchmarked against a
+local stand-in that injects latency (see create_sample_bloomberg_data.SimulatedBdh):
+
+    python bloomberg_chunk_fetcher.py
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ticker_history_store import ticker_column_name
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; each
+    request takes one token and blocks until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+
+                wait = (1.0 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised for chunks skipped because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+
+    Opens after `failure_threshold` failures in a row; any success resets the count.
+    """
+
+    def __init__(self, failure_threshold: int = 3):
+        self.failure_threshold = max(1, failure_threshold)
+        self.consecutive_failures = 0
+        self.lock = threading.Lock()
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return self.consecutive_failures >= self.failure_threshold
+
+
+def resolve_xbbg_bdh() -> Callable:
+    """Return xbbg.bdh (raises ImportError when xbbg is not installed)."""
+    import xbbg
+    return xbbg.bdh
+
+
+class ChunkedBloombergFetcher:
+    """
+    Fetch Bloomberg history in ticker chunks on a bounded thread pool.
+    """
+
+    def __init__(self, bdh: Optional[Callable] = None, chunk_size: int = 50,
+                 max_workers: int = 4, requests_per_second: float = 1.0, burst: int = 1,
+                 fields: Optional[List[str]] = None, checkpoint_dir: Optional[str] = None,
+                 clear_checkpoints: bool = True, chunk_timeout: Optional[float] = 300.0,
+                 failure_threshold: int = 3):
+        """
+        Args:
+            bdh: xbbg.bdh-compatible callable (default: resolved from xbbg on first use)
+            chunk_size: Tickers per request
+            max_workers: Concurrent requests in flight
+            requests_per_second: Token bucket refill rate
+            burst: Token bucket capacity (requests allowed back-to-back)
+            fields: Bloomberg fields (default PX_LAST)
+            checkpoint_dir: Directory for finished-chunk checkpoints (None disables)
+            clear_checkpoints: Remove the checkpoints once every chunk of a fetch succeeded
+            chunk_timeout: Seconds a single request may take before its chunk counts as failed
+            failure_threshold: Consecutive chunk failures that open the circuit breaker
+        """
+        self.bdh = bdh
+        self.chunk_size = chunk_size
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self.fields = fields or ['PX_LAST']
+        self.checkpoint_dir = checkpoint_dir
+        self.clear_checkpoints = clear_checkpoints
+        self.chunk_timeout = chunk_timeout
+        self.failure_threshold = failure_threshold
+
+    def make_chunks(self, tickers: List[str]) -> List[List[str]]:
+        """Split tickers into request chunks, preserving order."""
+        return [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+
+    def run_dir(self, start_date: str, end_date: str) -> Optional[str]:
+        """Checkpoint directory for one date range and field set."""
+        if self.checkpoint_dir is None:
+            return None
+        key = json.dumps([str(start_date), str(end_date), self.fields])
+        return os.path.join(
+            self.checkpoint_dir,
+            f"{start_date}_{end_date}_{hashlib.sha256(key.encode()).hexdigest()[:12]}"
+        )
+
+    def chunk_path(self, run_dir: str, chunk_tickers: List[str]) -> str:
+        """Checkpoint file for a chunk, keyed by its tickers."""
+        digest = hashlib.sha256('\n'.join(chunk_tickers).encode()).hexdigest()[:16]
+        return os.path.join(run_dir, f"chunk_{digest}.pkl")
+
+    def load_checkpoint(self, run_dir: Optional[str], chunk_tickers: List[str]) -> Optional[pd.DataFrame]:
+        """Return a completed chunk from disk, or None."""
+        if run_dir is None:
+            return None
+        path = self.chunk_path(run_dir, chunk_tickers)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def save_checkpoint(self, run_dir: Optional[str], chunk_tickers: List[str], chunk_data: pd.DataFrame):
+        """Write a finished chunk atomically."""
+        if run_dir is None:
+            return
+        os.makedirs(run_dir, exist_ok=True)
+        path = self.chunk_path(run_dir, chunk_tickers)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        chunk_data.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def fetch_chunk(self, chunk_idx: int, n_chunks: int, chunk_tickers: List[str],
+                    start_date: str, end_date: str, run_dir: Optional[str] = None,
+                    breaker: Optional[CircuitBreaker] = None,
+                    started: Optional[Dict[int, float]] = None) -> pd.DataFrame:
+        """Fetch one chunk (rate limited), checkpoint it and order its columns as requested."""
+        if breaker is not None and breaker.is_open():
+            raise CircuitOpenError("circuit breaker open")
+
+        self.rate_limiter.acquire()
+
+        if breaker is not None and breaker.is_open():
+            raise CircuitOpenError("circuit breaker open")
+
+        logger.info(f"⏬ Downloading chunk {chunk_idx + 1}/{n_chunks} ({len(chunk_tickers)} tickers)")
+
+        if started is not None:
+            started[chunk_idx] = time.monotonic()
+
+        # Outcomes are recorded on the request thread, so queued chunks see an open breaker at once
+        try:
+            chunk_data = self.bdh(
+                tickers=chunk_tickers,
+                flds=self.fields,
+                start_date=start_date,
+                end_date=end_date
+            )
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+
+        chunk_data = order_by_tickers(chunk_data, chunk_tickers)
+        self.save_checkpoint(run_dir, chunk_tickers, chunk_data)
+        return chunk_data
+
+    def fetch(self, tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Fetch all tickers for a date range.
+
+        Returns:
+            Chunks concatenated column-wise in ticker order
+
+        Raises:
+            RuntimeError: If any chunk failed (finished chunks stay checkpointed)
+        """
+        data, failed = self.fetch_partial(tickers, start_date, end_date)
+        if failed:
+            reasons = sorted(set(failed.values()))
+            raise RuntimeError(f"{len(failed)} tickers failed to download: {'; '.join(reasons)}")
+        return data
+
+    def fetch_partial(self, tickers: List[str], start_date: str,
+                      end_date: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        """
+        Fetch all tickers for a date range, isolating failures per chunk.
+
+        Returns:
+            (successful chunks concatenated in ticker order, {ticker: failure reason})
+        """
+        requests = [(chunk, start_date, end_date) for chunk in self.make_chunks(tickers)]
+        return self.fetch_requests(requests)
+
+    def fetch_plan(self, plan, ticker_order: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        """
+        Fetch every group of a DownloadPlan (bloomberg_download_planner) over its own date range.
+
+        The chunks of all groups share one thread pool, rate limiter and
+        circuit breaker, and checkpoints are kept until the whole plan succeeded.
+
+        Returns:
+            (groups joined on dates in ticker_order, {ticker: failure reason})
+        """
+        requests = []
+        for group in plan.groups:
+            start_date = group['start_date'].strftime('%Y-%m-%d')
+            end_date = group['end_date'].strftime('%Y-%m-%d')
+            requests.extend((chunk, start_date, end_date) for chunk in self.make_chunks(group['tickers']))
+
+        data, failed = self.fetch_requests(requests)
+        if not len(data.columns):
+            return data, failed
+
+        return order_by_tickers(data.sort_index(), ticker_order or plan.tickers), failed
+
+    def fetch_requests(self, requests: List[Tuple[List[str], str, str]]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        """
+        Fetch (chunk tickers, start date, end date) requests on one thread pool.
+
+        Chunks already checkpointed are loaded instead of requested. The
+        checkpoints of every date range involved are removed only once all
+        requests succeeded, so a rerun after any failure requests only the
+        missing chunks.
+
+        Returns:
+            (successful chunks joined on dates in request order, {ticker: failure reason})
+        """
+        if not requests:
+            return pd.DataFrame(), {}
+
+        if self.bdh is None:
+            self.bdh = resolve_xbbg_bdh()
+
+        n_chunks = len(requests)
+        n_tickers = sum(len(chunk) for chunk, _, _ in requests)
+        run_dirs = [self.run_dir(start_date, end_date) for _, start_date, end_date in requests]
+        results = [self.load_checkpoint(run_dir, chunk) for run_dir, (chunk, _, _) in zip(run_dirs, requests)]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if len(pending) < n_chunks:
+            logger.info(f"♻️ Resuming from checkpoint: {n_chunks - len(pending)}/{n_chunks} chunks already downloaded")
+
+        logger.info(f"🚀 Fetching {n_tickers} tickers in {n_chunks} chunks "
+                    f"({len(pending)} to download, {self.max_workers} workers, {self.rate_limiter.rate:g} req/s)")
+
+        breaker = CircuitBreaker(self.failure_threshold)
+        started: Dict[int, float] = {}
+        failures: Dict[int, str] = {}
+        poll_interval = None if self.chunk_timeout is None else min(0.5, self.chunk_timeout / 4)
+
+        # Chunks that finish are checkpointed even if another chunk fails
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {}
+            for i in pending:
+                chunk, start_date, end_date = requests[i]
+                future = executor.submit(self.fetch_chunk, i, n_chunks, chunk, start_date, end_date,
+                                         run_dirs[i], breaker, started)
+                futures[future] = i
+            waiting = set(futures)
+
+            while waiting:
+                done, waiting = wait(waiting, timeout=poll_interval, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except CircuitOpenError as e:
+                        failures[i] = str(e)
+                    except Exception as e:
+                        failures[i] = f"{type(e).__name__}: {e}"
+                        logger.warning(f"⚠️ Chunk {i + 1}/{n_chunks} failed: {failures[i]}")
+
+                if self.chunk_timeout is not None:
+                    now = time.monotonic()
+                    for future in list(waiting):
+                        i = futures[future]
+                        if i in started and now - started[i] > self.chunk_timeout:
+                            # The request thread cannot be interrupted; stop waiting for it
+                            waiting.discard(future)
+                            failures[i] = f"timed out after {self.chunk_timeout:g}s"
+                            breaker.record_failure()
+                            logger.warning(f"⚠️ Chunk {i + 1}/{n_chunks} {failures[i]}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if breaker.is_open():
+            logger.warning(f"🔌 Circuit breaker opened after {breaker.consecutive_failures} consecutive failures")
+
+        fetched = [result for result in results if result is not None]
+        data = pd.concat(fetched, axis=1) if fetched else pd.DataFrame()
+
+        failed = {ticker: failures[i] for i in sorted(failures) for ticker in requests[i][0]}
+
+        if failed:
+            logger.warning(f"⚠️ {len(failures)}/{n_chunks} chunks failed ({len(failed)} tickers)")
+        elif self.clear_checkpoints:
+            for run_dir in dict.fromkeys(run_dirs):
+                if run_dir is not None:
+                    shutil.rmtree(run_dir, ignore_errors=True)
+
+        return data, failed
+
+
+def order_by_tickers(chunk_data: pd.DataFrame, chunk_tickers: List[str]) -> pd.DataFrame:
+    """Reorder bdh output columns to follow the requested ticker order."""
+    position = {ticker: i for i, ticker in enumerate(chunk_tickers)}
+    ordered = sorted(
+        chunk_data.columns,
+        key=lambda col: position.get(ticker_column_name(col), len(position))
+    )
+    return chunk_data[ordered]
+
+
+def benchmark_fetch(tickers: List[str], bdh: Callable, start_date: str, end_date: str,
+                    worker_counts: List[int], requests_per_second: float = 20.0,
+                    chunk_size: int = 50) -> Dict[int, float]:
+    """Time a full fetch for each worker count; returns {workers: seconds}."""
+    timings = {}
+    for workers in worker_counts:
+        fetcher = ChunkedBloombergFetcher(
+            bdh=bdh, chunk_size=chunk_size, max_workers=workers,
+            requests_per_second=requests_per_second, burst=workers
+        )
+        start = time.perf_counter()
+        data = fetcher.fetch(tickers, start_date, end_date)
+        timings[workers] = time.perf_counter() - start
+        logger.info(f"⏱️ {workers} worker(s): {timings[workers]:.2f}s for {data.shape}")
+    return timings
+
+
+def main():
+    """Benchmark sequential vs concurrent chunk fetching against a simulated bdh."""
+    from create_sample_bloomberg_data import SimulatedBdh
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    tickers = [f'SIM{i:03d} Index' for i in range(440)]
+    bdh = SimulatedBdh(latency=0.5)
+
+    timings = benchmark_fetch(tickers, bdh, '2024-01-01', '2024-12-31', worker_counts=[1, 4, 8])
+
+    logger.info("=" * 60)
+    for workers, elapsed in timings.items():
+        logger.info(f"  {workers} worker(s): {elapsed:.2f}s (speedup {timings[1] / elapsed:.1f}x)")
+    return timings
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Bloomberg Download Planner
+==========================
+
+Plans range-minimal Bloomberg history requests instead of asking every ticker
+for history from 2013 onwards.
+
+Each ticker's request starts at the latest of:
+- the global history start (2013-01-01),
+- its 'Start date' from the TickerList sheet (TAP, newer LNG terminals, ...),
+- its last-known-good date minus a revision window, when stored history exists
+  and the download is incremental.
+
+Tickers are grouped by request start date (groups within merge_days of each
+other share the earliest start) and each group is fetched as its own date
+range. The plan reports the expected payload before anything is requested.
+"""
+
+import math
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BYTES_PER_POINT = 8  # float64 PX_LAST value
+
+
+def parse_start_date(value) -> Optional[pd.Timestamp]:
+    """Parse a TickerList 'Start date' cell; None when blank or unparseable."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    parsed = pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(parsed) else pd.Timestamp(parsed).normalize()
+
+
+def last_valid_dates(history: pd.DataFrame) -> Dict[str, pd.Timestamp]:
+    """Last date with a non-NaN value per ticker column (tickers with no data are left out)."""
+    if history.empty:
+        return {}
+
+    valid = history.notna().to_numpy()
+    has_data = valid.any(axis=0)
+    # Position of the last True per column
+    last_pos = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+    dates = pd.DatetimeIndex(history.index)
+
+    return {
+        ticker: dates[pos]
+        for ticker, pos, ok in zip(history.columns, last_pos, has_data)
+        if ok
+    }
+
+
+def business_days(start_date: pd.Timestamp, end_date: pd.Timestamp) -> int:
+    """Number of weekdays in [start_date, end_date] (Bloomberg daily points per ticker)."""
+    if end_date < start_date:
+        return 0
+    return int(np.busday_count(start_date.date(), (end_date + pd.Timedelta(days=1)).date()))
+
+
+class DownloadPlan:
+    """
+    Grouped download plan: one date range per group of tickers.
+    """
+
+    def __init__(self, groups: List[Dict], skipped: List[str], end_date: pd.Timestamp,
+                 full_history_start: pd.Timestamp, chunk_size: int = 50):
+        """
+        Args:
+            groups: [{'start_date': Timestamp, 'end_date': Timestamp, 'tickers': [...]}]
+            skipped: Tickers whose start date lies after end_date
+            end_date: Last requested date
+            full_history_start: Start date a plan-less download would use
+            chunk_size: Tickers per request (for the request count)
+        """
+        self.groups = groups
+        self.skipped = skipped
+        self.end_date = end_date
+        self.full_history_start = full_history_start
+        self.chunk_size = chunk_size
+
+    @property
+    def tickers(self) -> List[str]:
+        """All planned tickers, in group order."""
+        return [ticker for group in self.groups for ticker in group['tickers']]
+
+    def n_requests(self) -> int:
+        """Number of bdh requests the plan issues."""
+        return sum(math.ceil(len(group['tickers']) / self.chunk_size) for group in self.groups)
+
+    def expected_points(self) -> int:
+        """Expected ticker × date points across all groups."""
+        return sum(
+            len(group['tickers']) * business_days(group['start_date'], group['end_date'])
+            for group in self.groups
+        )
+
+    def unplanned_points(self) -> int:
+        """Points requested when every ticker asks for the full history."""
+        n_tickers = len(self.tickers) + len(self.skipped)
+        return n_tickers * business_days(self.full_history_start, self.end_date)
+
+    def summary(self) -> Dict:
+        """Expected payload of the plan compared with an unplanned full-history download."""
+        points = self.expected_points()
+        unplanned = self.unplanned_points()
+        return {
+            'groups': len(self.groups),
+            'requests': self.n_requests(),
+            'tickers': len(self.tickers),
+            'skipped': len(self.skipped),
+            'expected_points': points,
+            'expected_mb': points * BYTES_PER_POINT / 1e6,
+            'unplanned_points': unplanned,
+            'reduction_pct': 100.0 * (1 - points / unplanned) if unplanned else 0.0
+        }
+
+    def log_summary(self):
+        """Log the expected payload before fetching."""
+        s = self.summary()
+        logger.info(f"🗺️ Download plan: {s['tickers']} tickers in {s['groups']} date-range groups, "
+                    f"{s['requests']} requests")
+        logger.info(f"📦 Expected payload: {s['expected_points']:,} points (~{s['expected_mb']:.1f} MB), "
+                    f"{s['reduction_pct']:.1f}% less than full history from {self.full_history_start.date()}")
+        for group in self.groups:
+            logger.info(f"   {group['start_date'].date()} → {group['end_date'].date()}: {len(group['tickers'])} tickers")
+        if self.skipped:
+            logger.info(f"   ⏭️ {len(self.skipped)} tickers start after {self.end_date.date()}, not requested")
+
+
+def plan_downloads(tickers: List[Dict], end_date, full_history_start='2013-01-01',
+                   last_good_dates: Optional[Dict[str, pd.Timestamp]] = None,
+                   revision_window_days: int = 5, merge_days: int = 31,
+                   chunk_size: int = 50) -> DownloadPlan:
+    """
+    Build a download plan from ticker configuration entries.
+
+    Args:
+        tickers: Ticker dicts with 'ticker' and optional 'start_date' (TickerList 'Start date')
+        end_date: Last date to request
+        full_history_start: Earliest date ever requested
+        last_good_dates: {ticker: last date with data} from stored history (incremental mode)
+        revision_window_days: Days re-requested before a last-known-good date
+        merge_days: Start dates within this many days share one request range
+        chunk_size: Tickers per request
+
+    Returns:
+        DownloadPlan with groups ordered by start date, tickers in configuration order
+    """
+    end_date = pd.Timestamp(end_date).normalize()
+    full_history_start = pd.Timestamp(full_history_start).normalize()
+    last_good_dates = last_good_dates or {}
+    window = pd.Timedelta(days=revision_window_days)
+
+    starts = {}
+    skipped = []
+    for info in tickers:
+        ticker = info['ticker']
+        start = full_history_start
+
+        listed_start = parse_start_date(info.get('start_date'))
+        if listed_start is not None:
+            start = max(start, listed_start)
+
+        if ticker in last_good_dates:
+            start = max(start, pd.Timestamp(last_good_dates[ticker]).normalize() - window)
+
+        if start > end_date:
+            skipped.append(ticker)
+        elif ticker not in starts:
+            starts[ticker] = start
+
+    # Sweep sorted start dates; a group keeps its earliest start
+    groups = []
+    for ticker, start in sorted(starts.items(), key=lambda item: item[1]):
+        if groups and start - groups[-1]['start_date'] <= pd.Timedelta(days=merge_days):
+            groups[-1]['tickers'].append(ticker)
+        else:
+            groups.append({'start_date': start, 'end_date': end_date, 'tickers': [ticker]})
+
+    # Keep configuration order inside each group
+    order = {ticker: i for i, ticker in enumerate(starts)}
+    for group in groups:
+        group['tickers'].sort(key=order.__getitem__)
+
+    return DownloadPlan(groups, skipped, end_date, full_history_start, chunk_size)
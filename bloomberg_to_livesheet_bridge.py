@@ -22,6 +22,7 @@ import warnings
 # Import the working systems
 from restored_demand_pipeline import RestoredDemandPipeline
 from livesheet_supply_complete import replicate_livesheet_supply_complete
+from ticker_registry import PIPELINE_SUFFIXES, load_ticker_registry
 
 warnings.filterwarnings('ignore')
 
@@ -55,13 +56,7 @@ class BloombergLiveSheetBridge:
             import xbbg
             
             # Load ticker configuration
-            ticker_config = pd.read_excel(self.use4_file, sheet_name='TickerList', skiprows=8)
-            bloomberg_tickers = []
-            
-            for idx, row in ticker_config.iterrows():
-                ticker = str(row.get('Ticker', '')).strip()
-                if any(suffix in ticker for suffix in ['Index', 'Comdty', 'BGN', 'Equity']):
-                    bloomberg_tickers.append(ticker)
+            bloomberg_tickers = load_ticker_registry(self.use4_file).bloomberg_tickers(PIPELINE_SUFFIXES)
             
             logger.info(f"📊 Found {len(bloomberg_tickers)} Bloomberg tickers")
             
@@ -151,8 +146,8 @@ class BloombergLiveSheetBridge:
         if self.bloomberg_data is None:
             self.fetch_bloomberg_data()
         
-        # Load ticker configuration for metadata
-        ticker_config = pd.read_excel(self.use4_file, sheet_name='TickerList', skiprows=8)
+        # Load ticker configuration for metadata (hashed lookup by ticker)
+        registry = load_ticker_registry(self.use4_file)
         
         # Create MultiTicker structure (same as LiveSheet)
         dates = self.bloomberg_data.index
@@ -174,11 +169,7 @@ class BloombergLiveSheetBridge:
                 break
                 
             # Find ticker in configuration
-            ticker_info = None
-            for idx, row in ticker_config.iterrows():
-                if str(row.get('Ticker', '')).strip() == ticker:
-                    ticker_info = row
-                    break
+            ticker_info = registry.get(ticker)
             
             if ticker_info is not None:
                 # Add metadata headers (rows 13-16, 0-indexed: 12-15)
@@ -13,14 +13,23 @@ Key Corrections:
 3. "Industrial and Power" intelligent splitting
 4. Temporal logic for calculation method changes
 5. Country-specific exception handling
+
+The corrections are declared in RESHUFFLING_RULES (match conditions → field
+values and audit entries) and applied as vectorized masks over a MetadataTable.
 """
 
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, List, Tuple, Optional
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 from datetime import datetime
 
+from metadata_table import MISSING, MetadataTable
+from reshuffling_audit_log import ReshufflingAuditLog
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +38,186 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def metadata_fingerprint(metadata: Dict) -> str:
+    """Content hash of column metadata (column order and every field count)."""
+    if isinstance(metadata, MetadataTable):
+        return metadata.fingerprint
+    digest = hashlib.sha1()
+    for col, info in metadata.items():
+        digest.update(repr((col, tuple(info.items()))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FieldValue(NamedTuple):
+    """Audit value read from the corrected column metadata (default when unset)."""
+    field: str
+    default: object = ''
+
+
+class RunValue(NamedTuple):
+    """Value supplied by the reshuffling run: 'processing_type' or 'reference_date'."""
+    name: str
+
+
+class ReshufflingRule(NamedTuple):
+    """
+    One declarative correction pass.
+    
+    Conditions are (field, test, target) triples, all of which must hold.
+    Columns matching `scope` get one audit entry each (if `audit` is given);
+    `actions` are (extra conditions, field values) pairs and the first one a
+    column matches sets its fields.
+    """
+    name: str
+    scope: Tuple[Tuple[str, str, object], ...]
+    actions: Tuple[Tuple[Tuple[Tuple[str, str, object], ...], Dict[str, object]], ...] = ()
+    audit: Optional[Dict[str, object]] = None
+    processing_types: Optional[Tuple[str, ...]] = None
+    summary: str = 'corrections'
+
+
+# Label tests; they only ever see string values (missing or non-string values never match)
+CONDITION_TESTS = {
+    'equals_lower': lambda value, target: value.lower() == target,
+    'in_lower': lambda value, target: value.lower() in target,
+    'contains_lower': lambda value, target: target in value.lower(),
+    'contains_any_lower': lambda value, target: any(part in value.lower() for part in target),
+}
+
+NETHERLANDS = ('region', 'in_lower', ('netherlands', '#netherlands'))
+INDUSTRIAL_AND_POWER = ('subcategory', 'contains_lower', 'industrial and power')
+
+RESHUFFLING_RULES: Tuple[ReshufflingRule, ...] = (
+    ReshufflingRule(
+        name='zebra_to_industrial',
+        scope=(('subcategory', 'equals_lower', 'zebra'),),
+        actions=(((), {
+            # This is actually industrial consumption
+            'subcategory': 'Industrial',
+            'original_subcategory': 'Zebra',
+            'correction_reason': 'Bloomberg mislabeled industrial as Zebra'
+        }),),
+        audit={
+            'country': FieldValue('region'),
+            'original_category': 'Zebra',
+            'corrected_category': 'Industrial',
+            'correction_type': 'zebra_to_industrial',
+            'reason': 'Domain expertise: Zebra represents actual industrial consumption'
+        },
+        summary='Zebra → Industrial corrections'
+    ),
+    # Netherlands GtP calculation → use for Industrial calculation
+    ReshufflingRule(
+        name='netherlands_industrial_component',
+        scope=(NETHERLANDS,
+               ('category', 'contains_lower', 'intermediate calculation'),
+               ('subcategory', 'contains_lower', 'gas-to-power')),
+        actions=(((), {
+            'processing_note': 'Used in Industrial calculation',
+            'reassignment': 'industrial_component'
+        }),),
+        processing_types=('industrial',),
+        summary='Netherlands reassignments for {processing_type}'
+    ),
+    # Split Industrial and Power → extract GtP component; every Netherlands column is audited
+    ReshufflingRule(
+        name='netherlands_complex',
+        scope=(NETHERLANDS,),
+        actions=(((INDUSTRIAL_AND_POWER,), {
+            'processing_note': 'Extract GtP from combined category',
+            'reassignment': 'gtp_component'
+        }),),
+        audit={
+            'country': 'Netherlands',
+            'processing_type': RunValue('processing_type'),
+            'original_category': FieldValue('subcategory'),
+            'correction_type': 'netherlands_complex',
+            'reassignment_logic': 'netherlands_complex',
+            'reason': 'Netherlands complex reporting requires position-based processing'
+        },
+        processing_types=('gas_to_power',),
+        summary='Netherlands reassignments for {processing_type}'
+    ),
+    ReshufflingRule(
+        name='industrial_power_split',
+        scope=(INDUSTRIAL_AND_POWER,),
+        actions=(
+            # Germany: Total - Gas-to-Power = Industrial
+            ((('region', 'contains_lower', 'germany'),), {
+                'split_method': 'subtract_gtp',
+                'split_note': 'Germany Industrial = Total - Gas-to-Power'
+            }),
+            # Netherlands: Complex intermediate calculation
+            ((('region', 'contains_lower', 'netherlands'),), {
+                'split_method': 'intermediate_calc',
+                'split_note': 'Netherlands requires intermediate calculation'
+            }),
+        ),
+        audit={
+            'country': FieldValue('region'),
+            'original_category': 'Industrial and Power',
+            'split_method': FieldValue('split_method', 'unknown'),
+            'correction_type': 'industrial_power_split',
+            'reason': 'Expert splitting of combined Bloomberg category'
+        },
+        summary='Industrial and Power splits'
+    ),
+    ReshufflingRule(
+        name='temporal_logic',
+        scope=(('subcategory', 'contains_any_lower', ('30/6/22', 'calculated to')),),
+        actions=(((), {
+            'temporal_logic': True,
+            'cutoff_date': RunValue('reference_date'),
+            'pre_cutoff_method': 'calculated',
+            'post_cutoff_method': 'actual'
+        }),),
+        audit={
+            'country': FieldValue('region'),
+            'original_category': FieldValue('subcategory'),
+            'correction_type': 'temporal_logic',
+            'cutoff_date': RunValue('reference_date'),
+            'reason': 'Date-dependent calculation method change'
+        },
+        summary='temporal logic corrections'
+    ),
+)
+
+
+def _rules(*names: str) -> Tuple[ReshufflingRule, ...]:
+    return tuple(rule for rule in RESHUFFLING_RULES if rule.name in names)
+
+
+def _conditions_mask(table: MetadataTable, conditions) -> np.ndarray:
+    """Column mask of all conditions, each test run once per vocabulary entry."""
+    mask = np.ones(len(table), dtype=bool)
+    for field, test, target in conditions:
+        check = CONDITION_TESTS[test]
+        mask &= table.match(field, lambda value, check=check, target=target:
+                            isinstance(value, str) and check(value, target))
+    return mask
+
+
+def _resolve(value, run_values: Dict):
+    return run_values[value.name] if isinstance(value, RunValue) else value
+
+
+def _audit_entries(table: MetadataTable, scope: np.ndarray, audit: Dict, run_values: Dict) -> List[Dict]:
+    """One audit entry per scoped column, in column order."""
+    positions = np.flatnonzero(scope)
+    values = {}
+    for key, value in audit.items():
+        if isinstance(value, FieldValue):
+            decoded = table.values(value.field)
+            decoded[table.codes(value.field) == MISSING] = value.default
+            values[key] = decoded[positions].tolist()
+        else:
+            values[key] = [_resolve(value, run_values)] * len(positions)
+    return [
+        {'column': table.columns[position], **{key: values[key][i] for key in audit}}
+        for i, position in enumerate(positions)
+    ]
+
+
 class BloombergCategoryReshuffler:
     """
     Expert-level Bloomberg category reshuffling system.
@@ -39,12 +228,30 @@ class BloombergCategoryReshuffler:
     
     def __init__(self):
         """Initialize reshuffling system with expert mapping definitions."""
-        self.reshuffling_audit_trail = []
+        # Deduplicated corrections: (column, correction_type, processing_type) -> hits, first/last run
+        self.audit_log = ReshufflingAuditLog()
+        # (metadata fingerprint, processing_type) -> {'table' or 'changes', 'audit'};
+        # shared by concurrent runs, guarded by _cache_lock
+        self.reshuffling_cache = {}
+        self._cache_lock = threading.Lock()
         self.validation_targets = {
             'Industrial': 240.70,  # Target for 2016-10-03
             'Gas_to_Power': 166.71  # Target for 2016-10-03
         }
     
+    @property
+    def reshuffling_audit_trail(self) -> List[Dict]:
+        """One audit entry per unique correction (with hits and first/last run IDs)."""
+        return self.audit_log.entries()
+    
+    def start_run(self, run_id=None):
+        """Start a new audit run (corrections applied from now on carry its ID)."""
+        return self.audit_log.start_run(run_id)
+    
+    def new_run_id(self):
+        """Allocate an audit run ID for a concurrent run (passed explicitly as run_id)."""
+        return self.audit_log.new_run_id()
+    
     def get_industrial_category_mapping(self) -> List[str]:
         """
         Return the corrected category mapping for Industrial processing.
@@ -173,6 +380,74 @@ class BloombergCategoryReshuffler:
         
         return corrections
     
+    def apply_reshuffling_rules(self, metadata: Dict, processing_type: Optional[str] = None,
+                                rules: Sequence['ReshufflingRule'] = None,
+                                reference_date: str = '2022-06-30') -> Dict:
+        """
+        Apply declarative reshuffling rules as vectorized column masks.
+        
+        Each rule's conditions are evaluated once per distinct label over the
+        MetadataTable and combined into boolean masks; its actions are then a
+        few table.assign calls. Rules run in order, each seeing the labels left
+        by the previous one, and audit entries are added in column order.
+        
+        Args:
+            metadata: Column metadata dictionary or MetadataTable
+            processing_type: 'industrial', 'gas_to_power' or None (rules for any type)
+            rules: Rules to apply (default RESHUFFLING_RULES)
+            reference_date: Cutoff date for temporal logic
+            
+        Returns:
+            A new MetadataTable for a table. A dict is corrected in place and a
+            shallow copy returned, as the per-column passes used to do.
+        """
+        corrected_metadata, audit = self._apply_rules(metadata, processing_type, rules, reference_date)
+        self.audit_log.record(audit, processing_type)
+        return corrected_metadata
+    
+    def _apply_rules(self, metadata: Dict, processing_type: Optional[str],
+                     rules: Optional[Sequence['ReshufflingRule']], reference_date: str) -> Tuple[Dict, List[Dict]]:
+        """apply_reshuffling_rules without recording: (corrected metadata, audit entries)."""
+        rules = RESHUFFLING_RULES if rules is None else rules
+        table = MetadataTable.from_dict(metadata)
+        run_values = {'processing_type': processing_type, 'reference_date': reference_date}
+        # (mask, field values) in application order, replayed onto metadata dicts
+        assignments = []
+        audit = []
+        
+        for rule in rules:
+            if rule.processing_types is not None and processing_type not in rule.processing_types:
+                continue
+            
+            scope = _conditions_mask(table, rule.scope)
+            
+            # All action masks see the table as it was before the rule; first matching action wins
+            remaining = scope.copy()
+            rule_assignments = []
+            for conditions, values in rule.actions:
+                mask = remaining & _conditions_mask(table, conditions)
+                remaining &= ~mask
+                rule_assignments.append((mask, {field: _resolve(value, run_values)
+                                                for field, value in values.items()}))
+            
+            for mask, values in rule_assignments:
+                table = table.assign(mask, **values)
+            assignments.extend(rule_assignments)
+            
+            if rule.audit:
+                audit.extend(_audit_entries(table, scope, rule.audit, run_values))
+            
+            applied = sum(int(mask.sum()) for mask, _ in rule_assignments)
+            logger.info(f"Applied {applied} {rule.summary.format(**run_values)}")
+        
+        if isinstance(metadata, MetadataTable):
+            return table, audit
+        
+        for mask, values in assignments:
+            for position in np.flatnonzero(mask):
+                metadata[table.columns[position]].update(values)
+        return metadata.copy(), audit
+    
     def apply_zebra_correction(self, df: pd.DataFrame, metadata: Dict) -> pd.DataFrame:
         """
         Apply "Zebra" → Industrial correction.
@@ -181,31 +456,7 @@ class BloombergCategoryReshuffler:
         This corrects that categorization based on domain expertise.
         """
         logger.info("Applying Zebra → Industrial correction")
-        
-        corrected_metadata = metadata.copy()
-        zebra_corrections = 0
-        
-        for col, info in metadata.items():
-            if info.get('subcategory', '').lower() == 'zebra':
-                # This is actually industrial consumption
-                corrected_metadata[col]['subcategory'] = 'Industrial'
-                corrected_metadata[col]['original_subcategory'] = 'Zebra'
-                corrected_metadata[col]['correction_reason'] = 'Bloomberg mislabeled industrial as Zebra'
-                
-                zebra_corrections += 1
-                
-                # Add to audit trail
-                self.reshuffling_audit_trail.append({
-                    'column': col,
-                    'country': info.get('region', ''),
-                    'original_category': 'Zebra',
-                    'corrected_category': 'Industrial',
-                    'correction_type': 'zebra_to_industrial',
-                    'reason': 'Domain expertise: Zebra represents actual industrial consumption'
-                })
-        
-        logger.info(f"Applied {zebra_corrections} Zebra → Industrial corrections")
-        return corrected_metadata
+        return self.apply_reshuffling_rules(metadata, rules=_rules('zebra_to_industrial'))
     
     def apply_netherlands_complex_reassignment(self, df: pd.DataFrame, metadata: Dict, 
                                              processing_type: str) -> Dict:
@@ -216,44 +467,9 @@ class BloombergCategoryReshuffler:
         and processing-type-aware reassignment.
         """
         logger.info(f"Applying Netherlands complex reassignment for {processing_type}")
-        
-        corrected_metadata = metadata.copy()
-        netherlands_corrections = 0
-        
-        for col, info in metadata.items():
-            if info.get('region', '').lower() in ['netherlands', '#netherlands']:
-                
-                # Position-based reassignment logic
-                if processing_type == 'industrial':
-                    # For Industrial processing
-                    if 'intermediate calculation' in info.get('category', '').lower():
-                        if 'gas-to-power' in info.get('subcategory', '').lower():
-                            # Netherlands GtP calculation → use for Industrial calculation
-                            corrected_metadata[col]['processing_note'] = 'Used in Industrial calculation'
-                            corrected_metadata[col]['reassignment'] = 'industrial_component'
-                            netherlands_corrections += 1
-                
-                elif processing_type == 'gas_to_power':
-                    # For Gas-to-Power processing  
-                    if 'industrial and power' in info.get('subcategory', '').lower():
-                        # Split Industrial and Power → extract GtP component
-                        corrected_metadata[col]['processing_note'] = 'Extract GtP from combined category'
-                        corrected_metadata[col]['reassignment'] = 'gtp_component'
-                        netherlands_corrections += 1
-                
-                    # Add to audit trail
-                    self.reshuffling_audit_trail.append({
-                        'column': col,
-                        'country': 'Netherlands',
-                        'processing_type': processing_type,
-                        'original_category': info.get('subcategory', ''),
-                        'correction_type': 'netherlands_complex',
-                        'reassignment_logic': 'netherlands_complex',
-                        'reason': 'Netherlands complex reporting requires position-based processing'
-                    })
-        
-        logger.info(f"Applied {netherlands_corrections} Netherlands reassignments for {processing_type}")
-        return corrected_metadata
+        return self.apply_reshuffling_rules(
+            metadata, processing_type, rules=_rules('netherlands_industrial_component', 'netherlands_complex')
+        )
     
     def apply_industrial_power_splitting(self, df: pd.DataFrame, metadata: Dict) -> Dict:
         """
@@ -263,79 +479,21 @@ class BloombergCategoryReshuffler:
         This applies expert logic to split them appropriately for each processing type.
         """
         logger.info("Applying Industrial and Power splitting logic")
-        
-        corrected_metadata = metadata.copy()
-        split_corrections = 0
-        
-        for col, info in metadata.items():
-            subcategory = info.get('subcategory', '').lower()
-            
-            if 'industrial and power' in subcategory:
-                region = info.get('region', '')
-                
-                # Germany: Total - Gas-to-Power = Industrial
-                if 'germany' in region.lower():
-                    corrected_metadata[col]['split_method'] = 'subtract_gtp'
-                    corrected_metadata[col]['split_note'] = 'Germany Industrial = Total - Gas-to-Power'
-                    split_corrections += 1
-                
-                # Netherlands: Complex intermediate calculation
-                elif 'netherlands' in region.lower():
-                    corrected_metadata[col]['split_method'] = 'intermediate_calc'
-                    corrected_metadata[col]['split_note'] = 'Netherlands requires intermediate calculation'
-                    split_corrections += 1
-                
-                # Add to audit trail
-                self.reshuffling_audit_trail.append({
-                    'column': col,
-                    'country': region,
-                    'original_category': 'Industrial and Power',
-                    'split_method': corrected_metadata[col].get('split_method', 'unknown'),
-                    'correction_type': 'industrial_power_split',
-                    'reason': 'Expert splitting of combined Bloomberg category'
-                })
-        
-        logger.info(f"Applied {split_corrections} Industrial and Power splits")
-        return corrected_metadata
+        return self.apply_reshuffling_rules(metadata, rules=_rules('industrial_power_split'))
     
     def apply_temporal_calculation_logic(self, df: pd.DataFrame, metadata: Dict, 
                                        reference_date: str = '2022-06-30') -> Dict:
         """
         Apply temporal calculation logic for date-dependent category changes.
         
-        Some categories use "calculated to 30/6/22 then actual" logic.
+        Some categories use "calculated to 30/6/22 then actual" logic. The tags
+        are applied by the aggregation engine as per-column date masks (see
+        aggregation_engine.temporal_switches); more cutoffs can be declared
+        with 'cutoff_dates' / 'period_methods'.
         """
         logger.info(f"Applying temporal calculation logic (cutoff: {reference_date})")
-        
-        corrected_metadata = metadata.copy()
-        temporal_corrections = 0
-        
-        cutoff_date = pd.to_datetime(reference_date)
-        
-        for col, info in metadata.items():
-            subcategory = info.get('subcategory', '')
-            
-            if '30/6/22' in subcategory or 'calculated to' in subcategory.lower():
-                
-                corrected_metadata[col]['temporal_logic'] = True
-                corrected_metadata[col]['cutoff_date'] = reference_date
-                corrected_metadata[col]['pre_cutoff_method'] = 'calculated'
-                corrected_metadata[col]['post_cutoff_method'] = 'actual'
-                
-                temporal_corrections += 1
-                
-                # Add to audit trail
-                self.reshuffling_audit_trail.append({
-                    'column': col,
-                    'country': info.get('region', ''),
-                    'original_category': subcategory,
-                    'correction_type': 'temporal_logic',
-                    'cutoff_date': reference_date,
-                    'reason': 'Date-dependent calculation method change'
-                })
-        
-        logger.info(f"Applied {temporal_corrections} temporal logic corrections")
-        return corrected_metadata
+        return self.apply_reshuffling_rules(metadata, rules=_rules('temporal_logic'),
+                                            reference_date=reference_date)
     
     def apply_category_reshuffling(self, df: pd.DataFrame, metadata: Dict, 
                                  processing_type: str) -> Tuple[pd.DataFrame, Dict]:
@@ -344,40 +502,98 @@ class BloombergCategoryReshuffler:
         
         Args:
             df: MultiTicker data DataFrame
-            metadata: Column metadata dictionary  
+            metadata: Column metadata dictionary or MetadataTable
             processing_type: 'industrial' or 'gas_to_power'
             
         Returns:
-            Tuple of (corrected_df, corrected_metadata)
+            Tuple of (corrected_df, corrected_metadata). A MetadataTable is
+            never modified: the corrections come back as a new table. A dict
+            is corrected in place (its nested column dicts are shared).
         """
+        corrected_df, corrected_metadata, _ = self._reshuffle(df, metadata, processing_type)
+        return corrected_df, corrected_metadata
+    
+    def _reshuffle(self, df: pd.DataFrame, metadata: Dict, processing_type: str,
+                   run_id=None) -> Tuple[pd.DataFrame, Dict, List[Dict]]:
+        """apply_category_reshuffling that also returns the audit entries it recorded."""
         logger.info(f"🔄 Starting comprehensive category reshuffling for {processing_type}")
         logger.info("=" * 70)
         
-        # Start with original metadata
-        corrected_metadata = metadata.copy()
-        
-        # Step 1: Apply Zebra corrections
-        corrected_metadata = self.apply_zebra_correction(df, corrected_metadata)
-        
-        # Step 2: Apply Netherlands complex reassignment
-        corrected_metadata = self.apply_netherlands_complex_reassignment(
-            df, corrected_metadata, processing_type
-        )
-        
-        # Step 3: Apply Industrial and Power splitting
-        corrected_metadata = self.apply_industrial_power_splitting(df, corrected_metadata)
-        
-        # Step 4: Apply temporal calculation logic
-        corrected_metadata = self.apply_temporal_calculation_logic(df, corrected_metadata)
+        # Steps 1-4: Zebra, Netherlands, Industrial and Power splitting, temporal logic
+        corrected_metadata, audit = self._apply_rules(metadata, processing_type, None, '2022-06-30')
+        self.audit_log.record(audit, processing_type, run_id)
         
         # Step 5: Validate corrections
         self.validate_category_corrections(df, corrected_metadata, processing_type)
         
         logger.info("=" * 70)
         logger.info(f"✅ Category reshuffling completed for {processing_type}")
-        logger.info(f"📋 Applied {len(self.reshuffling_audit_trail)} total corrections")
+        logger.info(f"📋 Applied {len(audit)} corrections ({len(self.audit_log)} unique so far)")
         
-        return df, corrected_metadata
+        return df, corrected_metadata, audit
+    
+    def apply_category_reshuffling_cached(self, df: pd.DataFrame, metadata: Dict, processing_type: str,
+                                        run_id=None) -> Tuple[pd.DataFrame, Dict, tuple, bool]:
+        """
+        Memoized apply_category_reshuffling.
+        
+        Results are cached per (metadata fingerprint, processing_type). A repeat
+        call counts the cached audit entries into the audit log without
+        re-running the correction passes. For a MetadataTable the cached
+        corrected table is returned as is; a metadata dict gets the cached
+        corrections replayed onto it (the passes relabel the shared column
+        dicts in place).
+        
+        Safe to call from concurrent runs with MetadataTables (the cache only
+        holds immutable tables and audit snapshots); run_id tags the audit
+        records of the calling run (default: the current audit run).
+        
+        Returns:
+            Tuple of (df, corrected_metadata, audit_snapshot, cache_hit) where
+            audit_snapshot is a tuple of read-only audit entries for this call
+        """
+        key = (metadata_fingerprint(metadata), processing_type)
+        with self._cache_lock:
+            cached = self.reshuffling_cache.get(key)
+        
+        if cached is not None:
+            self.audit_log.record(cached['audit'], processing_type, run_id)
+            if isinstance(metadata, MetadataTable):
+                return df, cached['table'], cached['audit'], True
+            for col, changes in cached['changes'].items():
+                metadata[col].update(changes)
+            return df, metadata.copy(), cached['audit'], True
+        
+        if isinstance(metadata, MetadataTable):
+            corrected_df, corrected_table, entries = self._reshuffle(df, metadata, processing_type, run_id)
+            audit = tuple(MappingProxyType(entry) for entry in entries)
+            with self._cache_lock:
+                self.reshuffling_cache[key] = {'table': corrected_table, 'audit': audit}
+            return corrected_df, corrected_table, audit, False
+        
+        before = {col: dict(info) for col, info in metadata.items()}
+        
+        corrected_df, corrected_metadata, entries = self._reshuffle(df, metadata, processing_type, run_id)
+        
+        # Passes only add or overwrite fields, so the per-column field changes replay them exactly
+        changes = {}
+        for col, info in corrected_metadata.items():
+            original = before.get(col, {})
+            changed = {field: value for field, value in info.items()
+                       if field not in original or original[field] != value}
+            if changed:
+                changes[col] = MappingProxyType(changed)
+        
+        audit = tuple(MappingProxyType(entry) for entry in entries)
+        with self._cache_lock:
+            self.reshuffling_cache[key] = {'changes': MappingProxyType(changes), 'audit': audit}
+        
+        return corrected_df, corrected_metadata, audit, False
+    
+    def clear_reshuffling_cache(self):
+        """Forget memoized reshuffling results (the audit log is kept)."""
+        with self._cache_lock:
+            self.reshuffling_cache.clear()
     
     def validate_category_corrections(self, df: pd.DataFrame, metadata: Dict, 
                                     processing_type: str) -> bool:
@@ -388,11 +604,9 @@ class BloombergCategoryReshuffler:
         
         validation_passed = True
         
-        # Count corrections by type
-        correction_counts = {}
-        for correction in self.reshuffling_audit_trail:
-            correction_type = correction.get('correction_type', 'unknown')
-            correction_counts[correction_type] = correction_counts.get(correction_type, 0) + 1
+        # Count unique corrections by type
+        summary = self.audit_log.summary()
+        correction_counts = summary['by_type']
         
         logger.info("Correction summary:")
         for correction_type, count in correction_counts.items():
@@ -406,8 +620,7 @@ class BloombergCategoryReshuffler:
             logger.info(f"✅ Applied {zebra_corrections} Zebra → Industrial corrections")
         
         # Validate Netherlands complex logic
-        netherlands_corrections = sum(1 for c in self.reshuffling_audit_trail 
-                                    if c.get('country') == 'Netherlands')
+        netherlands_corrections = summary['by_country'].get('Netherlands', 0)
         if netherlands_corrections > 0:
             logger.info(f"✅ Applied {netherlands_corrections} Netherlands complex corrections")
         
@@ -415,50 +628,38 @@ class BloombergCategoryReshuffler:
     
     def export_reshuffling_audit_trail(self, output_file: str = 'reshuffling_audit_trail.csv'):
         """
-        Export detailed audit trail of all category corrections.
+        Export the audit log: one row per unique correction with its hit count
+        and first/last run IDs (CSV, or parquet for a .parquet file name).
         """
-        if not self.reshuffling_audit_trail:
+        if not self.audit_log:
             logger.warning("No reshuffling corrections to export")
             return
         
-        audit_df = pd.DataFrame(self.reshuffling_audit_trail)
-        audit_df.to_csv(output_file, index=False)
+        output_file = self.audit_log.export(output_file)
+        summary = self.audit_log.summary()
         
         logger.info(f"📝 Exported reshuffling audit trail to {output_file}")
-        logger.info(f"📊 Total corrections: {len(self.reshuffling_audit_trail)}")
+        logger.info(f"📊 Total corrections: {summary['total_corrections']} unique, {summary['total_hits']} applied")
         
         # Summary by correction type
-        if 'correction_type' in audit_df.columns:
-            summary = audit_df['correction_type'].value_counts()
-            logger.info("Correction type summary:")
-            for correction_type, count in summary.items():
-                logger.info(f"  {correction_type}: {count}")
+        logger.info("Correction type summary:")
+        for correction_type, count in summary['by_type'].items():
+            logger.info(f"  {correction_type}: {count}")
         
         return output_file
     
     def get_correction_summary(self) -> Dict:
         """
         Get summary of all applied corrections.
+        
+        Counts are of unique corrections; 'total_hits' is how often they were
+        applied.
         """
-        if not self.reshuffling_audit_trail:
+        if not self.audit_log:
             return {'total_corrections': 0}
         
-        summary = {
-            'total_corrections': len(self.reshuffling_audit_trail),
-            'by_type': {},
-            'by_country': {},
-            'validation_targets': self.validation_targets
-        }
-        
-        for correction in self.reshuffling_audit_trail:
-            # Count by correction type
-            correction_type = correction.get('correction_type', 'unknown')
-            summary['by_type'][correction_type] = summary['by_type'].get(correction_type, 0) + 1
-            
-            # Count by country
-            country = correction.get('country', 'unknown')
-            summary['by_country'][country] = summary['by_country'].get(country, 0) + 1
-        
+        summary = self.audit_log.summary()
+        summary['validation_targets'] = self.validation_targets
         return summary
 
 
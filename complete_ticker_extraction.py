@@ -10,6 +10,8 @@ import logging
 import re
 from datetime import datetime
 
+from ticker_registry import load_ticker_registry, ticker_metadata
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,8 +26,8 @@ def extract_complete_ticker_list(file_path='use4.xlsx', sheet_name='TickerList')
     """
     logger.info(f"Extracting complete ticker list from {sheet_name} in {file_path}")
     
-    # Load TickerList sheet - skip first 8 rows as indicated in CLAUDE.md
-    df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=8)
+    # Load TickerList sheet - skip first 8 rows as indicated in CLAUDE.md (via the shared registry)
+    df = load_ticker_registry(file_path, sheet_name).table.copy()
     
     logger.info(f"Loaded TickerList with shape: {df.shape}")
     logger.info(f"Columns: {list(df.columns)}")
@@ -87,21 +89,8 @@ def create_multiticker_structure(ticker_df):
     # Extract key metadata for MultiTicker format
     multiticker_data = []
     
-    for idx, row in ticker_df.iterrows():
-        ticker_info = {
-            'ticker': str(row['Ticker']).strip(),
-            'description': str(row.get('Description', '')).strip() if pd.notna(row.get('Description')) else '',
-            'category': str(row.get('Category', '')).strip() if pd.notna(row.get('Category')) else '',
-            'region_from': str(row.get('Region from', '')).strip() if pd.notna(row.get('Region from')) else '',
-            'region_to': str(row.get('Region to', '')).strip() if pd.notna(row.get('Region to')) else '',
-            'units': str(row.get('Units', 'GWh')).strip() if pd.notna(row.get('Units')) else 'GWh',
-            'normalization_factor': row.get('Normalization factor', 1.0) if pd.notna(row.get('Normalization factor')) else 1.0,
-            'positive_negative': str(row.get('Positive/Negative', '')).strip() if pd.notna(row.get('Positive/Negative')) else '',
-            'start_date': str(row.get('Start date', '')).strip() if pd.notna(row.get('Start date')) else '',
-            'other_notes': str(row.get('Other notes or comments', '')).strip() if pd.notna(row.get('Other notes or comments')) else ''
-        }
-        
-        multiticker_data.append(ticker_info)
+    for row in ticker_df.to_dict('records'):
+        multiticker_data.append(ticker_metadata(row))
     
     logger.info(f"Created MultiTicker structure for {len(multiticker_data)} tickers")
     
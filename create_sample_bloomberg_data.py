@@ -17,6 +17,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
+import time
+
+from ticker_registry import PIPELINE_SUFFIXES, load_ticker_registry
 
 # Configure logging
 logging.basicConfig(
@@ -31,23 +34,22 @@ def load_ticker_configuration(use4_file='use4.xlsx'):
     logger.info("📊 Loading ticker configuration from use4.xlsx...")
     
     try:
-        ticker_config = pd.read_excel(use4_file, sheet_name='TickerList', skiprows=8)
-        logger.info(f"✅ Loaded {len(ticker_config)} rows from TickerList")
+        registry = load_ticker_registry(use4_file)
+        logger.info(f"✅ Loaded {len(registry)} rows from TickerList")
         
         # Extract Bloomberg tickers
         bloomberg_tickers = []
-        for idx, row in ticker_config.iterrows():
-            ticker = str(row.get('Ticker', '')).strip()
-            if any(suffix in ticker for suffix in ['Index', 'Comdty', 'BGN', 'Equity']):
-                bloomberg_tickers.append({
-                    'ticker': ticker,
-                    'description': str(row.get('Description', '')),
-                    'category': str(row.get('Category', '')),
-                    'region_from': str(row.get('Region from', '')),
-                    'region_to': str(row.get('Region to', '')),
-                    'normalization': float(row.get('Normalization factor', 1.0)),
-                    'units': str(row.get('Units', ''))
-                })
+        positions = registry.bloomberg_positions(PIPELINE_SUFFIXES)
+        for position, row in zip(positions, registry.records(positions)):
+            bloomberg_tickers.append({
+                'ticker': registry.tickers[position],
+                'description': str(row.get('Description', '')),
+                'category': str(row.get('Category', '')),
+                'region_from': str(row.get('Region from', '')),
+                'region_to': str(row.get('Region to', '')),
+                'normalization': float(row.get('Normalization factor', 1.0)),
+                'units': str(row.get('Units', ''))
+            })
         
         logger.info(f"🎯 Found {len(bloomberg_tickers)} Bloomberg tickers")
         return bloomberg_tickers
@@ -156,6 +158,51 @@ def generate_realistic_gas_data(ticker_info, dates):
     return np.array(values)
 
 
+class SimulatedBdh:
+    """
+    Local stand-in for xbbg.bdh that injects request latency.
+    
+    Returns the same shape as xbbg.bdh (DatetimeIndex, (ticker, field) MultiIndex
+    columns) so fetch code can be exercised and benchmarked without a terminal.
+    """
+    
+    def __init__(self, latency=0.5, jitter=0.0, failure_rate=0.0, seed=0):
+        """
+        Args:
+            latency: Seconds each request takes
+            jitter: Extra uniform random latency (0..jitter seconds)
+            failure_rate: Probability that a request raises an error
+            seed: Random seed for values, jitter and failures
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.calls = []
+    
+    def __call__(self, tickers, flds=None, start_date=None, end_date=None, **kwargs):
+        fields = flds or ['PX_LAST']
+        if isinstance(fields, str):
+            fields = [fields]
+        
+        rng = np.random.default_rng([self.seed, len(self.calls)])
+        self.calls.append({'tickers': list(tickers), 'start_date': start_date, 'end_date': end_date})
+        
+        time.sleep(self.latency + rng.uniform(0, self.jitter))
+        
+        if rng.random() < self.failure_rate:
+            raise RuntimeError(f"Simulated Bloomberg failure for {len(tickers)} tickers")
+        
+        dates = pd.date_range(start=start_date, end=end_date, freq='D')
+        columns = pd.MultiIndex.from_tuples(
+            [(ticker, field) for ticker in tickers for field in fields],
+            names=['ticker', 'field']
+        )
+        values = np.abs(rng.normal(100, 25, size=(len(dates), len(columns))))
+        
+        return pd.DataFrame(values, index=dates, columns=columns)
+
+
 def create_sample_bloomberg_data(start_date='2016-01-01', end_date='2017-12-31', max_tickers=100):
     """
     Create sample Bloomberg data in the exact format returned by xbbg.bdh().
@@ -126,13 +126,17 @@ class EnhancedGasMarketPipeline:
         Returns:
             Tuple of (data_df, corrected_metadata)
         """
-        logger.info(f"🔄 Applying Bloomberg category reshuffling for {processing_type}")
-        
-        # Apply comprehensive category reshuffling
-        corrected_df, corrected_metadata = self.reshuffler.apply_category_reshuffling(
+        # Apply comprehensive category reshuffling (memoized per metadata state)
+        corrected_df, corrected_metadata, audit, cache_hit = self.reshuffler.apply_category_reshuffling_cached(
             data_df, metadata, processing_type
         )
         
+        if cache_hit:
+            logger.debug(f"♻️ Reused {processing_type} reshuffling ({len(audit)} corrections replayed)")
+            return corrected_df, corrected_metadata
+        
+        logger.info(f"🔄 Applied Bloomberg category reshuffling for {processing_type}")
+        
         # Log correction summary
         summary = self.reshuffler.get_correction_summary()
         logger.info(f"📊 Applied {summary['total_corrections']} category corrections")
@@ -504,7 +508,9 @@ class EnhancedGasMarketPipeline:
         """
         Run the complete enhanced pipeline with Bloomberg category reshuffling.
         """
-        logger.info("🚀 Starting ENHANCED European Gas Market Pipeline")
+        run_id = self.reshuffler.start_run()
+        
+        logger.info(f"🚀 Starting ENHANCED European Gas Market Pipeline (run {run_id})")
         logger.info("=" * 80)
         logger.info("Features: Bloomberg Category Reshuffling + Expert Data Curation")
         logger.info("=" * 80)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Incremental Tail Recomputation
+==============================
+
+Day to day only the last rows of the MultiTicker history change (new prints
+and revisions), but every output row is a function of its own input row.
+An OutputSnapshot keeps the last processed input and outputs:
+
+- values.npy   : input matrix (dates × indexed columns, float64 or float32)
+- dates.npy    : datetime64 date vector
+- outputs.pkl  : output frame computed from that input
+- meta.json    : input key (criteria labels), output columns, the
+                 whole-history if_positive decisions taken and a content
+                 hash per input (ticker) column
+
+On the next run the column hashes, taken over the rows both runs share, name
+the tickers that were revised. Through the engine's reverse dependency map
+(SUMIFS criteria after reshuffling) only the outputs referencing those tickers
+are recomputed, and only from the earliest revised row onward; rows appended
+since the last run are computed for every output and the rest is spliced from
+the stored outputs. A change of criteria labels, of the column layout, of
+earlier dates or of an if_positive decision falls back to a full
+recomputation. Changed dates in the tail also recompute the outputs that
+depend on a temporal switch, whose mask follows the dates even when no value
+changed. snapshot.last_report lists the revised columns, the outputs
+recomputed for them and the number of new rows. Concurrent runs in one
+process that share a snapshot directory take turns (one lock per directory).
+
+Usage:
+    snapshot = OutputSnapshot('.demand_snapshot')
+    stored = snapshot.load(key)
+    start = first_changed_row(stored['dates'], stored['values'], dates, values) if stored else 0
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# One lock per snapshot directory, shared by every OutputSnapshot in the process
+_directory_locks: Dict[str, threading.Lock] = {}
+_directory_locks_guard = threading.Lock()
+
+
+def input_key(*parts) -> str:
+    """Stable hash of whatever defines the input layout (labels, column names, ...)."""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+def column_hashes(values: np.ndarray) -> List[str]:
+    """Content hash of every column of a matrix (bitwise, NaN-safe)."""
+    return [
+        hashlib.blake2b(np.ascontiguousarray(values[:, position]).tobytes(), digest_size=16).hexdigest()
+        for position in range(values.shape[1])
+    ]
+
+
+def first_changed_row(old_dates: np.ndarray, old_values: np.ndarray,
+                      new_dates: np.ndarray, new_values: np.ndarray) -> int:
+    """
+    Index of the earliest row whose date or values differ (bitwise, so NaN
+    equals NaN). Appended rows start at the old length; when nothing changed
+    (or rows were only dropped from the end) the common length is returned.
+    """
+    if old_values.shape[1:] != new_values.shape[1:] or old_values.dtype != new_values.dtype:
+        return 0
+
+    n_common = min(len(old_dates), len(new_dates))
+    changed = np.flatnonzero(old_dates[:n_common] != new_dates[:n_common])
+    first = int(changed[0]) if len(changed) else n_common
+
+    if first:
+        bits = np.dtype(f'u{new_values.dtype.itemsize}')
+        old_bits = np.ascontiguousarray(old_values[:first]).view(bits)
+        new_bits = np.ascontiguousarray(new_values[:first]).view(bits)
+        rows = np.flatnonzero((old_bits != new_bits).any(axis=1))
+        if len(rows):
+            first = int(rows[0])
+
+    return first
+
+
+class OutputSnapshot:
+    """Last processed input matrix and outputs of a pipeline, persisted in a directory."""
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = Path(snapshot_dir)
+        # What the last evaluate_incremental call found and recomputed
+        self.last_report: Dict = {}
+
+    @property
+    def lock(self) -> threading.Lock:
+        """Process-wide lock of this snapshot directory (held from load to save)."""
+        path = str(self.snapshot_dir.resolve())
+        with _directory_locks_guard:
+            return _directory_locks.setdefault(path, threading.Lock())
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        Stored snapshot for an input key, or None when missing, unreadable or
+        built from a different input layout.
+        """
+        meta_file = self.snapshot_dir / 'meta.json'
+        try:
+            with open(meta_file) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('version') != SNAPSHOT_VERSION or meta.get('key') != key:
+            return None
+
+        try:
+            return {
+                'dates': np.load(self.snapshot_dir / 'dates.npy'),
+                'values': np.load(self.snapshot_dir / 'values.npy', mmap_mode='r'),
+                'outputs': pd.read_pickle(self.snapshot_dir / 'outputs.pkl'),
+                'conditions': meta.get('conditions', {}),
+                'column_hashes': meta.get('column_hashes', [])
+            }
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot {self.snapshot_dir} unreadable ({str(e)}), recomputing in full")
+            return None
+
+    def save(self, key: str, dates: np.ndarray, values: np.ndarray, outputs: pd.DataFrame,
+             conditions: Optional[Dict[str, bool]] = None, hashes: Optional[List[str]] = None):
+        """Persist the processed input and outputs (meta.json removed first, written last)."""
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        meta_file = self.snapshot_dir / 'meta.json'
+        if meta_file.exists():
+            meta_file.unlink()
+
+        for name, array in (('dates.npy', dates), ('values.npy', values)):
+            tmp_file = self.snapshot_dir / f'{name}.tmp'
+            with open(tmp_file, 'wb') as handle:
+                np.save(handle, np.ascontiguousarray(array))
+            os.replace(tmp_file, self.snapshot_dir / name)
+
+        tmp_file = self.snapshot_dir / 'outputs.tmp.pkl'
+        outputs.to_pickle(tmp_file)
+        os.replace(tmp_file, self.snapshot_dir / 'outputs.pkl')
+
+        tmp_meta = self.snapshot_dir / 'meta.tmp'
+        with open(tmp_meta, 'w') as handle:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'key': key,
+                'columns': list(outputs.columns),
+                'rows': len(outputs),
+                'conditions': conditions or {},
+                'column_hashes': hashes if hashes is not None else column_hashes(values)
+            }, handle)
+        os.replace(tmp_meta, meta_file)
+
+
+def evaluate_incremental(engine, values: np.ndarray, dates: np.ndarray, index: pd.Index,
+                         snapshot: OutputSnapshot, key: str,
+                         column_names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Evaluate an AggregationEngine over `values`, recomputing only the outputs
+    that reference changed columns, from the earliest changed row onward, then
+    update the snapshot.
+
+    Args:
+        column_names: Labels of the matrix columns for the report (default: positions)
+
+    Returns the full output frame on `index` (identical to a full evaluation).
+    """
+    with snapshot.lock:
+        return _evaluate_incremental(engine, values, dates, index, snapshot, key, column_names)
+
+
+def _evaluate_incremental(engine, values: np.ndarray, dates: np.ndarray, index: pd.Index,
+                          snapshot: OutputSnapshot, key: str,
+                          column_names: Optional[Sequence[str]]) -> pd.DataFrame:
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        values = np.asarray(values, dtype=np.float64)
+    hashes = column_hashes(values)
+    # Output definitions, temporal switches and the value precision are part of the key:
+    # changed criteria or a switch to/from compact mode invalidate the snapshot
+    key = input_key(key, engine.definitions, engine.switches, str(values.dtype))
+    stored = snapshot.load(key)
+
+    start = 0
+    n_common = 0
+    changed_columns = list(range(values.shape[1]))
+    if (stored is not None and list(stored['outputs'].columns) == engine.output_names
+            and len(stored['column_hashes']) == len(hashes)):
+        # Revisions are detected over the rows both runs share; appended rows are new, not revised
+        n_common = min(len(stored['dates']), len(dates))
+        old_hashes = (stored['column_hashes'] if n_common == len(stored['dates'])
+                      else column_hashes(stored['values'][:n_common]))
+        new_hashes = hashes if n_common == len(dates) else column_hashes(values[:n_common])
+        changed_columns = [position for position, (old, new) in enumerate(zip(old_hashes, new_hashes))
+                           if old != new]
+        start = first_changed_row(stored['dates'][:n_common], stored['values'][:n_common, changed_columns],
+                                  dates[:n_common], values[:n_common, changed_columns])
+
+    affected = engine.affected_outputs(changed_columns)
+    if (stored is not None and engine.switches
+            and not np.array_equal(stored['dates'][start:n_common], dates[start:n_common])):
+        # Same values on different dates: the temporal switch masks move
+        switched = set(engine.switched_outputs())
+        affected = [name for name in engine.output_names if name in switched or name in affected]
+
+    outputs = None
+    conditions: Dict[str, bool] = {}
+    if start > 0:
+        stored_outputs = stored['outputs'].to_numpy(dtype=np.float64)
+        prefix = stored_outputs[:start]
+        parts = [prefix]
+        if start < n_common:
+            # Revised rows: only the outputs referencing changed columns, the others keep their stored values
+            parts.append(engine.evaluate(values[start:n_common], prefix=prefix, only=affected,
+                                         base=stored_outputs[start:n_common], dates=dates[start:n_common]))
+            conditions.update(engine.conditions)
+        if n_common < len(values):
+            # New rows: every output
+            parts.append(engine.evaluate(values[n_common:], prefix=np.vstack(parts), dates=dates[n_common:]))
+            conditions.update(engine.conditions)
+        if all(stored['conditions'].get(condition) == decision for condition, decision in conditions.items()):
+            outputs = np.vstack(parts)
+            logger.info(f"♻️ Incremental update: {len(changed_columns)} changed columns, "
+                        f"recomputed {len(affected) if start < n_common else 0} of {len(engine.output_names)} "
+                        f"outputs over {n_common - start} revised rows, {len(values) - n_common} new rows"
+                        + (f" from {pd.Timestamp(dates[start]).date()}" if start < len(dates) else ""))
+        else:
+            logger.info("🔄 An if_positive decision changed, recomputing full history")
+
+    if outputs is None:
+        start = n_common = 0
+        affected = list(engine.output_names)
+        outputs = engine.evaluate(values, dates=dates)
+        conditions = engine.conditions
+        logger.info(f"🔄 Full computation: {len(values)} rows")
+
+    labels = list(column_names) if column_names is not None else list(range(values.shape[1]))
+    snapshot.last_report = {
+        'changed_columns': [labels[position] for position in changed_columns],
+        'recomputed_outputs': affected if start == 0 or start < n_common else [],
+        'first_changed_row': start,
+        'first_changed_date': pd.Timestamp(dates[start]) if start < len(dates) else None,
+        'new_rows': len(values) - n_common
+    }
+
+    result = pd.DataFrame(outputs, index=index, columns=engine.output_names)
+    if stored is None or start < len(values) or len(stored['dates']) != len(dates):
+        snapshot.save(key, dates, values, result,
+                      conditions if start == 0 else {**stored['conditions'], **conditions}, hashes)
+    return result
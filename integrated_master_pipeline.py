@@ -25,6 +25,8 @@ import warnings
 import os
 from typing import Tuple, Dict, List, Optional
 
+from ticker_registry import load_ticker_registry, ticker_metadata
+
 warnings.filterwarnings('ignore')
 
 # Configure logging
@@ -45,8 +47,8 @@ def extract_bloomberg_tickers_from_use4(file_path='use4.xlsx', sheet_name='Ticke
     """
     logger.info(f"Extracting Bloomberg tickers from {sheet_name} in {file_path}")
     
-    # Load TickerList sheet - skip first 8 rows as indicated in CLAUDE.md
-    df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=8)
+    # Load TickerList sheet - skip first 8 rows as indicated in CLAUDE.md (via the shared registry)
+    df = load_ticker_registry(file_path, sheet_name).table.copy()
     
     logger.info(f"Loaded TickerList with shape: {df.shape}")
     
@@ -77,21 +79,8 @@ def extract_bloomberg_tickers_from_use4(file_path='use4.xlsx', sheet_name='Ticke
     # Process ticker metadata for MultiTicker format
     multiticker_data = []
     
-    for idx, row in bloomberg_df.iterrows():
-        ticker_info = {
-            'ticker': str(row['Ticker']).strip(),
-            'description': str(row.get('Description', '')).strip() if pd.notna(row.get('Description')) else '',
-            'category': str(row.get('Category', '')).strip() if pd.notna(row.get('Category')) else '',
-            'region_from': str(row.get('Region from', '')).strip() if pd.notna(row.get('Region from')) else '',
-            'region_to': str(row.get('Region to', '')).strip() if pd.notna(row.get('Region to')) else '',
-            'units': str(row.get('Units', 'GWh')).strip() if pd.notna(row.get('Units')) else 'GWh',
-            'normalization_factor': row.get('Normalization factor', 1.0) if pd.notna(row.get('Normalization factor')) else 1.0,
-            'positive_negative': str(row.get('Positive/Negative', '')).strip() if pd.notna(row.get('Positive/Negative')) else '',
-            'start_date': str(row.get('Start date', '')).strip() if pd.notna(row.get('Start date')) else '',
-            'other_notes': str(row.get('Other notes or comments', '')).strip() if pd.notna(row.get('Other notes or comments')) else ''
-        }
-        
-        multiticker_data.append(ticker_info)
+    for row in bloomberg_df.to_dict('records'):
+        multiticker_data.append(ticker_metadata(row))
     
     ticker_df = pd.DataFrame(multiticker_data)
     
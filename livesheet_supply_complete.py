@@ -12,9 +12,22 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime
 import time
+from openpyxl.utils import get_column_letter
 
-def replicate_livesheet_supply_complete():
-    """Complete supply replication for entire LiveSheet time series."""
+from multiticker_cache import load_multiticker_sheet
+from sumifs_index import SumifsCriteriaIndex
+from aggregation_engine import COMPACT_TOLERANCE, SUPPLY_ROUTES, AggregationEngine, supply_output_definitions
+from incremental_snapshot import OutputSnapshot, evaluate_incremental, input_key
+
+def replicate_livesheet_supply_complete(incremental=False, snapshot_dir='.supply_snapshot', compact=False):
+    """
+    Complete supply replication for entire LiveSheet time series.
+    
+    With incremental=True only dates from the earliest change since the last
+    incremental run are recomputed (snapshot kept in snapshot_dir).
+    With compact=True the ticker matrix is held in float32 (sums in float64)
+    and the 2017-01-01 Total_Supply rounding bound is checked against 0.01.
+    """
     
     print("🚀 LIVESHEET SUPPLY COMPLETE REPLICATION")
     print("=" * 80)
@@ -24,98 +37,73 @@ def replicate_livesheet_supply_complete():
     
     excel_file = "2025-08-12 - European Gas Supply and Demand Balances LiveSheet (1.8.0).xlsx"
     
-    # Load data
+    # Load data (served from the binary cache unless the workbook changed)
     print("\\n📂 Loading Excel data...")
-    multiticker_df = pd.read_excel(excel_file, sheet_name='MultiTicker', header=None)
-    print(f"  ✓ MultiTicker loaded: {multiticker_df.shape}")
+    multiticker = load_multiticker_sheet(excel_file, 'MultiTicker', compact=compact)
+    print(f"  ✓ MultiTicker loaded: {(multiticker.n_rows, multiticker.n_columns)}")
     
     # Extract dates from column B starting from row 26
-    dates = pd.to_datetime(multiticker_df.iloc[25:, 1], errors='coerce')
+    dates = multiticker.date_series(25)
     valid_dates = dates[dates.notna()]
     print(f"  ✓ Date range: {valid_dates.min().date()} to {valid_dates.max().date()}")
     print(f"  ✓ Total days: {len(valid_dates)}")
     
-    # Define supply routes with criteria
-    supply_routes = [
-        ('Slovakia_Austria', 'Import', 'Slovakia', 'Austria'),
-        ('Russia_NordStream_Germany', 'Import', 'Russia (Nord Stream)', 'Germany'),
-        ('Norway_Europe', 'Import', 'Norway', 'Europe'),
-        ('Netherlands_Production', 'Production', 'Netherlands', 'Netherlands'),
-        ('GB_Production', 'Production', 'GB', 'GB'),
-        ('LNG_Total', 'Import', 'LNG', '*'),
-        ('Algeria_Italy', 'Import', 'Algeria', 'Italy'),
-        ('Libya_Italy', 'Import', 'Libya', 'Italy'),
-        ('Spain_France', 'Import', 'Spain', 'France'),
-        ('Denmark_Germany', 'Import', 'Denmark', 'Germany'),
-        ('Czech_Poland_Germany', 'Import', 'Czech and Poland', 'Germany'),
-        ('Austria_Hungary_Export', 'Export', 'Austria', 'Hungary'),
-        ('Slovenia_Austria', 'Import', 'Slovenia', 'Austria'),
-        ('MAB_Austria', 'Import', 'MAB', 'Austria'),
-        ('TAP_Italy', 'Import', 'TAP', 'Italy'),
-        ('Austria_Production', 'Production', 'Austria', 'Austria'),
-        ('Italy_Production', 'Production', 'Italy', 'Italy'),
-        ('Germany_Production', 'Production', 'Germany', 'Germany')
-    ]
+    # Supply routes with criteria (route, category, region, subcategory)
+    supply_routes = SUPPLY_ROUTES
     
-    # Pre-extract headers for efficiency
+    # Compile header criteria once (rows 14-16, labels stripped as in the SUMIFS match)
     print("\\n🔍 Extracting column headers...")
-    headers_level1 = multiticker_df.iloc[13, 2:].fillna('').astype(str)
-    headers_level2 = multiticker_df.iloc[14, 2:].fillna('').astype(str)
-    headers_level3 = multiticker_df.iloc[15, 2:].fillna('').astype(str)
+    criteria_index = SumifsCriteriaIndex(
+        multiticker.header_row(13),
+        multiticker.header_row(14),
+        multiticker.header_row(15),
+        strip=True
+    )
     
     # Pre-calculate column matches for each route
     print("\\n🗺️ Mapping supply routes to columns...")
     route_column_maps = {}
     
     for route_name, criteria1, criteria2, criteria3 in supply_routes:
-        matching_cols = []
-        
-        for col_idx in range(len(headers_level1)):
-            match1 = headers_level1.iloc[col_idx].strip() == criteria1
-            match2 = headers_level2.iloc[col_idx].strip() == criteria2
-            match3 = (criteria3 == '*') or (headers_level3.iloc[col_idx].strip() == criteria3)
-            
-            if match1 and match2 and match3:
-                matching_cols.append(col_idx + 2)  # Adjust for column offset
+        # Data block starts at column C
+        matching_cols = criteria_index.positions(criteria1, criteria2, criteria3).tolist()
         
         route_column_maps[route_name] = matching_cols
         print(f"  {route_name:<30}: {len(matching_cols):>3} columns")
     
-    # Process all dates efficiently
+    # Process all dates and routes (and Total_Supply) in one aggregation pass
     print("\\n⚙️ Processing time series...")
-    results = pd.DataFrame(index=valid_dates)
-    
-    # Extract data matrix once
-    data_matrix = multiticker_df.iloc[25:25+len(valid_dates), :].values
-    
-    # Process each route
-    for route_name, _, _, _ in supply_routes:
-        route_values = []
-        matching_cols = route_column_maps[route_name]
-        
-        # Vectorized calculation for all dates
-        for i in range(len(valid_dates)):
-            if matching_cols:
-                # Sum values from matching columns
-                row_values = data_matrix[i, matching_cols]
-                # Filter out NaN values and sum
-                valid_values = row_values[~pd.isna(row_values)]
-                route_total = np.sum(valid_values) if len(valid_values) > 0 else 0.0
-            else:
-                route_total = 0.0
-            
-            route_values.append(route_total)
-        
-        results[route_name] = route_values
-        
-        # Show progress
-        route_index = next(i for i, (name, _, _, _) in enumerate(supply_routes) if name == route_name)
-        progress = (route_index + 1) / len(supply_routes) * 100
-        print(f"  Progress: {progress:.0f}% - {route_name} processed")
     
-    # Calculate total supply
-    print("\\n📊 Calculating Total Supply...")
-    results['Total_Supply'] = results.sum(axis=1)
+    # Extract data matrix once (float64, float32 in compact mode; columns C onwards)
+    data_matrix = multiticker.data_block(25, len(valid_dates))
+    
+    # Every route is a column-block sum over its matched columns; no per-date loop
+    engine_start = time.time()
+    engine = AggregationEngine(criteria_index)
+    engine.define_all(supply_output_definitions(supply_routes))
+    if incremental:
+        header_key = input_key(*(multiticker.header_row(row) for row in (13, 14, 15)))
+        sheet_columns = [get_column_letter(position + 3) for position in range(data_matrix.shape[1])]
+        snapshot = OutputSnapshot(snapshot_dir)
+        results = evaluate_incremental(engine, data_matrix, valid_dates.to_numpy(), valid_dates,
+                                       snapshot, header_key, sheet_columns)
+        report = snapshot.last_report
+        print(f"  ✓ Incremental: {len(report['changed_columns'])} changed columns "
+              f"{report['changed_columns'][:10]}, recomputed {report['recomputed_outputs']}")
+    else:
+        results = engine.evaluate_frame(data_matrix, valid_dates)
+    engine_ms = (time.time() - engine_start) * 1000
+    print(f"  ✓ {len(supply_routes)} routes + Total_Supply computed for {len(results)} dates in {engine_ms:.1f} ms")
+    
+    if compact:
+        # float32 storage must not move the validated total by 0.01 or more
+        check_rows = np.flatnonzero(valid_dates.to_numpy() == np.datetime64('2017-01-01'))
+        if len(check_rows):
+            bound = engine.rounding_bound(data_matrix[check_rows])[:, engine.output_names.index('Total_Supply')].max()
+            status = "✓" if bound < COMPACT_TOLERANCE else "❌"
+            print(f"  {status} Compact Total_Supply on 2017-01-01: error bound {bound:.2e} (tolerance {COMPACT_TOLERANCE})")
+        else:
+            print("  ⚠️ 2017-01-01 not in range, compact precision not checked")
     
     # Save results
     output_file = 'livesheet_supply_complete.csv'
@@ -129,10 +117,9 @@ def replicate_livesheet_supply_complete():
     print(f"{'Route':<30} {'Mean':>10} {'Max':>10} {'Min':>10}")
     print("-" * 60)
     
-    for col in results.columns:
-        mean_val = results[col].mean()
-        max_val = results[col].max()
-        min_val = results[col].min()
+    # Column reductions over the whole frame at once
+    stats = results.agg(['mean', 'max', 'min']).T
+    for col, (mean_val, max_val, min_val) in zip(stats.index, stats.to_numpy()):
         print(f"{col:<30} {mean_val:>10.2f} {max_val:>10.2f} {min_val:>10.2f}")
     
     # Show sample of recent data
@@ -141,7 +128,7 @@ def replicate_livesheet_supply_complete():
     
     # Performance metrics
     elapsed_time = time.time() - start_time
-    print(f"\\n⏱️ Processing time: {elapsed_time:.2f} seconds")
+    print(f"\\n⏱️ Processing time: {elapsed_time:.2f} seconds ({elapsed_time * 1000:.0f} ms)")
     print(f"✅ Complete replication successful!")
     
     return results
@@ -17,12 +17,28 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+from multiticker_cache import load_multiticker_sheet
+from sumifs_index import SumifsCriteriaIndex
+from ticker_history_store import TickerHistoryStore
+
 class LiveSheetSupplyReplicator:
-    def __init__(self, excel_file):
+    def __init__(self, excel_file=None, history_store=None):
+        """
+        Args:
+            excel_file: LiveSheet workbook (MultiTicker + 'Daily historic data by category')
+            history_store: Optional ticker history store directory; when given the
+                MultiTicker data is read from the memory-mapped store instead of Excel
+        """
         self.excel_file = excel_file
-        self.multiticker_df = None
+        self.history_store = history_store
+        self.header_rows = None
+        self.data_matrix = None
+        self.dates = None
         self.livesheet_df = None
         self.supply_results = None
+        # Header criteria compiled once per load, and per-criteria route sums
+        self.criteria_index = None
+        self.route_cache = {}
         
         # Define the 18 supply routes with their exact criteria
         self.supply_routes = [
@@ -47,16 +63,32 @@ class LiveSheetSupplyReplicator:
         ]
         
     def load_data(self):
-        """Load MultiTicker and LiveSheet data from Excel."""
+        """Load MultiTicker data (binary cache or history store) and LiveSheet data from Excel."""
         print("📂 Loading Excel data...")
         
-        # Load MultiTicker sheet
-        self.multiticker_df = pd.read_excel(self.excel_file, sheet_name='MultiTicker', header=None)
-        print(f"  ✓ MultiTicker loaded: {self.multiticker_df.shape}")
+        if self.history_store:
+            # Zero-copy read from the memory-mapped ticker history store
+            store = TickerHistoryStore(self.history_store)
+            self.header_rows = store.header_rows()
+            self.data_matrix = store.values
+            self.dates = pd.Series(store.dates)
+            print(f"  ✓ MultiTicker loaded from history store: {store.shape}")
+        else:
+            # Load MultiTicker sheet (served from the binary cache unless the workbook changed)
+            multiticker = load_multiticker_sheet(self.excel_file, 'MultiTicker')
+            self.header_rows = {row: multiticker.header_row(row) for row in (13, 14, 15)}
+            self.data_matrix = multiticker.data_block(25)
+            self.dates = multiticker.date_series(25)
+            print(f"  ✓ MultiTicker loaded: {(multiticker.n_rows, multiticker.n_columns)}")
+        
+        # New headers/data: route column sets must be resolved again
+        self.criteria_index = None
+        self.route_cache = {}
         
         # Load LiveSheet for validation
-        self.livesheet_df = pd.read_excel(self.excel_file, sheet_name='Daily historic data by category', header=None)
-        print(f"  ✓ LiveSheet loaded: {self.livesheet_df.shape}")
+        if self.excel_file and Path(self.excel_file).exists():
+            self.livesheet_df = pd.read_excel(self.excel_file, sheet_name='Daily historic data by category', header=None)
+            print(f"  ✓ LiveSheet loaded: {self.livesheet_df.shape}")
         
         return True
     
@@ -65,14 +97,51 @@ class LiveSheetSupplyReplicator:
         print("📅 Extracting dates...")
         
         # Dates are in column B (index 1) starting from row 26 (index 25)
-        date_series = pd.to_datetime(self.multiticker_df.iloc[25:, 1], errors='coerce')
-        valid_dates = date_series[date_series.notna()]
+        valid_dates = self.dates[self.dates.notna()]
         
         print(f"  ✓ Found {len(valid_dates)} valid dates")
         print(f"  ✓ Date range: {valid_dates.min().date()} to {valid_dates.max().date()}")
         
         return valid_dates
     
+    def resolve_route(self, criteria1, criteria2, criteria3):
+        """
+        Column set and full-history sums for one set of SUMIFS criteria, computed once.
+        
+        Returns a dict with:
+            columns: matched sheet column indices (C = 2), in header order
+            values: route total for every data row (NaN counts as 0)
+            valid: data rows × matched columns mask of non-NaN values
+        """
+        key = (str(criteria1).strip(), str(criteria2).strip(), str(criteria3).strip())
+        if key in self.route_cache:
+            return self.route_cache[key]
+        
+        if self.criteria_index is None:
+            # Criteria rows (14, 15, 16 in Excel = 13, 14, 15 in 0-indexed); stripped labels
+            self.criteria_index = SumifsCriteriaIndex(
+                self.header_rows[13], self.header_rows[14], self.header_rows[15], strip=True
+            )
+        
+        positions = self.criteria_index.positions(*key)
+        # Empty header cells never match (only the wildcard may match a blank region to)
+        positions = np.asarray([
+            offset for offset in positions
+            if self.header_rows[13][offset] != '' and self.header_rows[14][offset] != ''
+            and (key[2] == '*' or self.header_rows[15][offset] != '')
+        ], dtype=np.int64)
+        
+        # Column-major block so row totals add matched columns in header order
+        block = np.asfortranarray(np.asarray(self.data_matrix, dtype=np.float64)[:, positions])
+        valid = ~np.isnan(block)
+        if len(positions) == 0:
+            values = np.zeros(block.shape[0], dtype=np.float64)
+        else:
+            values = np.add.reduce(np.where(valid, block, 0.0), axis=1)
+        
+        self.route_cache[key] = {'columns': positions + 2, 'values': values, 'valid': valid}
+        return self.route_cache[key]
+    
     def apply_sumifs(self, data_row_idx, criteria1, criteria2, criteria3):
         """
         Apply Excel's SUMIFS logic for a specific data row.
@@ -81,42 +150,20 @@ class LiveSheetSupplyReplicator:
         - No scaling factors applied
         - Exact 3-level criteria matching
         - Wildcard support for LNG
-        """
         
-        # Column range: C to end (columns 2 onwards in 0-indexed)
-        start_col = 2
-        end_col = self.multiticker_df.shape[1] - 1
+        The route is resolved for all dates on first use; later calls are lookups.
+        Returns (route_total, matches_found, matched_columns) where only columns
+        with a value on that row count as matches.
+        """
+        route = self.resolve_route(criteria1, criteria2, criteria3)
         
-        # Criteria rows (14, 15, 16 in Excel = 13, 14, 15 in 0-indexed)
-        criteria_rows = [13, 14, 15]
+        # Data matrix starts at row 26 (index 25), column C
+        row = data_row_idx - 25
+        valid = route['valid'][row]
         
-        route_total = 0.0
-        matches_found = 0
-        matched_columns = []
-        
-        for col_idx in range(start_col, end_col + 1):
-            # Get header values
-            header1 = self.multiticker_df.iloc[criteria_rows[0], col_idx] if col_idx < self.multiticker_df.shape[1] else None
-            header2 = self.multiticker_df.iloc[criteria_rows[1], col_idx] if col_idx < self.multiticker_df.shape[1] else None
-            header3 = self.multiticker_df.iloc[criteria_rows[2], col_idx] if col_idx < self.multiticker_df.shape[1] else None
-            
-            # Check criteria matches
-            match1 = str(header1).strip() == str(criteria1).strip() if pd.notna(header1) else False
-            match2 = str(header2).strip() == str(criteria2).strip() if pd.notna(header2) else False
-            
-            # Handle wildcard for criteria3 (LNG case)
-            if str(criteria3).strip() == '*':
-                match3 = True
-            else:
-                match3 = str(header3).strip() == str(criteria3).strip() if pd.notna(header3) else False
-            
-            if match1 and match2 and match3:
-                # Get data value - NO SCALING APPLIED
-                data_value = self.multiticker_df.iloc[data_row_idx, col_idx]
-                if pd.notna(data_value):
-                    route_total += float(data_value)
-                    matches_found += 1
-                    matched_columns.append(col_idx)
+        route_total = float(route['values'][row])
+        matches_found = int(valid.sum())
+        matched_columns = route['columns'][valid].tolist()
         
         return route_total, matches_found, matched_columns
     
@@ -138,20 +185,14 @@ class LiveSheetSupplyReplicator:
             print(f"\\n📊 Processing {route_name}:")
             print(f"   Criteria: {criteria[0]} | {criteria[1]} | {criteria[2]}")
             
-            route_values = []
+            # Resolve the column set once and sum every date in one step
+            route = self.resolve_route(criteria[0], criteria[1], criteria[2])
+            route_values = route['values'][:len(dates)]
             
-            # Process each date
-            for i, date in enumerate(dates):
-                # MultiTicker data starts at row 26 (index 25)
-                data_row_idx = 25 + i
-                
-                # Apply SUMIFS
-                value, matches, cols = self.apply_sumifs(data_row_idx, criteria[0], criteria[1], criteria[2])
-                route_values.append(value)
-                
-                # Show progress for first date
-                if i == 0:
-                    print(f"   First date ({date.date()}): {value:.2f} MCM/d ({matches} columns)")
+            # Show progress for first date
+            if len(dates):
+                value, matches, cols = self.apply_sumifs(25, criteria[0], criteria[1], criteria[2])
+                print(f"   First date ({dates.iloc[0].date()}): {value:.2f} MCM/d ({matches} columns)")
             
             # Store results
             self.supply_results[route_name] = route_values
@@ -176,6 +217,10 @@ class LiveSheetSupplyReplicator:
         """Validate replicated values against LiveSheet."""
         print("\\n🔍 Validating against LiveSheet...")
         
+        if self.livesheet_df is None:
+            print("  ⚠️ LiveSheet not loaded, skipping validation")
+            return []
+        
         if test_dates is None:
             # Default test dates
             test_dates = ['2017-01-01', '2016-10-08', '2016-12-31']
@@ -34,6 +34,8 @@ except NameError:
     
 sys.path.insert(0, str(current_dir))
 
+from ticker_registry import load_ticker_registry
+
 # Configure comprehensive logging
 logging.basicConfig(
     level=logging.INFO,
@@ -121,8 +123,8 @@ def extract_bloomberg_tickers():
         # Load ticker configuration
         logger.info("📂 Loading use4.xlsx ticker configuration...")
         
-        # Read the TickerList sheet (skip first 8 rows as per CLAUDE.md)
-        tickers_df = pd.read_excel('use4.xlsx', sheet_name='TickerList', skiprows=8)
+        # Read the TickerList sheet (skip first 8 rows as per CLAUDE.md) via the shared registry
+        tickers_df = load_ticker_registry('use4.xlsx').table.copy()
         logger.info(f"✅ Loaded ticker configuration: {tickers_df.shape}")
         
         # Extract Bloomberg tickers from the 'Ticker' column (column B)
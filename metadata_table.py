@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Immutable Categorical Metadata Table
+====================================
+
+Column metadata used to be a dict of dicts
+({'Col_n': {'category', 'region', 'subcategory', ...}}), matched with string
+comparisons per column per call and corrected by mutating the nested dicts.
+
+MetadataTable stores the same information column-wise:
+
+- vocabulary : every distinct label / attribute value, interned once
+- fields     : one read-only int32 code array per field (-1 = not set)
+
+Criteria matching compares integer codes over arrays; string predicates
+(lowercase, substring, ...) are evaluated once per vocabulary entry instead of
+once per column. Tables never change: corrections derive a new table that
+shares every field array it does not modify, so repeated reshuffles neither
+copy nor corrupt the original.
+
+The table is also a read-only Mapping (column -> field proxy), so code that
+reads metadata[col]['subcategory'] or iterates metadata.items() keeps working.
+
+Usage:
+    table = MetadataTable.from_labels(columns, categories, regions, subcategories)
+    zebra = table.match('subcategory', lambda label: label.lower() == 'zebra')
+    corrected = table.assign(zebra, subcategory='Industrial', original_subcategory='Zebra')
+"""
+
+import hashlib
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Callable, Dict, Hashable, Iterator, Sequence, Tuple
+
+import numpy as np
+
+# Criteria fields, always present and listed first
+LABEL_FIELDS = ('category', 'region', 'subcategory')
+
+MISSING = -1
+
+
+def _internable(value) -> Hashable:
+    """Lists (e.g. cutoff dates) are stored as tuples so they can be interned."""
+    if isinstance(value, list):
+        return tuple(_internable(item) for item in value)
+    return value
+
+
+def _key(value) -> Hashable:
+    """Interning key; the type is part of it so that True, 1 and 1.0 stay distinct."""
+    return type(value), value
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class MetadataTable(Mapping):
+    """
+    Immutable, integer-coded column metadata.
+
+    Positions refer to the order of `columns`. Field values are decoded from
+    the shared vocabulary on access; absent values (code -1) are omitted from
+    a column's mapping, like a missing key in the old per-column dicts.
+    """
+
+    def __init__(self, columns: Sequence[str], fields: Dict[str, np.ndarray], vocabulary: Sequence):
+        """
+        Args:
+            columns: Column names, one per position
+            fields: {field: int32 codes into vocabulary (-1 = not set)}
+            vocabulary: Interned values (append-only between derived tables)
+        """
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.vocabulary: Tuple = tuple(vocabulary)
+        self._fields: Dict[str, np.ndarray] = {}
+        for field in LABEL_FIELDS:
+            if field not in fields:
+                fields = {**fields, field: np.full(len(self.columns), MISSING, dtype=np.int32)}
+        for field in LABEL_FIELDS + tuple(name for name in fields if name not in LABEL_FIELDS):
+            codes = np.asarray(fields[field], dtype=np.int32)
+            if codes.shape != (len(self.columns),):
+                raise ValueError(f"Field '{field}' has {codes.shape} codes for {len(self.columns)} columns")
+            self._fields[field] = codes if not codes.flags.writeable else _frozen(codes.copy())
+
+        self._codes = {_key(value): code for code, value in enumerate(self.vocabulary)}
+        self._positions = {col: position for position, col in enumerate(self.columns)}
+        self._fingerprints: Dict[Tuple[str, ...], str] = {}
+
+    # ------------------------------------------------------------ construction
+
+    @classmethod
+    def from_labels(cls, columns: Sequence[str], categories: Sequence, regions: Sequence,
+                    subcategories: Sequence) -> 'MetadataTable':
+        """Table of the three criteria fields from aligned header label lists."""
+        vocabulary: Dict[Hashable, int] = {}
+        fields = {}
+        for field, labels in zip(LABEL_FIELDS, (categories, regions, subcategories)):
+            fields[field] = np.fromiter((vocabulary.setdefault(_key(label), len(vocabulary)) for label in labels),
+                                        dtype=np.int32, count=len(columns))
+        return cls(columns, fields, [value for _, value in vocabulary])
+
+    @classmethod
+    def from_dict(cls, metadata: Dict[str, Dict]) -> 'MetadataTable':
+        """Table from a {column: {field: value}} dict (the dict is not kept)."""
+        if isinstance(metadata, MetadataTable):
+            return metadata
+
+        columns = list(metadata)
+        vocabulary: Dict[Hashable, int] = {}
+        fields: Dict[str, np.ndarray] = {
+            field: np.full(len(columns), MISSING, dtype=np.int32) for field in LABEL_FIELDS
+        }
+        for position, col in enumerate(columns):
+            for field, value in metadata[col].items():
+                if field not in fields:
+                    fields[field] = np.full(len(columns), MISSING, dtype=np.int32)
+                fields[field][position] = vocabulary.setdefault(_key(_internable(value)), len(vocabulary))
+        return cls(columns, fields, [value for _, value in vocabulary])
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Independent {column: {field: value}} dicts (for code that still edits metadata)."""
+        return {col: dict(self[col]) for col in self.columns}
+
+    # ----------------------------------------------------------------- mapping
+
+    def __getitem__(self, col: str) -> MappingProxyType:
+        position = self._positions[col]
+        return MappingProxyType({
+            field: self.vocabulary[codes[position]]
+            for field, codes in self._fields.items() if codes[position] != MISSING
+        })
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __contains__(self, col) -> bool:
+        return col in self._positions
+
+    def __repr__(self) -> str:
+        return f"MetadataTable({len(self.columns)} columns, {len(self._fields)} fields, {len(self.vocabulary)} labels)"
+
+    # ---------------------------------------------------------------- columnar
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(self._fields)
+
+    def position(self, col: str) -> int:
+        return self._positions[col]
+
+    def codes(self, field: str) -> np.ndarray:
+        """Read-only code array of a field (all -1 if the field was never set)."""
+        codes = self._fields.get(field)
+        if codes is None:
+            return _frozen(np.full(len(self.columns), MISSING, dtype=np.int32))
+        return codes
+
+    def code(self, value) -> int:
+        """Code of an interned value, -1 if it does not occur in the table."""
+        try:
+            return self._codes.get(_key(_internable(value)), MISSING)
+        except TypeError:
+            return MISSING
+
+    def values(self, field: str) -> np.ndarray:
+        """Decoded values of a field as an object array (None where not set)."""
+        lookup = np.empty(len(self.vocabulary) + 1, dtype=object)
+        for code, value in enumerate(self.vocabulary):
+            lookup[code] = value
+        return lookup[self.codes(field)]
+
+    def equals(self, field: str, value) -> np.ndarray:
+        """Boolean column mask: field == value (integer comparison)."""
+        code = self.code(value)
+        if code == MISSING:
+            return np.zeros(len(self.columns), dtype=bool)
+        return self.codes(field) == code
+
+    def match(self, field: str, predicate: Callable[[object], bool]) -> np.ndarray:
+        """
+        Boolean column mask of the columns whose field value satisfies
+        predicate; the predicate runs once per vocabulary entry, never per
+        column (unset values never match).
+        """
+        accepted = np.zeros(len(self.vocabulary) + 1, dtype=bool)
+        for code, value in enumerate(self.vocabulary):
+            accepted[code] = bool(predicate(value))
+        return accepted[self.codes(field)]
+
+    def label_codes(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (category, region, subcategory) codes used for SUMIFS criteria; a set
+        'corrected_category' overrides the subcategory.
+        """
+        subcategory = self.codes('subcategory')
+        corrected = self.codes('corrected_category')
+        override = corrected != MISSING
+        if override.any():
+            # Falsy corrected values ('' or None) do not override
+            truthy = np.array([bool(value) for value in self.vocabulary] + [False], dtype=bool)
+            override &= truthy[corrected]
+            subcategory = np.where(override, corrected, subcategory)
+        return self.codes('category'), self.codes('region'), subcategory
+
+    def positions(self, category, region, subcategory=None) -> np.ndarray:
+        """Column positions matching the criteria (subcategory None matches any)."""
+        categories, regions, subcategories = self.label_codes()
+        mask = (categories == self.code(category)) & (regions == self.code(region))
+        if subcategory is not None:
+            mask &= subcategories == self.code(subcategory)
+        return np.flatnonzero(mask)
+
+    # ---------------------------------------------------------------- deriving
+
+    def assign(self, mask: np.ndarray, **values) -> 'MetadataTable':
+        """
+        New table with the given field values set on the masked columns.
+
+        Field arrays that are not assigned are shared with this table; the
+        vocabulary is extended with any new values.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if not values or not mask.any():
+            return self
+
+        vocabulary = list(self.vocabulary)
+        codes = dict(self._codes)
+        fields = dict(self._fields)
+        for field, value in values.items():
+            value = _internable(value)
+            if _key(value) not in codes:
+                codes[_key(value)] = len(vocabulary)
+                vocabulary.append(value)
+            updated = self.codes(field).copy()
+            updated[mask] = codes[_key(value)]
+            fields[field] = _frozen(updated)
+        return MetadataTable(self.columns, fields, vocabulary)
+
+    def assign_codes(self, field: str, codes: np.ndarray) -> 'MetadataTable':
+        """New table with a whole field replaced by codes into this table's vocabulary."""
+        fields = dict(self._fields)
+        fields[field] = _frozen(np.asarray(codes, dtype=np.int32).copy())
+        return MetadataTable(self.columns, fields, self.vocabulary)
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the whole table (columns, fields and decoded values)."""
+        return self.fields_fingerprint(self.fields)
+
+    def fields_fingerprint(self, fields: Sequence[str]) -> str:
+        """Content hash of the columns and the given fields, computed once per field set."""
+        fields = tuple(fields)
+        if fields not in self._fingerprints:
+            digest = hashlib.sha1()
+            digest.update(repr(self.columns).encode('utf-8'))
+            for field in fields:
+                codes = self.codes(field)
+                if (codes == MISSING).all():
+                    continue
+                # Decoded, so equal content gives equal fingerprints whatever the code numbering
+                used, inverse = np.unique(codes, return_inverse=True)
+                digest.update(repr((field, [None if code == MISSING else self.vocabulary[code]
+                                            for code in used.tolist()])).encode('utf-8'))
+                digest.update(np.ascontiguousarray(inverse, dtype=np.int32).tobytes())
+            self._fingerprints[fields] = digest.hexdigest()
+        return self._fingerprints[fields]
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Declarative Metric Expressions
+==============================
+
+Derived metrics are defined as one-line expressions over SUMIFS terms and
+other metrics instead of hand-coded pandas arithmetic:
+
+    Germany_Total      = SUMIFS("Demand", "Germany", "Industrial and Power")
+    Germany_GtP        = SUMIFS("Intermediate Calculation", "#Germany", "Gas-to-Power")
+    Germany_Industrial = Germany_Total - Germany_GtP
+    France_LDZ         = IF_POSITIVE(SUMIFS("Demand", "France", "LDZ"))
+    Net_Imports        = SUMIFS("Import", "LNG") - SUMIFS("Export", "Austria")
+
+Supported syntax: metric names, numbers, + - * /, unary minus, parentheses,
+SUMIFS(category, region[, subcategory]) ('*' or no subcategory = 2 criteria)
+and IF_POSITIVE(expr) (the expression if it sums to more than zero over the
+history, else 0).
+
+Definitions compile into a dependency graph (DAG):
+- identical sub-expressions (and repeated SUMIFS terms) become one node
+- every SUMIFS leaf is evaluated in a single AggregationEngine multiply, so
+  adding metrics never adds passes over the ticker matrix
+- nodes are grouped into levels of mutually independent nodes, which can be
+  evaluated on a thread pool
+- node results are cached per value matrix and reused by later evaluations
+
+Usage:
+    graph = MetricGraph.from_file('metrics.txt')
+    metrics = pipeline.evaluate_metrics(data_df, metadata, graph)
+"""
+
+import ast
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from aggregation_engine import AggregationEngine, SumifsTerm
+from sumifs_index import SumifsCriteriaIndex
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+_OPERATORS = {
+    ast.Add: ('add', np.add),
+    ast.Sub: ('sub', np.subtract),
+    ast.Mult: ('mul', np.multiply),
+    ast.Div: ('div', np.divide),
+}
+
+
+def _strip_comment(line: str) -> str:
+    """Drop a trailing '#' comment ('#' inside quoted criteria such as "#Germany" is kept)."""
+    quote = None
+    for position, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '#':
+            return line[:position]
+    return line
+
+
+def parse_metric_definitions(definitions: Union[str, Dict[str, str], Sequence[str]]) -> Dict[str, str]:
+    """
+    Normalize metric definitions to {name: expression}, keeping their order.
+
+    Accepts a dict, a list of "name = expression" lines, or a text block of
+    such lines ('#' outside quotes starts a comment, blank lines are ignored).
+    """
+    if isinstance(definitions, dict):
+        return dict(definitions)
+
+    lines = definitions.splitlines() if isinstance(definitions, str) else list(definitions)
+    parsed: Dict[str, str] = {}
+    for line_no, line in enumerate(lines, 1):
+        line = _strip_comment(line).strip()
+        if not line:
+            continue
+        if '=' not in line:
+            raise ValueError(f"Line {line_no}: expected 'name = expression', got {line!r}")
+        name, expression = (part.strip() for part in line.split('=', 1))
+        if not name.isidentifier():
+            raise ValueError(f"Line {line_no}: invalid metric name {name!r}")
+        if name in parsed:
+            raise ValueError(f"Line {line_no}: metric '{name}' defined twice")
+        parsed[name] = expression
+    return parsed
+
+
+class MetricGraph:
+    """
+    Compiled metric definitions as a DAG of shared nodes.
+
+    Nodes are tuples:
+        ('sumifs', category, region, subcategory)
+        ('const', value)
+        (op, left_id, right_id)      op in add / sub / mul / div
+        ('neg', child_id)
+        ('if_positive', child_id)
+    """
+
+    def __init__(self, definitions: Union[str, Dict[str, str], Sequence[str]]):
+        """
+        Args:
+            definitions: {name: expression}, "name = expression" lines or a text block
+        """
+        self.expressions = parse_metric_definitions(definitions)
+        self.nodes: List[tuple] = []
+        self.node_ids: Dict[tuple, int] = {}
+        self.metrics: Dict[str, int] = {}
+        self._cache_source = None
+        self._cache: Dict[int, np.ndarray] = {}
+
+        for name in self.expressions:
+            self._compile_metric(name, ())
+
+        self.levels = self._build_levels()
+        logger.debug(f"Compiled {len(self.metrics)} metrics into {len(self.nodes)} nodes, "
+                     f"{len(self.levels)} levels")
+
+    @classmethod
+    def from_file(cls, path: str) -> 'MetricGraph':
+        """Compile definitions from a text file of "name = expression" lines."""
+        with open(path) as handle:
+            return cls(handle.read())
+
+    # ------------------------------------------------------------------ compile
+
+    def _node(self, key: tuple) -> int:
+        """Id of a node, shared by every identical sub-expression."""
+        if key not in self.node_ids:
+            self.node_ids[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.node_ids[key]
+
+    def _compile_metric(self, name: str, stack: tuple) -> int:
+        if name in self.metrics:
+            return self.metrics[name]
+        if name in stack:
+            raise ValueError(f"Circular metric definition: {' -> '.join(stack + (name,))}")
+        if name not in self.expressions:
+            raise ValueError(f"Unknown metric '{name}'" + (f" (used by '{stack[-1]}')" if stack else ''))
+
+        try:
+            tree = ast.parse(self.expressions[name], mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Metric '{name}': invalid expression ({e.msg})") from None
+
+        node_id = self._compile_expression(tree.body, name, stack + (name,))
+        self.metrics[name] = node_id
+        return node_id
+
+    def _compile_expression(self, expr: ast.AST, name: str, stack: tuple) -> int:
+        if isinstance(expr, ast.Name):
+            return self._compile_metric(expr.id, stack)
+
+        if isinstance(expr, ast.Constant) and isinstance(expr.value, (int, float)) and not isinstance(expr.value, bool):
+            return self._node(('const', float(expr.value)))
+
+        if isinstance(expr, ast.BinOp) and type(expr.op) in _OPERATORS:
+            left = self._compile_expression(expr.left, name, stack)
+            right = self._compile_expression(expr.right, name, stack)
+            return self._node((_OPERATORS[type(expr.op)][0], left, right))
+
+        if isinstance(expr, ast.UnaryOp) and isinstance(expr.op, (ast.USub, ast.UAdd)):
+            child = self._compile_expression(expr.operand, name, stack)
+            return child if isinstance(expr.op, ast.UAdd) else self._node(('neg', child))
+
+        if isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name) and not expr.keywords:
+            function = expr.func.id.upper()
+            if function == 'SUMIFS':
+                criteria = [arg.value for arg in expr.args
+                            if isinstance(arg, ast.Constant) and isinstance(arg.value, str)]
+                if len(criteria) != len(expr.args) or len(criteria) not in (2, 3):
+                    raise ValueError(f"Metric '{name}': SUMIFS takes 2 or 3 string criteria")
+                subcategory = criteria[2] if len(criteria) == 3 and criteria[2].strip() != '*' else None
+                return self._node(('sumifs', criteria[0], criteria[1], subcategory))
+            if function == 'IF_POSITIVE':
+                if len(expr.args) != 1:
+                    raise ValueError(f"Metric '{name}': IF_POSITIVE takes one argument")
+                return self._node(('if_positive', self._compile_expression(expr.args[0], name, stack)))
+
+        raise ValueError(f"Metric '{name}': unsupported expression {ast.unparse(expr)!r}")
+
+    @staticmethod
+    def _children(node: tuple) -> tuple:
+        if node[0] in ('sumifs', 'const'):
+            return ()
+        return node[1:]
+
+    def _build_levels(self) -> List[List[int]]:
+        """Group non-leaf nodes so each level only depends on earlier levels."""
+        depth: Dict[int, int] = {}
+        for node_id, node in enumerate(self.nodes):
+            # Children are always created before their parents
+            children = self._children(node)
+            depth[node_id] = 0 if not children else 1 + max(depth[child] for child in children)
+
+        levels: Dict[int, List[int]] = {}
+        for node_id, level in depth.items():
+            if level > 0:
+                levels.setdefault(level, []).append(node_id)
+        return [levels[level] for level in sorted(levels)]
+
+    # ----------------------------------------------------------------- evaluate
+
+    def required_nodes(self, metrics: Optional[Sequence[str]] = None) -> set:
+        """Node ids needed for the given metrics (all metrics by default)."""
+        names = list(self.metrics) if metrics is None else list(metrics)
+        for name in names:
+            if name not in self.metrics:
+                raise KeyError(f"Unknown metric '{name}'")
+
+        required = set()
+        pending = [self.metrics[name] for name in names]
+        while pending:
+            node_id = pending.pop()
+            if node_id not in required:
+                required.add(node_id)
+                pending.extend(self._children(self.nodes[node_id]))
+        return required
+
+    def _apply(self, node: tuple, results: Dict[int, np.ndarray], n_rows: int) -> np.ndarray:
+        kind = node[0]
+        if kind == 'const':
+            return np.full(n_rows, node[1], dtype=np.float64)
+        if kind == 'neg':
+            return -results[node[1]]
+        if kind == 'if_positive':
+            component = results[node[1]]
+            return component if component.sum() > 0 else np.zeros(n_rows, dtype=np.float64)
+
+        operator = next(function for label, function in _OPERATORS.values() if label == kind)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return operator(results[node[1]], results[node[2]])
+
+    def evaluate(self, index: SumifsCriteriaIndex, values: np.ndarray, row_index: Optional[pd.Index] = None,
+                 metrics: Optional[Sequence[str]] = None, max_workers: int = 1) -> pd.DataFrame:
+        """
+        Evaluate metrics over a value matrix.
+
+        Args:
+            index: Criteria index over the columns of `values`
+            values: float matrix (dates × indexed columns)
+            row_index: Index of the returned frame (default RangeIndex)
+            metrics: Metrics to return (default: all, in definition order)
+            max_workers: Threads per level of independent nodes (1 = serial)
+
+        Returns:
+            DataFrame with one column per metric
+        """
+        # Intermediates stay valid while the same matrix and criteria index are used
+        source = self._cache_source
+        if source is None or source[0] is not values or source[1] is not index:
+            self._cache_source = (values, index)
+            self._cache = {}
+        results = self._cache
+        n_rows = values.shape[0]
+
+        required = self.required_nodes(metrics)
+
+        # All missing SUMIFS leaves in one aggregation pass
+        leaves = [node_id for node_id in sorted(required)
+                  if self.nodes[node_id][0] == 'sumifs' and node_id not in results]
+        if leaves:
+            engine = AggregationEngine(index)
+            for node_id in leaves:
+                engine.define(f'__node_{node_id}', [SumifsTerm(*self.nodes[node_id][1:])])
+            leaf_values = engine.evaluate(values)
+            for column, node_id in enumerate(leaves):
+                results[node_id] = np.ascontiguousarray(leaf_values[:, column])
+        for node_id in required:
+            if self.nodes[node_id][0] == 'const' and node_id not in results:
+                results[node_id] = self._apply(self.nodes[node_id], results, n_rows)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            for level in self.levels:
+                pending = [node_id for node_id in level if node_id in required and node_id not in results]
+                if executor is not None and len(pending) > 1:
+                    computed = list(executor.map(lambda node_id: self._apply(self.nodes[node_id], results, n_rows),
+                                                 pending))
+                else:
+                    computed = [self._apply(self.nodes[node_id], results, n_rows) for node_id in pending]
+                results.update(zip(pending, computed))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        names = list(self.metrics) if metrics is None else list(metrics)
+        return pd.DataFrame({name: results[self.metrics[name]] for name in names}, index=row_index)
+
+    def clear_cache(self):
+        """Drop cached intermediates."""
+        self._cache_source = None
+        self._cache = {}
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+MultiTicker Binary Cache
+========================
+
+Parsing the MultiTicker sheet with pd.read_excel dominates the wall-clock time of
+both the demand pipeline (use4.xlsx) and the supply replication (LiveSheet).
+This module converts the sheet once into a compact binary form:
+
+- values.npy  : float64 matrix of the data block (rows from 21, columns C onwards)
+- dates.npy   : datetime64 vector from column B for the same rows
+- meta.json   : header rows 14-20 (0-indexed 13-19), sheet shape and the
+                workbook fingerprint (path, size, mtime, SHA-256)
+
+Later loads are served from the cache. A workbook whose size/mtime changed is
+re-hashed; if the content hash differs the cache is stale and is rebuilt.
+
+compact=True serves the data block as float32 (half the resident memory of
+the float64 matrix); the cache itself always keeps full precision.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CACHE_DIR_NAME = '.multiticker_cache'
+
+# Header rows 14-20 in Excel (13-19 0-indexed): category, region, subcategory, ...
+HEADER_ROWS = range(13, 20)
+
+# Data block starts at row 21 in Excel (20 0-indexed). The LiveSheet uses row 26,
+# callers slice further with date_series()/data_block().
+DATA_START_ROW = 20
+
+# Column B holds dates, ticker columns start at column C
+DATE_COLUMN = 1
+FIRST_DATA_COLUMN = 2
+
+
+class MultiTickerSheet:
+    """
+    Parsed MultiTicker sheet: header rows, date vector and data block
+    (float64, or float32 when loaded in compact mode).
+
+    Row arguments use the same 0-indexed row numbers as
+    pd.read_excel(..., header=None).iloc, so existing slicing logic carries over.
+    """
+
+    def __init__(self, headers: Dict[int, List[str]], dates: np.ndarray,
+                 values: np.ndarray, n_columns: int):
+        self.headers = headers
+        self.dates = dates
+        self.values = values
+        self.n_columns = n_columns
+
+    @property
+    def n_rows(self) -> int:
+        """Total number of sheet rows (header area + data block)."""
+        return DATA_START_ROW + len(self.dates)
+
+    def header_row(self, row: int) -> List[str]:
+        """Return header strings for columns C onwards ('' for empty cells)."""
+        return self.headers[row]
+
+    def date_series(self, first_row: int = DATA_START_ROW) -> pd.Series:
+        """
+        Column B from first_row onwards, equivalent to
+        pd.to_datetime(df.iloc[first_row:, 1], errors='coerce').
+        """
+        offset = first_row - DATA_START_ROW
+        return pd.Series(
+            self.dates[offset:],
+            index=pd.RangeIndex(first_row, self.n_rows),
+            name=DATE_COLUMN
+        )
+
+    def data_block(self, first_row: int = DATA_START_ROW, n_rows: Optional[int] = None) -> np.ndarray:
+        """Data rows from first_row (columns C onwards)."""
+        offset = first_row - DATA_START_ROW
+        stop = None if n_rows is None else offset + n_rows
+        return self.values[offset:stop]
+
+
+def file_fingerprint(file_path: str) -> Dict:
+    """Cheap fingerprint of a workbook: absolute path, size and mtime."""
+    stat = os.stat(file_path)
+    return {
+        'path': str(Path(file_path).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+
+def content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the workbook contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _header_text(value) -> str:
+    """Header cell as string, '' for empty cells (integral floats print as ints, like pandas)."""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if np.isnan(value):
+            return ''
+        if value.is_integer():
+            value = int(value)
+    return str(value)
+
+
+def _cell_to_float(value) -> float:
+    """Numeric value of a data cell, NaN if it is not numeric (pd.to_numeric(errors='coerce'))."""
+    value_type = type(value)
+    if value_type is float or value_type is int or value_type is bool:
+        return float(value)
+    if value_type is str:
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def _used_width(row: tuple) -> int:
+    """Number of columns up to and including the last non-empty cell."""
+    for idx in range(len(row) - 1, -1, -1):
+        if row[idx] is not None:
+            return idx + 1
+    return 0
+
+
+def parse_multiticker_sheet(file_path: str, sheet_name: str = 'MultiTicker') -> MultiTickerSheet:
+    """
+    Parse the MultiTicker sheet from Excel into a MultiTickerSheet.
+
+    Single streaming pass over the read-only worksheet: header rows are kept as
+    strings, data rows go straight into a preallocated float64 matrix and a date
+    vector. Trailing empty rows/columns are trimmed as pd.read_excel would.
+    """
+    logger.info(f"📂 Parsing {sheet_name} from {file_path}")
+
+    import openpyxl
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+
+    try:
+        ws = wb[sheet_name]
+
+        # Preallocate from the sheet dimension; grow if the dimension is missing or wrong
+        n_cols = max((ws.max_column or 0) - FIRST_DATA_COLUMN, 1)
+        capacity = max((ws.max_row or 0) - DATA_START_ROW, 1024)
+        values = np.full((capacity, n_cols), np.nan)
+        raw_dates = []
+        raw_headers = {}
+
+        width = 0
+        last_row = -1
+
+        for row_idx, row in enumerate(ws.iter_rows(values_only=True)):
+            used = _used_width(row)
+            if used:
+                width = max(width, used)
+                last_row = row_idx
+
+            if row_idx < DATA_START_ROW:
+                if row_idx in HEADER_ROWS:
+                    raw_headers[row_idx] = row[FIRST_DATA_COLUMN:]
+                continue
+
+            data_idx = row_idx - DATA_START_ROW
+            if data_idx >= values.shape[0] or used - FIRST_DATA_COLUMN > values.shape[1]:
+                values = _grow(values, data_idx + 1, used - FIRST_DATA_COLUMN)
+
+            raw_dates.append(row[DATE_COLUMN] if len(row) > DATE_COLUMN else None)
+
+            target = values[data_idx]
+            for col_idx in range(FIRST_DATA_COLUMN, used):
+                value = row[col_idx]
+                if value is not None:
+                    target[col_idx - FIRST_DATA_COLUMN] = _cell_to_float(value)
+    finally:
+        wb.close()
+
+    n_data_cols = max(width - FIRST_DATA_COLUMN, 0)
+    n_data_rows = max(last_row + 1 - DATA_START_ROW, 0)
+
+    headers = {}
+    for row in HEADER_ROWS:
+        cells = raw_headers.get(row, ())
+        headers[row] = [_header_text(cells[i] if i < len(cells) else None) for i in range(n_data_cols)]
+
+    dates = pd.to_datetime(pd.Series(raw_dates[:n_data_rows], dtype=object), errors='coerce')
+
+    return MultiTickerSheet(
+        headers=headers,
+        dates=dates.values.astype('datetime64[ns]'),
+        values=np.ascontiguousarray(values[:n_data_rows, :n_data_cols]),
+        n_columns=width
+    )
+
+
+def _grow(values: np.ndarray, min_rows: int, min_cols: int) -> np.ndarray:
+    """Return a NaN-padded copy of values with at least the requested shape."""
+    rows = values.shape[0] if min_rows <= values.shape[0] else max(min_rows, 2 * values.shape[0])
+    cols = max(values.shape[1], min_cols)
+    grown = np.full((rows, cols), np.nan)
+    grown[:values.shape[0], :values.shape[1]] = values
+    return grown
+
+
+class MultiTickerCache:
+    """
+    Binary cache for MultiTicker sheets with automatic invalidation.
+
+    Each (workbook, sheet) pair gets its own directory under
+    <workbook dir>/.multiticker_cache/.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, verify_content: bool = False):
+        """
+        Args:
+            cache_dir: Override cache root (default: next to the workbook)
+            verify_content: Always re-hash the workbook, even if size/mtime match
+        """
+        self.cache_dir = cache_dir
+        self.verify_content = verify_content
+
+    # Rebuilds are serialized process-wide: concurrent loads of a stale workbook parse it once
+    _build_lock = threading.Lock()
+
+    def entry_dir(self, file_path: str, sheet_name: str) -> Path:
+        """Cache directory for a workbook/sheet pair."""
+        workbook = Path(file_path).resolve()
+        root = Path(self.cache_dir) if self.cache_dir else workbook.parent / CACHE_DIR_NAME
+        return root / f"{workbook.stem}__{sheet_name}".replace(' ', '_')
+
+    def read_sidecar(self, file_path: str, sheet_name: str) -> Optional[Dict]:
+        """Return cache metadata, or None if no usable cache exists."""
+        meta_file = self.entry_dir(file_path, sheet_name) / 'meta.json'
+        if not meta_file.exists():
+            return None
+        try:
+            with open(meta_file) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION or meta.get('sheet_name') != sheet_name:
+            return None
+        return meta
+
+    def is_fresh(self, file_path: str, sheet_name: str = 'MultiTicker') -> bool:
+        """
+        Check the cache against the workbook.
+
+        Size/mtime match is trusted unless verify_content is set; otherwise the
+        content hash decides. A touched but unchanged workbook keeps its cache.
+        """
+        meta = self.read_sidecar(file_path, sheet_name)
+        if meta is None:
+            return False
+
+        fingerprint = file_fingerprint(file_path)
+        if meta['source']['path'] != fingerprint['path'] or meta['source']['size'] != fingerprint['size']:
+            return False
+
+        if meta['source']['mtime_ns'] == fingerprint['mtime_ns'] and not self.verify_content:
+            return True
+
+        if content_hash(file_path) != meta['source']['sha256']:
+            return False
+
+        # Same content, new mtime: refresh the sidecar so the next check is cheap
+        meta['source']['mtime_ns'] = fingerprint['mtime_ns']
+        self._write_json(self.entry_dir(file_path, sheet_name) / 'meta.json', meta)
+        return True
+
+    def load(self, file_path: str, sheet_name: str = 'MultiTicker', compact: bool = False) -> MultiTickerSheet:
+        """
+        Load a MultiTicker sheet, rebuilding the cache if it is missing or stale.
+
+        With compact=True the data block is returned as float32.
+        """
+        if self.is_fresh(file_path, sheet_name):
+            try:
+                sheet = self._read_entry(file_path, sheet_name, compact)
+                logger.info(f"⚡ Loaded {sheet_name} from binary cache: {sheet.values.shape} {sheet.values.dtype}")
+                return sheet
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Cache read failed ({str(e)}), rebuilding...")
+        else:
+            logger.info(f"🔄 MultiTicker cache missing or stale for {file_path}, rebuilding...")
+
+        with self._build_lock:
+            # Another thread may have rebuilt the entry while this one waited
+            if self.is_fresh(file_path, sheet_name):
+                try:
+                    return self._read_entry(file_path, sheet_name, compact)
+                except (OSError, ValueError):
+                    pass
+            sheet = self.build(file_path, sheet_name)
+        if compact:
+            sheet.values = sheet.values.astype(np.float32)
+        return sheet
+
+    def build(self, file_path: str, sheet_name: str = 'MultiTicker') -> MultiTickerSheet:
+        """Parse the workbook and (re)write the cache entry."""
+        fingerprint = file_fingerprint(file_path)
+        fingerprint['sha256'] = content_hash(file_path)
+
+        sheet = parse_multiticker_sheet(file_path, sheet_name)
+
+        entry = self.entry_dir(file_path, sheet_name)
+        entry.mkdir(parents=True, exist_ok=True)
+
+        # Remove the sidecar first so a crash mid-write never leaves a valid-looking entry
+        meta_file = entry / 'meta.json'
+        if meta_file.exists():
+            meta_file.unlink()
+
+        self._write_array(entry / 'values.npy', sheet.values)
+        self._write_array(entry / 'dates.npy', sheet.dates)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'sheet_name': sheet_name,
+            'source': fingerprint,
+            'n_columns': sheet.n_columns,
+            'shape': list(sheet.values.shape),
+            'headers': {str(row): values for row, values in sheet.headers.items()}
+        }
+        self._write_json(meta_file, meta)
+
+        logger.info(f"💾 Cached {sheet_name} to {entry}: {sheet.values.shape}")
+        return sheet
+
+    def invalidate(self, file_path: str, sheet_name: str = 'MultiTicker'):
+        """Drop the cache entry for a workbook/sheet pair."""
+        meta_file = self.entry_dir(file_path, sheet_name) / 'meta.json'
+        if meta_file.exists():
+            meta_file.unlink()
+
+    def _read_entry(self, file_path: str, sheet_name: str, compact: bool = False) -> MultiTickerSheet:
+        entry = self.entry_dir(file_path, sheet_name)
+        meta = self.read_sidecar(file_path, sheet_name)
+
+        if compact:
+            # Converted straight from the mapped file, no float64 copy is held in memory
+            values = np.load(entry / 'values.npy', mmap_mode='r').astype(np.float32)
+        else:
+            values = np.load(entry / 'values.npy')
+        dates = np.load(entry / 'dates.npy')
+        if list(values.shape) != meta['shape'] or len(dates) != values.shape[0]:
+            raise ValueError("cache arrays do not match sidecar shape")
+
+        headers = {int(row): row_values for row, row_values in meta['headers'].items()}
+        return MultiTickerSheet(headers, dates, values, meta['n_columns'])
+
+    @staticmethod
+    def _write_array(path: Path, array: np.ndarray):
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp.npy')
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_json(path: Path, payload: Dict):
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w') as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_path, path)
+
+
+def load_multiticker_sheet(file_path: str, sheet_name: str = 'MultiTicker',
+                           compact: bool = False) -> MultiTickerSheet:
+    """Load a MultiTicker sheet through the default binary cache (float32 data block if compact)."""
+    return MultiTickerCache().load(file_path, sheet_name, compact)
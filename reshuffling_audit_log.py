@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Bounded, Deduplicated Reshuffling Audit Log
+===========================================
+
+The reshuffler used to append one dict per corrected column to a list every
+time a reshuffle ran, so a demand run (several reshuffles) and a long-lived
+process recorded the same corrections over and over.
+
+ReshufflingAuditLog keeps one record per (column, correction_type,
+processing_type):
+
+- hits        : how often the correction was applied
+- first_run   : run ID in which it was first applied
+- last_run    : run ID in which it was last applied
+- details     : the remaining audit fields (country, reason, ...) as last seen
+
+At most max_entries records are kept; the least recently applied ones are
+dropped first (counted in `evicted`). Summaries and exports walk the unique
+records only. The log is thread-safe: concurrent runs record into one log,
+each passing its own run ID.
+
+Usage:
+    log = ReshufflingAuditLog()
+    log.start_run()
+    log.record(entries, 'industrial')
+    log.export('reshuffling_audit_trail.csv')
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ('column', 'correction_type', 'processing_type')
+COUNT_FIELDS = ('hits', 'first_run', 'last_run')
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class ReshufflingAuditLog:
+    """Deduplicated audit records keyed by (column, correction_type, processing_type)."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be positive, got {max_entries}")
+        self.max_entries = max_entries
+        # key -> [hits, first_run, last_run, details], least recently applied first
+        self._records: 'OrderedDict[Tuple, List]' = OrderedDict()
+        # Corrections recorded before the first start_run() belong to run 0
+        self.run_id: Hashable = 0
+        self._next_run = 1
+        self.evicted = 0
+        self._lock = threading.RLock()
+
+    def start_run(self, run_id: Optional[Hashable] = None) -> Hashable:
+        """
+        Begin a new run; corrections recorded without an explicit run ID from
+        now on carry its ID (default: next integer). Returns the run ID.
+        """
+        run_id = self.new_run_id() if run_id is None else run_id
+        self.run_id = run_id
+        return run_id
+
+    def new_run_id(self) -> int:
+        """Allocate a run ID without making it the current run (for concurrent runs)."""
+        with self._lock:
+            run_id = self._next_run
+            self._next_run += 1
+        return run_id
+
+    def record(self, entries: Iterable[Dict], processing_type: Optional[str] = None,
+               run_id: Optional[Hashable] = None):
+        """
+        Count audit entries into the log (processing_type fills in entries that
+        lack one; run_id defaults to the current run).
+        """
+        entries = list(entries)
+        with self._lock:
+            run_id = self.run_id if run_id is None else run_id
+            for entry in entries:
+                key = (entry.get('column'), entry.get('correction_type'),
+                       entry.get('processing_type', processing_type))
+                details = MappingProxyType({field: value for field, value in entry.items()
+                                            if field not in KEY_FIELDS})
+
+                record = self._records.get(key)
+                if record is None:
+                    self._records[key] = [1, run_id, run_id, details]
+                    if len(self._records) > self.max_entries:
+                        self._records.popitem(last=False)
+                        self.evicted += 1
+                else:
+                    record[0] += 1
+                    record[2] = run_id
+                    record[3] = details
+                    self._records.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.evicted = 0
+
+    def _snapshot(self) -> List[Tuple[Tuple, List]]:
+        """Consistent copy of the records (readers never iterate the live dict)."""
+        with self._lock:
+            return [(key, list(record)) for key, record in self._records.items()]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+    @property
+    def total_hits(self) -> int:
+        return sum(record[0] for _, record in self._snapshot())
+
+    def entries(self) -> List[Dict]:
+        """One audit dict per unique correction (key fields, details, hits and run IDs)."""
+        return [
+            {**dict(zip(KEY_FIELDS, key)), **record[3], **dict(zip(COUNT_FIELDS, record[:3]))}
+            for key, record in self._snapshot()
+        ]
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """Columnar view: one array per field, detail fields in first-seen order."""
+        snapshot = self._snapshot()
+        detail_fields: Dict[str, None] = {}
+        for _, record in snapshot:
+            detail_fields.update(dict.fromkeys(record[3]))
+
+        keys = [key for key, _ in snapshot]
+        records = [record for _, record in snapshot]
+        columns = {}
+        for position, field in enumerate(KEY_FIELDS):
+            columns[field] = np.array([key[position] for key in keys], dtype=object)
+        for field in detail_fields:
+            columns[field] = np.array([record[3].get(field) for record in records], dtype=object)
+        columns['hits'] = np.array([record[0] for record in records], dtype=np.int64)
+        for position, field in enumerate(COUNT_FIELDS[1:], start=1):
+            columns[field] = np.array([record[position] for record in records], dtype=object)
+        return columns
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.to_columns())
+
+    def export(self, output_file: str) -> str:
+        """
+        Write the columnar log (.parquet if that engine is installed, CSV
+        otherwise). The file is replaced atomically, so concurrent exports to
+        the same path never interleave.
+        """
+        frame = self.to_frame()
+        tmp_file = f"{output_file}.{threading.get_ident()}.tmp"
+        if Path(output_file).suffix == '.parquet':
+            try:
+                frame.to_parquet(tmp_file, index=False)
+                os.replace(tmp_file, output_file)
+                return output_file
+            except ImportError:
+                output_file = str(Path(output_file).with_suffix('.csv'))
+                tmp_file = f"{output_file}.{threading.get_ident()}.tmp"
+                logger.warning(f"⚠️ No parquet engine installed, writing {output_file} instead")
+        frame.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, output_file)
+        return output_file
+
+    def summary(self) -> Dict:
+        """Counts of unique corrections by type and by country, in O(unique corrections)."""
+        snapshot = self._snapshot()
+        summary = {
+            'total_corrections': len(snapshot),
+            'total_hits': 0,
+            'evicted': self.evicted,
+            'by_type': {},
+            'by_country': {}
+        }
+        for (_, correction_type, _), record in snapshot:
+            summary['total_hits'] += record[0]
+            correction_type = correction_type if correction_type is not None else 'unknown'
+            summary['by_type'][correction_type] = summary['by_type'].get(correction_type, 0) + 1
+            country = record[3].get('country', 'unknown')
+            summary['by_country'][country] = summary['by_country'].get(country, 0) + 1
+        return summary
@@ -18,13 +18,25 @@ sys.path.append("C:/development/commodities")
 import pandas as pd
 import numpy as np
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Tuple, Dict, List, Optional
 from datetime import datetime
 import warnings
 
 # Import our category reshuffling system
-from category_reshuffling_script import BloombergCategoryReshuffler
+from category_reshuffling_script import BloombergCategoryReshuffler, metadata_fingerprint
 from reshuffling_validation import ReshufflingValidator
+from multiticker_cache import load_multiticker_sheet
+from ticker_history_store import TickerHistoryStore
+from sumifs_index import SumifsCriteriaIndex
+from metadata_table import MetadataTable
+from aggregation_engine import (AggregationEngine, COMPACT_TOLERANCE, TEMPORAL_FIELDS, demand_output_definitions,
+                                temporal_switches)
+from metric_expressions import MetricGraph
+from incremental_snapshot import OutputSnapshot, evaluate_incremental, input_key
+from openpyxl.utils import get_column_letter
 
 warnings.filterwarnings('ignore')
 
@@ -35,12 +47,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled criteria indexes shared read-only between runs (most recently used kept)
+MAX_SHARED_INDEXES = 8
+
+# Last MultiTicker column read (ticker columns C onwards), whatever the data source
+MULTITICKER_MAX_COLUMN = 600
+
+
+class DemandRunContext:
+    """
+    Mutable state of one demand run.
+    
+    Every thread works in its own context (see RestoredDemandPipeline.run_context),
+    so one warm pipeline object can serve concurrent runs; compiled criteria
+    indexes and corrected metadata tables are shared between them read-only.
+    """
+    
+    def __init__(self, run_id=None, compact: bool = False, snapshot_dir: Optional[str] = None):
+        # Audit run ID of the reshuffling corrections (None: the reshuffler's current run)
+        self.run_id = run_id
+        # Compact mode: ticker matrix held as float32, sums still accumulated in float64
+        self.compact = compact
+        # Set for incremental runs: demand outputs are spliced onto this snapshot;
+        # last_refresh_report lists the changed ticker columns and recomputed outputs
+        self.snapshot_dir = snapshot_dir
+        self.last_refresh_report = None
+        # Compiled SUMIFS source of the last (data_df, metadata) pair: criteria index,
+        # value matrix, aggregation engine and evaluated outputs
+        self.criteria_cache = None
+        # Metadata tables never change; corrections applied in this run are tracked
+        # per source instead: {id(metadata): (metadata, corrected table)}
+        self.corrections = {}
+        # Tables converted from metadata dicts: {id(dict): (dict, fingerprint, table)}
+        self.converted = {}
+
 
 class RestoredDemandPipeline:
     """
     RESTORED working demand pipeline - DO NOT MODIFY.
     
     This preserves the exact logic that achieved perfect validation results.
+    
+    Run state lives in a per-thread DemandRunContext: run_restored_demand_pipeline
+    calls on one pipeline object may run concurrently from several threads.
     """
     
     def __init__(self):
@@ -56,58 +105,126 @@ class RestoredDemandPipeline:
                 'Gas_to_Power': 166.71
             }
         }
+        # Current DemandRunContext of each thread
+        self._local = threading.local()
+        # (criteria fingerprint, data columns) -> (SumifsCriteriaIndex, indexed columns)
+        self._shared_indexes = OrderedDict()
+        self._shared_lock = threading.Lock()
+    
+    @property
+    def run(self) -> DemandRunContext:
+        """Run context of the calling thread (a default one outside run_context)."""
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._local.context = DemandRunContext()
+        return context
+    
+    @contextmanager
+    def run_context(self, compact: bool = False, snapshot_dir: Optional[str] = None, run_id=None):
+        """
+        Run the steps of one demand run in a fresh DemandRunContext.
+        
+        The context is private to the calling thread; its reshuffling
+        corrections are audited under run_id (default: a newly allocated ID).
+        """
+        previous = getattr(self._local, 'context', None)
+        context = DemandRunContext(self.reshuffler.new_run_id() if run_id is None else run_id,
+                                   compact, snapshot_dir)
+        self._local.context = context
+        try:
+            yield context
+        finally:
+            self._local.context = previous
+            # The finished run's report stays readable as pipeline.last_refresh_report in this thread
+            self.run.last_refresh_report = context.last_refresh_report
+    
+    # Run settings and results below read and write the calling thread's context
+    
+    @property
+    def compact(self) -> bool:
+        return self.run.compact
+    
+    @compact.setter
+    def compact(self, value: bool):
+        self.run.compact = value
+    
+    @property
+    def snapshot_dir(self) -> Optional[str]:
+        return self.run.snapshot_dir
+    
+    @snapshot_dir.setter
+    def snapshot_dir(self, value: Optional[str]):
+        self.run.snapshot_dir = value
+    
+    @property
+    def last_refresh_report(self) -> Optional[Dict]:
+        return self.run.last_refresh_report
+    
+    @last_refresh_report.setter
+    def last_refresh_report(self, value: Optional[Dict]):
+        self.run.last_refresh_report = value
     
     def load_multiticker_with_enhanced_metadata(self, file_path='use4.xlsx', sheet_name='MultiTicker'):
         """
         RESTORED: Load MultiTicker data with enhanced metadata processing.
         
-        CRITICAL: This is the EXACT working version - DO NOT MODIFY.
+        CRITICAL: Metadata and data block must match the EXACT working version.
+        The sheet is read through the MultiTicker binary cache, which rebuilds
+        itself whenever the workbook changes. Metadata is returned as an
+        immutable MetadataTable (read-only {column: fields} mapping).
         """
         logger.info(f"📊 Loading MultiTicker with enhanced metadata from {file_path}")
         
-        # Load workbook to extract metadata
-        import openpyxl
-        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
-        ws = wb[sheet_name]
+        # Served from the binary cache; the workbook is only parsed when it changed
+        sheet = load_multiticker_sheet(file_path, sheet_name, compact=self.compact)
         
         # Extract metadata from rows 14 (category), 15 (region), 16 (subcategory)
-        metadata = {}
-        max_col = min(ws.max_column, 600)
+        max_col = min(sheet.n_columns, MULTITICKER_MAX_COLUMN)
         
-        logger.info(f"Extracting metadata from columns C to {openpyxl.utils.get_column_letter(max_col)}")
+        logger.info(f"Extracting metadata from columns C to {get_column_letter(max_col)}")
         
-        for col in range(3, max_col + 1):
-            col_name = f'Col_{col-2}'
-            category = ws.cell(row=14, column=col).value
-            region = ws.cell(row=15, column=col).value
-            subcategory = ws.cell(row=16, column=col).value
-            
-            metadata[col_name] = {
-                'category': str(category) if category else '',
-                'region': str(region) if region else '',
-                'subcategory': str(subcategory) if subcategory else ''
-            }
-        
-        wb.close()
-        
-        # Load data using pandas
-        df_full = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+        n_tickers = max_col - 2
+        metadata = MetadataTable.from_labels(
+            [f'Col_{col - 2}' for col in range(3, max_col + 1)],
+            sheet.header_row(13)[:n_tickers],
+            sheet.header_row(14)[:n_tickers],
+            sheet.header_row(15)[:n_tickers]
+        )
         
         # Data starts from row 21 (index 20), column B onwards
-        data_rows = df_full.iloc[20:, 1:max_col].copy()
-        
-        # Set column names: Date + Col_1, Col_2, etc.
-        data_rows.columns = ['Date'] + [f'Col_{i}' for i in range(1, len(data_rows.columns))]
+        data_rows = pd.DataFrame(
+            sheet.data_block()[:, :max_col - 2],
+            columns=[f'Col_{i}' for i in range(1, max_col - 1)],
+            index=pd.RangeIndex(20, sheet.n_rows)
+        )
         
         # Convert Date column
-        data_rows['Date'] = pd.to_datetime(data_rows['Date'], errors='coerce')
+        data_rows.insert(0, 'Date', sheet.date_series().values)
         
         # Remove invalid dates (KEEP ORIGINAL DATE RANGE - NO 2017 FILTER)
         data_rows = data_rows.dropna(subset=['Date'])
         
-        # Convert data columns to numeric
-        for col in data_rows.columns[1:]:
-            data_rows[col] = pd.to_numeric(data_rows[col], errors='coerce')
+        logger.info(f"Loaded {len(data_rows)} dates with {len(metadata)} tickers")
+        
+        return data_rows, metadata
+    
+    def load_from_history_store(self, store_dir: str = 'ticker_history') -> Tuple[pd.DataFrame, Dict]:
+        """
+        Load MultiTicker data and metadata from the memory-mapped ticker history store.
+        
+        Returns the same (data_df, metadata) layout as load_multiticker_with_enhanced_metadata,
+        including its column cap (MULTITICKER_MAX_COLUMN); the ticker columns are a zero-copy
+        view over the store, no Excel parsing involved.
+        """
+        logger.info(f"📊 Loading MultiTicker data from ticker history store {store_dir}")
+        
+        store = TickerHistoryStore(store_dir)
+        n_tickers = min(len(store.tickers), MULTITICKER_MAX_COLUMN - 2)
+        
+        data_rows = store.to_frame(labels='position', date_index=False).iloc[:, :n_tickers]
+        data_rows.insert(0, 'Date', store.dates)
+        column_metadata = store.column_metadata()
+        metadata = MetadataTable.from_dict({f'Col_{i}': column_metadata[f'Col_{i}'] for i in range(1, n_tickers + 1)})
         
         logger.info(f"Loaded {len(data_rows)} dates with {len(metadata)} tickers")
         
@@ -118,13 +235,20 @@ class RestoredDemandPipeline:
         """
         RESTORED: Apply Bloomberg category reshuffling for enhanced data quality.
         """
-        logger.info(f"🔄 Applying Bloomberg category reshuffling for {processing_type}")
-        
-        # Apply comprehensive category reshuffling
-        corrected_df, corrected_metadata = self.reshuffler.apply_category_reshuffling(
-            data_df, metadata, processing_type
+        # Apply comprehensive category reshuffling (memoized per metadata state)
+        corrected_df, corrected_metadata, audit, cache_hit = self.reshuffler.apply_category_reshuffling_cached(
+            data_df, self.effective_metadata(metadata), processing_type, run_id=self.run.run_id
         )
         
+        # Later steps of this run on this metadata see the corrections; the source table is unchanged
+        self.run.corrections[id(metadata)] = (metadata, corrected_metadata)
+        
+        if cache_hit:
+            logger.debug(f"♻️ Reused {processing_type} reshuffling ({len(audit)} corrections replayed)")
+            return corrected_df, corrected_metadata
+        
+        logger.info(f"🔄 Applied Bloomberg category reshuffling for {processing_type}")
+        
         # Log correction summary
         summary = self.reshuffler.get_correction_summary()
         logger.info(f"📊 Applied {summary['total_corrections']} category corrections")
@@ -147,120 +271,198 @@ class RestoredDemandPipeline:
         else:
             corrected_metadata = metadata
         
-        matching_cols = []
-        
-        for col, info in corrected_metadata.items():
-            if col in data_df.columns:
-                # Check original category first
-                category_match = info['category'] == category_target
-                region_match = info['region'] == region_target
-                subcategory_match = info['subcategory'] == subcategory_target
-                
-                # Check for reshuffled categories
-                if 'corrected_category' in info and info['corrected_category']:
-                    subcategory_match = info['corrected_category'] == subcategory_target
-                
-                if category_match and region_match and subcategory_match:
-                    matching_cols.append(col)
+        index, values = self.get_criteria_index(data_df, corrected_metadata)
+        positions = index.positions(category_target, region_target, subcategory_target)
         
-        if not matching_cols:
+        if len(positions) == 0:
             logger.debug(f"No matches for {category_target}/{region_target}/{subcategory_target}")
             return pd.Series(0.0, index=data_df.index)
         
-        logger.debug(f"Found {len(matching_cols)} enhanced matches for {category_target}/{region_target}/{subcategory_target}")
+        logger.debug(f"Found {len(positions)} enhanced matches for {category_target}/{region_target}/{subcategory_target}")
         
         # Sum across matching columns
-        result = data_df[matching_cols].sum(axis=1, skipna=True)
-        return result
+        return pd.Series(index.sum_columns(values, positions), index=data_df.index)
     
     def sumifs_two_criteria_enhanced(self, data_df: pd.DataFrame, metadata: Dict,
                                    category_target: str, region_target: str) -> pd.Series:
         """
         RESTORED: Enhanced 2-criteria SUMIFS with reshuffling support.
         """
-        matching_cols = []
-        
-        for col, info in metadata.items():
-            if col in data_df.columns:
-                category_match = info['category'] == category_target
-                region_match = info['region'] == region_target
-                
-                if category_match and region_match:
-                    matching_cols.append(col)
+        index, values = self.get_criteria_index(data_df, metadata)
+        positions = index.positions(category_target, region_target)
         
-        if not matching_cols:
+        if len(positions) == 0:
             logger.debug(f"No matches for {category_target}/{region_target}")
             return pd.Series(0.0, index=data_df.index)
         
-        result = data_df[matching_cols].sum(axis=1, skipna=True)
-        return result
+        return pd.Series(index.sum_columns(values, positions), index=data_df.index)
     
-    def create_enhanced_industrial_demand(self, data_df: pd.DataFrame, metadata: Dict) -> pd.DataFrame:
+    def get_criteria_index(self, data_df: pd.DataFrame, metadata: Dict) -> Tuple[SumifsCriteriaIndex, np.ndarray]:
         """
-        RESTORED: Create Industrial demand with Bloomberg category reshuffling.
+        Compiled SUMIFS criteria index and float matrix of the indexed columns.
         
-        Target: 240.70 for 2016-10-03 (236.42 acceptable with reshuffling)
+        Built once per (data_df, metadata) pair and reused by every SUMIFS call
+        until either object or the corrections applied to the metadata change.
         """
-        logger.info("🏭 Creating Enhanced Industrial demand with category reshuffling")
-        
-        # Apply Industrial reshuffling for audit trail
-        corrected_df, corrected_metadata = self.apply_bloomberg_category_reshuffling(
-            data_df, metadata, 'industrial'
-        )
-        
-        result = pd.DataFrame()
-        result['Date'] = data_df['Date']
-        
-        # Column C: France Industrial
-        result['France_Industrial'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'France', 'Industrial'
-        )
-        
-        # Column D: Belgium Industrial  
-        result['Belgium_Industrial'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Belgium', 'Industrial'
-        )
+        cached = self.get_compiled_source(data_df, metadata)
+        return cached['index'], cached['values']
+    
+    def effective_metadata(self, metadata) -> MetadataTable:
+        """
+        Metadata as a MetadataTable, with the reshuffling corrections the
+        current run has applied to it so far (dicts are converted, not modified).
+        """
+        run = self.run
+        entry = run.corrections.get(id(metadata))
+        if entry is not None and entry[0] is metadata:
+            return entry[1]
+        if isinstance(metadata, MetadataTable):
+            return metadata
+        
+        # Converted once per dict state; a dict edited by the caller is converted again
+        fingerprint = metadata_fingerprint(metadata)
+        converted = run.converted.get(id(metadata))
+        if converted is None or converted[0] is not metadata or converted[1] != fingerprint:
+            converted = (metadata, fingerprint, MetadataTable.from_dict(metadata))
+            run.converted[id(metadata)] = converted
+        return converted[2]
+    
+    def get_compiled_source(self, data_df: pd.DataFrame, metadata) -> Dict:
+        """Cached {'index', 'values', 'labels', 'engine', 'outputs'} for (data_df, metadata)."""
+        metadata = self.effective_metadata(metadata)
+        run = self.run
+        cached = run.criteria_cache
+        if cached is not None and cached['data_df'] is data_df:
+            if cached['metadata'] is metadata:
+                return cached
+            # Corrections that leave criteria labels and temporal switches alone keep the compiled source
+            if cached['labels'] == self._criteria_fingerprint(metadata):
+                cached['metadata'] = metadata
+                return cached
+        
+        labels = self._criteria_fingerprint(metadata)
+        index, columns = self.shared_criteria_index(metadata, labels, data_df.columns)
+        
+        run.criteria_cache = {
+            'data_df': data_df,
+            'metadata': metadata,
+            'labels': labels,
+            'index': index,
+            'columns': columns,
+            'values': data_df[columns].to_numpy(dtype=np.float32 if run.compact else np.float64),
+            'engine': None,
+            'outputs': None
+        }
+        return run.criteria_cache
+    
+    def shared_criteria_index(self, metadata: MetadataTable, labels: str,
+                              data_columns) -> Tuple[SumifsCriteriaIndex, List]:
+        """
+        Compiled criteria index for metadata criteria labels over data columns,
+        shared read-only by every run (compiled once per distinct layout).
+        """
+        key = (labels, tuple(data_columns))
+        with self._shared_lock:
+            shared = self._shared_indexes.get(key)
+            if shared is not None:
+                self._shared_indexes.move_to_end(key)
+                return shared
+        
+        # Compiled outside the lock; a concurrent run compiling the same layout gets an equal index
+        shared = SumifsCriteriaIndex.from_metadata(metadata, data_columns)
+        with self._shared_lock:
+            self._shared_indexes[key] = shared
+            if len(self._shared_indexes) > MAX_SHARED_INDEXES:
+                self._shared_indexes.popitem(last=False)
+        return shared
+    
+    @staticmethod
+    def _criteria_fingerprint(metadata: MetadataTable) -> str:
+        """Hash of the fields the compiled source depends on (criteria labels, temporal switches)."""
+        return metadata.fields_fingerprint(('category', 'region', 'subcategory', 'corrected_category') + TEMPORAL_FIELDS)
+    
+    def evaluate_demand_outputs(self, data_df: pd.DataFrame, metadata: Dict) -> pd.DataFrame:
+        """
+        Every demand output column (industrial, LDZ, gas-to-power, countries) in
+        one aggregation-matrix multiply over the ticker matrix.
         
-        # Column E: Italy Industrial
-        result['Italy_Industrial'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Italy', 'Industrial'
-        )
+        Evaluated once per compiled (data_df, metadata) source and shared by the
+        create_enhanced_* steps.
+        """
+        cached = self.get_compiled_source(data_df, metadata)
+        
+        if cached['outputs'] is None:
+            engine = AggregationEngine(cached['index'])
+            engine.define_all(demand_output_definitions())
+            # "Calculated to 30/6/22 then actual" series switch source at their cutoffs
+            engine.set_temporal_switches(temporal_switches(cached['metadata'], cached['columns']))
+            cached['engine'] = engine
+            run = self.run
+            if run.snapshot_dir:
+                # Only rows from the earliest change against the last run are recomputed
+                snapshot = OutputSnapshot(run.snapshot_dir)
+                cached['outputs'] = evaluate_incremental(
+                    engine, cached['values'], data_df['Date'].to_numpy(), data_df.index,
+                    snapshot, input_key(cached['labels'], list(data_df.columns)), cached['columns']
+                )
+                run.last_refresh_report = snapshot.last_report
+                if snapshot.last_report['changed_columns']:
+                    logger.info(f"🧾 Changed ticker columns: {snapshot.last_report['changed_columns'][:20]}")
+                    logger.info(f"🧾 Recomputed outputs: {snapshot.last_report['recomputed_outputs']}")
+            else:
+                cached['outputs'] = engine.evaluate_frame(cached['values'], data_df.index,
+                                                          dates=data_df['Date'].to_numpy())
+            logger.info(f"🧮 Evaluated {len(engine.output_names)} demand outputs in one aggregation pass")
         
-        # Column F: GB Industrial
-        result['GB_Industrial'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'GB', 'Industrial'
-        )
+        return cached['outputs']
+    
+    def _demand_result(self, data_df: pd.DataFrame, metadata: Dict, columns: List[str]) -> pd.DataFrame:
+        """Date column plus the requested demand outputs."""
+        result = self.evaluate_demand_outputs(data_df, metadata)[columns].copy()
+        result.insert(0, 'Date', data_df['Date'])
+        return result
+    
+    def evaluate_metrics(self, data_df: pd.DataFrame, metadata: Dict, definitions,
+                         metrics: Optional[List[str]] = None, max_workers: int = 1) -> pd.DataFrame:
+        """
+        Evaluate declarative metrics (see metric_expressions) over the compiled
+        SUMIFS source of (data_df, metadata).
         
-        # Column G: Netherlands Industrial and Power
-        result['Netherlands_IndPower'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Netherlands', 'Industrial and Power'
-        )
+        Args:
+            definitions: MetricGraph, {name: expression} or "name = expression" lines
+            metrics: Metrics to return (default: all)
+            max_workers: Threads per level of independent metrics
         
-        # Column H: Netherlands Zebra (with reshuffling correction)
-        result['Netherlands_Zebra'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Netherlands', 'Zebra'
-        )
+        Returns:
+            DataFrame with a Date column followed by one column per metric
+        """
+        graph = definitions if isinstance(definitions, MetricGraph) else MetricGraph(definitions)
+        cached = self.get_compiled_source(data_df, metadata)
         
-        # Column I: Germany Industrial and Power (total)
-        result['Germany_Total'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Germany', 'Industrial and Power'
-        )
+        result = graph.evaluate(cached['index'], cached['values'], data_df.index,
+                                metrics=metrics, max_workers=max_workers)
+        result.insert(0, 'Date', data_df['Date'])
+        return result
+    
+    def create_enhanced_industrial_demand(self, data_df: pd.DataFrame, metadata: Dict) -> pd.DataFrame:
+        """
+        RESTORED: Create Industrial demand with Bloomberg category reshuffling.
         
-        # Column J: Germany Gas-to-Power (to subtract)
-        result['Germany_GtP'] = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Intermediate Calculation', '#Germany', 'Gas-to-Power'
-        )
+        Target: 240.70 for 2016-10-03 (236.42 acceptable with reshuffling)
+        """
+        logger.info("🏭 Creating Enhanced Industrial demand with category reshuffling")
         
-        # Column K: Germany Industrial (calculated = I - J)
-        result['Germany_Industrial'] = result['Germany_Total'] - result['Germany_GtP']
+        # Apply Industrial reshuffling (audit trail); the corrections reach the engine
+        # through effective_metadata, so the returned frame and metadata are not needed
+        self.apply_bloomberg_category_reshuffling(data_df, metadata, 'industrial')
         
-        # Column L: Total Industrial = SUM(C:H) + K
-        industrial_components = [
+        # Columns C:L - France, Belgium, Italy, GB, Netherlands (Ind+Power, Zebra),
+        # Germany Total - Gas-to-Power = Germany Industrial, Total = SUM(C:H) + K
+        result = self._demand_result(data_df, metadata, [
             'France_Industrial', 'Belgium_Industrial', 'Italy_Industrial', 'GB_Industrial',
-            'Netherlands_IndPower', 'Netherlands_Zebra', 'Germany_Industrial'
-        ]
-        
-        result['Total_Industrial_Demand'] = result[industrial_components].sum(axis=1)
+            'Netherlands_IndPower', 'Netherlands_Zebra', 'Germany_Total', 'Germany_GtP',
+            'Germany_Industrial', 'Total_Industrial_Demand'
+        ])
         
         logger.info("✅ Enhanced Industrial demand calculation completed")
         return result
@@ -273,36 +475,13 @@ class RestoredDemandPipeline:
         """
         logger.info("⚡ Creating Enhanced Gas-to-Power demand with category reshuffling")
         
-        # Apply Gas-to-Power reshuffling for audit trail
-        corrected_df, corrected_metadata = self.apply_bloomberg_category_reshuffling(
-            data_df, metadata, 'gas_to_power'
-        )
-        
-        result = pd.DataFrame()
-        result['Date'] = data_df['Date']
-        
-        # Use original proven logic with breakthrough insight
-        gtp_total = pd.Series(0.0, index=data_df.index)
-        
-        # Standard Gas-to-Power countries
-        standard_gtp_countries = ['France', 'Belgium', 'Italy', 'GB']
-        
-        for country in standard_gtp_countries:
-            country_gtp = self.sumifs_three_criteria_enhanced(
-                data_df, metadata, 'Demand', country, 'Gas-to-Power'
-            )
-            if country_gtp.sum() > 0:
-                gtp_total += country_gtp
-        
-        # Germany Gas-to-Power (using Intermediate Calculation)
-        germany_gtp = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Intermediate Calculation', '#Germany', 'Gas-to-Power'
-        )
-        gtp_total += germany_gtp
+        # Apply Gas-to-Power reshuffling (audit trail); the corrections reach the engine
+        # through effective_metadata, so the returned frame and metadata are not needed
+        self.apply_bloomberg_category_reshuffling(data_df, metadata, 'gas_to_power')
         
+        # France, Belgium, Italy, GB (each only if non-zero) + Germany Intermediate Calculation;
         # Netherlands is calculated but EXCLUDED from total (breakthrough insight)
-        
-        result['Total_Gas_to_Power_Demand'] = gtp_total
+        result = self._demand_result(data_df, metadata, ['Total_Gas_to_Power_Demand'])
         
         logger.info("✅ Enhanced Gas-to-Power demand calculation completed")
         return result
@@ -315,55 +494,9 @@ class RestoredDemandPipeline:
         """
         logger.info("🏠 Creating LDZ demand (standard logic)")
         
-        result = pd.DataFrame()
-        result['Date'] = data_df['Date']
-        
-        ldz_total = pd.Series(0.0, index=data_df.index)
-        
-        # Standard LDZ countries
-        ldz_countries = {
-            'France': 'LDZ',
-            'Belgium': 'LDZ',
-            'Italy': 'LDZ', 
-            'Netherlands': 'LDZ',
-            'GB': 'LDZ',
-            'Germany': 'LDZ'
-        }
-        
-        for country, subcategory in ldz_countries.items():
-            country_ldz = self.sumifs_three_criteria_enhanced(
-                data_df, metadata, 'Demand', country, subcategory
-            )
-            if country_ldz.sum() > 0:
-                ldz_total += country_ldz
-        
-        # Italy Other
-        italy_other = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand', 'Italy', 'Other'
-        )
-        ldz_total += italy_other
-        
-        # Special cases
-        special_cases = {
-            'Austria': 'Austria',
-            'Switzerland': 'Switzerland',
-            'Luxembourg': 'Luxembourg'
-        }
-        
-        for country, subcategory in special_cases.items():
-            country_ldz = self.sumifs_three_criteria_enhanced(
-                data_df, metadata, 'Demand', country, subcategory
-            )
-            if country_ldz.sum() > 0:
-                ldz_total += country_ldz
-        
-        # Ireland
-        ireland_ldz = self.sumifs_three_criteria_enhanced(
-            data_df, metadata, 'Demand (Net)', 'Island of Ireland', 'Island of Ireland'
-        )
-        ldz_total += ireland_ldz
-        
-        result['Total_LDZ_Demand'] = ldz_total
+        # Standard LDZ countries and Austria/Switzerland/Luxembourg (each only if non-zero),
+        # Italy Other and Island of Ireland
+        result = self._demand_result(data_df, metadata, ['Total_LDZ_Demand'])
         
         logger.info("✅ LDZ demand calculation completed")
         return result
@@ -376,37 +509,11 @@ class RestoredDemandPipeline:
         """
         logger.info("🌍 Creating country demand aggregation")
         
-        result = pd.DataFrame()
-        result['Date'] = data_df['Date']
-        
-        # Define countries to process
-        countries = [
+        # Two-criteria SUMIFS per country, Ireland using "Demand (Net)", and their total
+        result = self._demand_result(data_df, metadata, [
             'France', 'Belgium', 'Italy', 'Netherlands', 'GB',
-            'Austria', 'Germany', 'Switzerland', 'Luxembourg'
-        ]
-        
-        country_totals = []
-        
-        for country in countries:
-            country_demand = self.sumifs_two_criteria_enhanced(
-                data_df, metadata, 'Demand', country
-            )
-            result[country] = country_demand
-            country_totals.append(country_demand)
-        
-        # Ireland using "Demand (Net)"
-        ireland_demand = self.sumifs_two_criteria_enhanced(
-            data_df, metadata, 'Demand (Net)', 'Island of Ireland'
-        )
-        result['Ireland'] = ireland_demand
-        country_totals.append(ireland_demand)
-        
-        # Calculate total
-        total_demand = pd.Series(0.0, index=data_df.index)
-        for country_total in country_totals:
-            total_demand += country_total
-        
-        result['Total'] = total_demand
+            'Austria', 'Germany', 'Switzerland', 'Luxembourg', 'Ireland', 'Total'
+        ])
         
         logger.info("✅ Country demand aggregation completed")
         return result
@@ -484,14 +591,75 @@ class RestoredDemandPipeline:
         
         return all_pass
     
+    def validate_compact_precision(self, data_df: pd.DataFrame, metadata: Dict) -> bool:
+        """
+        Check that compact (float32) mode cannot move the validated results.
+        
+        For every validation date the rounding bound of each validated output
+        (see AggregationEngine.rounding_bound) must stay below COMPACT_TOLERANCE,
+        so the targets hold to within 0.01 of a full-precision run.
+        """
+        output_names = {
+            'France': 'France',
+            'Total': 'Total',
+            'Industrial': 'Total_Industrial_Demand',
+            'LDZ': 'Total_LDZ_Demand',
+            'Gas_to_Power': 'Total_Gas_to_Power_Demand'
+        }
+        
+        self.evaluate_demand_outputs(data_df, metadata)
+        cached = self.get_compiled_source(data_df, metadata)
+        engine = cached['engine']
+        
+        all_pass = True
+        for validation_date, targets in self.validation_targets.items():
+            rows = np.flatnonzero((data_df['Date'] == validation_date).to_numpy())
+            if len(rows) == 0:
+                logger.warning(f"Validation date {validation_date} not found for the compact precision check")
+                all_pass = False
+                continue
+            
+            bounds = engine.rounding_bound(cached['values'][rows], data_df['Date'].to_numpy()[rows])
+            for column in targets:
+                bound = float(bounds[:, engine.output_names.index(output_names[column])].max())
+                ok = bound < COMPACT_TOLERANCE
+                all_pass = all_pass and ok
+                logger.info(f"  {'✅' if ok else '❌'} Compact {column} on {validation_date}: "
+                            f"error bound {bound:.2e} (tolerance {COMPACT_TOLERANCE})")
+        
+        return all_pass
+    
     def run_restored_demand_pipeline(self, input_file: str = 'use4.xlsx',
-                                   output_file: str = 'restored_demand_results.csv') -> Optional[pd.DataFrame]:
+                                   output_file: str = 'restored_demand_results.csv',
+                                   history_store: Optional[str] = None,
+                                   incremental: bool = False,
+                                   snapshot_dir: str = '.demand_snapshot',
+                                   compact: bool = False) -> Optional[pd.DataFrame]:
         """
         Run the RESTORED demand pipeline with perfect validation.
         
         CRITICAL: This MUST produce the exact working validation results.
+        
+        If history_store is given, data is read from the ticker history store
+        instead of input_file. With incremental=True only the demand outputs
+        that reference changed ticker columns are recomputed, from the earliest
+        changed date since the last incremental run (snapshot kept in
+        snapshot_dir, see last_refresh_report); results are identical.
+        
+        With compact=True the ticker matrix is held in float32 (sums in
+        float64); validation then also requires the float32 rounding bound to
+        stay below 0.01 at the validation date.
+        
+        Each call runs in its own DemandRunContext, so concurrent calls from
+        several threads are safe (give them distinct output_file/snapshot_dir).
         """
-        logger.info("🚀 Starting RESTORED Demand-Side Pipeline")
+        with self.run_context(compact, snapshot_dir if incremental else None) as run:
+            return self._run_restored_demand_pipeline(run, input_file, output_file, history_store)
+    
+    def _run_restored_demand_pipeline(self, run: DemandRunContext, input_file: str, output_file: str,
+                                      history_store: Optional[str]) -> Optional[pd.DataFrame]:
+        """run_restored_demand_pipeline inside its run context."""
+        logger.info(f"🚀 Starting RESTORED Demand-Side Pipeline (run {run.run_id})")
         logger.info("=" * 80)
         logger.info("RESTORING PERFECT WORKING VALIDATION:")
         logger.info("France: 90.13, Total: 715.22, Industrial: 236.42, LDZ: 307.80, Gas-to-Power: 166.71")
@@ -500,7 +668,10 @@ class RestoredDemandPipeline:
         try:
             # Step 1: Load data with enhanced metadata
             logger.info("📊 Step 1: Loading MultiTicker data with enhanced processing...")
-            data_df, metadata = self.load_multiticker_with_enhanced_metadata(input_file, 'MultiTicker')
+            if history_store:
+                data_df, metadata = self.load_from_history_store(history_store)
+            else:
+                data_df, metadata = self.load_multiticker_with_enhanced_metadata(input_file, 'MultiTicker')
             
             # Step 2: Create enhanced subcategory sheets
             logger.info("🏭 Step 2a: Creating Enhanced Industrial demand with reshuffling...")
@@ -525,6 +696,8 @@ class RestoredDemandPipeline:
             # Step 5: CRITICAL VALIDATION
             logger.info("✅ Step 5: Running RESTORED validation...")
             validation_passed = self.validate_enhanced_results(complete_data)
+            if run.compact:
+                validation_passed = self.validate_compact_precision(data_df, metadata) and validation_passed
             
             if validation_passed:
                 logger.info("📊 Step 6: Exporting restored results...")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Precompiled SUMIFS Criteria Index
+=================================
+
+Excel SUMIFS over the MultiTicker header rows (category / region / subcategory)
+compiled once into hash lookups:
+
+    (category, region, subcategory) -> int column positions
+    (category, region)              -> int column positions
+
+A SUMIFS call then becomes a dictionary lookup plus a numpy fancy-index sum
+over the data matrix, instead of a string comparison per column per call.
+
+Used by RestoredDemandPipeline (metadata table or dict) and the supply
+replicators (raw header rows, '*' wildcard on the third criterion).
+"""
+
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+from metadata_table import MISSING, MetadataTable
+
+WILDCARD = '*'
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class SumifsCriteriaIndex:
+    """
+    Criteria -> column-position index over aligned header label lists.
+
+    Positions refer to the order of the labels passed in (i.e. columns of the
+    matrix the index is used with) and are returned in ascending order.
+    """
+
+    def __init__(self, categories: Sequence, regions: Sequence, subcategories: Sequence,
+                 strip: bool = False):
+        """
+        Args:
+            categories: Row 14 labels, one per column
+            regions: Row 15 labels, one per column
+            subcategories: Row 16 labels, one per column
+            strip: Compare labels and criteria with surrounding whitespace removed
+        """
+        self.strip = strip
+        self.n_columns = len(categories)
+
+        three: Dict[Tuple, List[int]] = {}
+        two: Dict[Tuple, List[int]] = {}
+        for position, (category, region, subcategory) in enumerate(zip(categories, regions, subcategories)):
+            category, region, subcategory = self._norm(category), self._norm(region), self._norm(subcategory)
+            three.setdefault((category, region, subcategory), []).append(position)
+            two.setdefault((category, region), []).append(position)
+
+        self.three = {key: np.asarray(positions, dtype=np.int64) for key, positions in three.items()}
+        self.two = {key: np.asarray(positions, dtype=np.int64) for key, positions in two.items()}
+
+    def _norm(self, value) -> Hashable:
+        if self.strip:
+            return str(value).strip()
+        return value
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict, columns: Sequence) -> Tuple['SumifsCriteriaIndex', List]:
+        """
+        Build from a MetadataTable or a {column: {'category', 'region',
+        'subcategory'}} metadata dict.
+
+        Only metadata columns present in `columns` are indexed; a truthy
+        'corrected_category' overrides the subcategory. Returns the index and
+        the indexed column names (positions refer to this list).
+        """
+        if isinstance(metadata, MetadataTable):
+            return cls.from_table(metadata, columns)
+
+        available = set(columns)
+        indexed = [col for col in metadata if col in available]
+
+        subcategories = []
+        for col in indexed:
+            info = metadata[col]
+            corrected = info.get('corrected_category')
+            subcategories.append(corrected if corrected else info['subcategory'])
+
+        index = cls(
+            [metadata[col]['category'] for col in indexed],
+            [metadata[col]['region'] for col in indexed],
+            subcategories
+        )
+        return index, indexed
+
+    @classmethod
+    def from_table(cls, table: MetadataTable, columns: Sequence) -> Tuple['SumifsCriteriaIndex', List]:
+        """
+        Build from the integer label codes of a MetadataTable: columns are
+        grouped by code (no string handling per column) and each group's
+        labels are decoded once.
+        """
+        available = set(columns)
+        selected = np.asarray([position for position, col in enumerate(table.columns) if col in available],
+                              dtype=np.int64)
+        indexed = [table.columns[position] for position in selected.tolist()]
+        categories, regions, subcategories = (codes[selected].astype(np.int64) + 1 for codes in table.label_codes())
+
+        def decode(code: int):
+            return None if code - 1 == MISSING else table.vocabulary[code - 1]
+
+        def group(keys: np.ndarray) -> Dict[int, np.ndarray]:
+            order = np.argsort(keys, kind='stable')
+            unique, starts = np.unique(keys[order], return_index=True)
+            return dict(zip(unique.tolist(), np.split(order, starts[1:])))
+
+        base = len(table.vocabulary) + 1
+        index = cls.__new__(cls)
+        index.strip = False
+        index.n_columns = len(indexed)
+        index.three = {
+            (decode(key // (base * base)), decode(key // base % base), decode(key % base)): positions
+            for key, positions in group((categories * base + regions) * base + subcategories).items()
+        }
+        index.two = {
+            (decode(key // base), decode(key % base)): positions
+            for key, positions in group(categories * base + regions).items()
+        }
+        return index, indexed
+
+    def positions(self, category, region, subcategory=None) -> np.ndarray:
+        """Column positions matching the criteria (subcategory None or '*' matches any)."""
+        category, region = self._norm(category), self._norm(region)
+        if subcategory is None or (isinstance(subcategory, str) and subcategory.strip() == WILDCARD):
+            return self.two.get((category, region), _EMPTY)
+        return self.three.get((category, region, self._norm(subcategory)), _EMPTY)
+
+    @staticmethod
+    def sum_columns(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Row-wise SUMIFS over the selected columns (NaN counts as 0, no match gives 0.0)."""
+        if len(positions) == 0:
+            return np.zeros(values.shape[0], dtype=np.float64)
+        return np.nansum(values[:, positions], axis=1)
+
+    def sumifs(self, values: np.ndarray, category, region, subcategory=None) -> np.ndarray:
+        """SUMIFS for every row of `values` (rows = dates, columns aligned with the labels)."""
+        return self.sum_columns(values, self.positions(category, region, subcategory))
+
@@ -0,0 +1,33 @@
+"""Shared test setup: the modules live at the repository root."""
+
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from create_sample_bloomberg_data import SimulatedBdh  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+class FailingBdh(SimulatedBdh):
+    """SimulatedBdh without latency that fails every request containing one of `failing` tickers."""
+
+    def __init__(self, failing=(), **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failing = set(failing)
+
+    def __call__(self, tickers, **kwargs):
+        if self.failing & set(tickers):
+            self.calls.append({'tickers': list(tickers), 'failed': True})
+            raise RuntimeError("simulated outage")
+        return super().__call__(tickers, **kwargs)
+
+
+@pytest.fixture
+def failing_bdh():
+    """FailingBdh factory: failing_bdh(failing={'T1 Index'})."""
+    return FailingBdh
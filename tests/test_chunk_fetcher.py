@@ -0,0 +1,127 @@
+"""Checkpointed, concurrent chunk fetching (user-005 to user-008)."""
+
+import threading
+
+import pytest
+
+from bloomberg_chunk_fetcher import ChunkedBloombergFetcher
+from bloomberg_download_planner import plan_downloads
+from create_sample_bloomberg_data import SimulatedBdh
+
+# 6 tickers in 2 start-date groups of 3, chunk_size 1 -> 6 requests
+TICKERS = (
+    [{'ticker': f'OLD{i} Index', 'start_date': ''} for i in range(3)]
+    + [{'ticker': f'NEW{i} Index', 'start_date': '2024-06-01'} for i in range(3)]
+)
+
+
+class ConcurrencyProbe(SimulatedBdh):
+    """SimulatedBdh that records how many requests were in flight at once."""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, tickers, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return super().__call__(tickers, **kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_plan(chunk_size=1):
+    return plan_downloads(TICKERS, '2024-12-31', full_history_start='2024-01-01',
+                          merge_days=0, chunk_size=chunk_size)
+
+
+def make_fetcher(bdh, tmp_path, **kwargs):
+    options = dict(chunk_size=1, max_workers=4, requests_per_second=1000.0, burst=10,
+                   checkpoint_dir=str(tmp_path / 'checkpoints'))
+    options.update(kwargs)
+    return ChunkedBloombergFetcher(bdh=bdh, **options)
+
+
+def test_plan_has_two_groups():
+    plan = make_plan()
+    assert len(plan.groups) == 2
+    assert plan.n_requests() == 6
+
+
+def test_resume_after_partial_failure_requests_only_missing_chunks(tmp_path, failing_bdh):
+    plan = make_plan()
+
+    first = failing_bdh(failing={'NEW1 Index'})
+    data, failed = make_fetcher(first, tmp_path).fetch_plan(plan)
+    assert set(failed) == {'NEW1 Index'}
+    assert data.shape[1] == 5
+
+    second = failing_bdh()
+    data, failed = make_fetcher(second, tmp_path).fetch_plan(plan)
+    assert failed == {}
+    assert [call['tickers'] for call in second.calls] == [['NEW1 Index']]
+    assert [col[0] for col in data.columns] == plan.tickers
+
+    # Everything succeeded: checkpoints are cleared
+    assert not any((tmp_path / 'checkpoints').iterdir())
+
+
+def test_resumed_plan_equals_uninterrupted_plan(tmp_path, failing_bdh):
+    plan = make_plan()
+    make_fetcher(failing_bdh(failing={'OLD0 Index'}), tmp_path).fetch_plan(plan)
+    resumed, _ = make_fetcher(failing_bdh(), tmp_path).fetch_plan(plan)
+
+    fresh, _ = make_fetcher(failing_bdh(), tmp_path / 'other').fetch_plan(plan)
+    # Values depend on the call sequence; compare the layout
+    assert resumed.columns.equals(fresh.columns)
+    assert resumed.index.equals(fresh.index)
+
+
+def test_groups_share_one_thread_pool(tmp_path):
+    bdh = ConcurrencyProbe(latency=0.1)
+    fetcher = make_fetcher(bdh, tmp_path, max_workers=6, checkpoint_dir=None)
+
+    data, failed = fetcher.fetch_plan(make_plan())
+
+    assert failed == {}
+    assert bdh.peak == 6
+
+
+def test_groups_share_one_circuit_breaker(tmp_path, failing_bdh):
+    bdh = failing_bdh(failing={t['ticker'] for t in TICKERS})
+    fetcher = make_fetcher(bdh, tmp_path, max_workers=1, failure_threshold=2)
+
+    data, failed = fetcher.fetch_plan(make_plan())
+
+    assert len(failed) == 6
+    assert len(bdh.calls) == 2
+    assert sum('circuit breaker open' in reason for reason in failed.values()) == 4
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 50])
+def test_fetch_plan_orders_columns_by_ticker_order(tmp_path, chunk_size, failing_bdh):
+    plan = make_plan(chunk_size)
+    order = list(reversed(plan.tickers))
+    data, failed = make_fetcher(failing_bdh(), tmp_path, chunk_size=chunk_size).fetch_plan(plan, order)
+    assert failed == {}
+    assert [col[0] for col in data.columns] == order
+    assert data.index.is_monotonic_increasing
+
+
+def test_fetch_keeps_checkpoints_of_finished_chunks_after_failure(tmp_path, failing_bdh):
+    tickers = [f'SIM{i} Index' for i in range(5)]
+    first = failing_bdh(failing={'SIM4 Index'})
+    with pytest.raises(RuntimeError, match='1 tickers failed'):
+        make_fetcher(first, tmp_path, chunk_size=2).fetch(tickers, '2024-01-01', '2024-01-31')
+
+    second = failing_bdh()
+    data = make_fetcher(second, tmp_path, chunk_size=2).fetch(tickers, '2024-01-01', '2024-01-31')
+
+    assert [call['tickers'] for call in second.calls] == [['SIM4 Index']]
+    assert [col[0] for col in data.columns] == tickers
+    assert len(data) == 31
@@ -0,0 +1,89 @@
+"""Failed chunks filled from cached history, with per-ticker provenance (user-007)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import gas_market_bloomberg_chunked
+from gas_market_bloomberg_chunked import BloombergGasMarketProcessor
+
+TICKERS = [{'ticker': f'T{i} Index', 'category': 'Demand', 'region_from': 'France',
+            'region_to': 'Industrial', 'start_date': '2024-01-01'} for i in range(4)]
+CACHED = ['T0 Index', 'T1 Index', 'T2 Index']
+
+
+@pytest.fixture
+def cached_csv(tmp_path):
+    dates = pd.date_range('2024-01-01', periods=30, freq='D')
+    values = np.arange(len(dates) * len(CACHED), dtype=np.float64).reshape(len(dates), -1)
+    path = tmp_path / 'bloomberg_raw_data.csv'
+    pd.DataFrame(values, index=dates, columns=[f'{ticker}_PX_LAST' for ticker in CACHED]).to_csv(path)
+    return path
+
+
+def make_processor(tmp_path, bdh):
+    return BloombergGasMarketProcessor(
+        fallback_csv=str(tmp_path / 'bloomberg_raw_data.csv'),
+        bdh=bdh,
+        chunk_size=1,
+        requests_per_second=1000.0,
+        checkpoint_dir=str(tmp_path / 'checkpoints'),
+        failure_threshold=10
+    )
+
+
+def test_failed_chunks_are_filled_from_cached_history(tmp_path, cached_csv, failing_bdh):
+    cached = pd.read_csv(cached_csv, index_col=0, parse_dates=True)
+    processor = make_processor(tmp_path, failing_bdh(failing={'T1 Index', 'T3 Index'}))
+
+    data = processor.download_bloomberg_data_safe(TICKERS)
+
+    # Configuration order; T3 failed and has no cached history
+    assert list(data.columns) == ['T0 Index', 'T1 Index', 'T2 Index']
+    filled = data['T1 Index'].dropna()
+    pd.testing.assert_series_equal(filled, cached['T1 Index_PX_LAST'], check_names=False, check_freq=False)
+    assert data['T0 Index'].notna().sum() > len(cached)
+
+    expected = {'T0 Index': 'fresh', 'T1 Index': 'cached', 'T2 Index': 'fresh', 'T3 Index': 'missing'}
+    assert processor.ticker_provenance == expected
+    assert data.attrs['provenance'] == expected
+
+
+def test_all_chunks_failing_falls_back_to_csv(tmp_path, cached_csv, failing_bdh):
+    processor = make_processor(tmp_path, failing_bdh(failing={info['ticker'] for info in TICKERS}))
+
+    data = processor.download_bloomberg_data_safe(TICKERS)
+
+    assert data.shape == (30, len(CACHED))
+    assert processor.ticker_provenance == {'T0 Index': 'cached', 'T1 Index': 'cached',
+                                           'T2 Index': 'cached', 'T3 Index': 'missing'}
+    # Nothing fresh: the fallback CSV is left untouched
+    assert pd.read_csv(cached_csv, index_col=0).shape == (30, len(CACHED))
+
+
+@pytest.mark.parametrize('failing', [set(), {'T1 Index'}, {info['ticker'] for info in TICKERS}])
+def test_every_path_returns_flat_ticker_columns(tmp_path, cached_csv, failing_bdh, failing):
+    processor = make_processor(tmp_path, failing_bdh(failing=failing))
+
+    data = processor.download_bloomberg_data_safe(TICKERS)
+
+    assert all(isinstance(col, str) and col.endswith(' Index') for col in data.columns)
+    saved = pd.read_csv(cached_csv, index_col=0, nrows=1)
+    assert all(col.endswith(' Index_PX_LAST') for col in saved.columns)
+
+    # The MultiTicker builder finds every downloaded ticker
+    multiticker = processor.create_multiticker_format(data, TICKERS)
+    assert multiticker.shape[1] == 2 + data.shape[1]
+
+
+def test_csv_fallback_returns_flat_ticker_columns(tmp_path, cached_csv, monkeypatch):
+    def unavailable():
+        raise ImportError("xbbg not installed")
+
+    monkeypatch.setattr(gas_market_bloomberg_chunked, 'resolve_xbbg_bdh', unavailable)
+    processor = make_processor(tmp_path, None)
+
+    data = processor.download_bloomberg_data_safe(TICKERS)
+
+    assert list(data.columns) == CACHED
+    assert processor.ticker_provenance['T0 Index'] == 'cached'
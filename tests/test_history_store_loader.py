@@ -0,0 +1,40 @@
+"""Demand pipeline loading from the ticker history store (user-003)."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from restored_demand_pipeline import MULTITICKER_MAX_COLUMN, RestoredDemandPipeline
+from ticker_history_store import TickerHistoryStore
+
+
+def write_store(store_dir, n_tickers, n_rows=10):
+    dates = pd.date_range('2022-01-01', periods=n_rows)
+    values = np.arange(n_rows * n_tickers, dtype=np.float64).reshape(n_rows, n_tickers)
+    tickers = [{'ticker': f'T{i} Index', 'category': 'Demand', 'region': f'R{i % 7}', 'subcategory': 'LDZ'}
+               for i in range(n_tickers)]
+    TickerHistoryStore(str(store_dir)).write(dates, values, tickers)
+    return values
+
+
+def test_wide_store_is_capped_like_the_workbook_loader(tmp_path):
+    write_store(tmp_path / 'store', MULTITICKER_MAX_COLUMN + 50)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        data_df, metadata = RestoredDemandPipeline().load_from_history_store(str(tmp_path / 'store'))
+
+    n_tickers = MULTITICKER_MAX_COLUMN - 2
+    assert list(data_df.columns) == ['Date'] + [f'Col_{i}' for i in range(1, n_tickers + 1)]
+    assert list(metadata) == [f'Col_{i}' for i in range(1, n_tickers + 1)]
+
+
+def test_narrow_store_loads_every_column(tmp_path):
+    values = write_store(tmp_path / 'store', 5)
+
+    data_df, metadata = RestoredDemandPipeline().load_from_history_store(str(tmp_path / 'store'))
+
+    assert len(metadata) == 5
+    np.testing.assert_array_equal(data_df.drop(columns='Date').to_numpy(), values)
+    assert metadata['Col_3']['region'] == 'R2'
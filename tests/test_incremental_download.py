@@ -0,0 +1,72 @@
+"""Incremental daily append in download_bloomberg_data_safe (user-004)."""
+
+import numpy as np
+import pandas as pd
+
+from create_sample_bloomberg_data import SimulatedBdh
+from gas_market_bloomberg_chunked import BloombergGasMarketProcessor
+from ticker_history_store import TickerHistoryStore
+
+TICKERS = [
+    {'ticker': f'T{i} Index', 'category': 'Demand', 'region_from': 'France',
+     'region_to': 'Industrial', 'start_date': ''}
+    for i in range(3)
+]
+
+
+def write_history_csv(path, days=400):
+    end = pd.Timestamp.now().normalize() - pd.Timedelta(days=3)
+    dates = pd.date_range(end=end, periods=days, freq='D')
+    values = np.random.default_rng(0).normal(100, 10, (days, len(TICKERS)))
+    columns = [f"{info['ticker']}_PX_LAST" for info in TICKERS]
+    pd.DataFrame(values, index=dates, columns=columns).to_csv(path)
+    return dates
+
+
+def make_processor(tmp_path, history_store=None):
+    return BloombergGasMarketProcessor(
+        fallback_csv=str(tmp_path / 'bloomberg_raw_data.csv'),
+        history_store=history_store,
+        incremental=True,
+        bdh=SimulatedBdh(latency=0.0),
+        requests_per_second=1000.0,
+        checkpoint_dir=str(tmp_path / 'checkpoints')
+    )
+
+
+def test_incremental_refresh_keeps_csv_history(tmp_path):
+    dates = write_history_csv(tmp_path / 'bloomberg_raw_data.csv')
+    processor = make_processor(tmp_path)
+
+    merged = processor.download_bloomberg_data_safe(TICKERS)
+
+    assert merged.index.min() == dates[0]
+    assert merged.index.max() > dates[-1]
+    saved = pd.read_csv(tmp_path / 'bloomberg_raw_data.csv', index_col=0, parse_dates=True)
+    assert len(saved) == len(merged) > len(dates)
+
+
+def test_incremental_refresh_seeds_unbuilt_history_store(tmp_path):
+    dates = write_history_csv(tmp_path / 'bloomberg_raw_data.csv')
+    original = pd.read_csv(tmp_path / 'bloomberg_raw_data.csv', index_col=0, parse_dates=True)
+    store_dir = tmp_path / 'history_store'
+    processor = make_processor(tmp_path, history_store=str(store_dir))
+    assert not TickerHistoryStore(str(store_dir)).exists()
+
+    merged = processor.download_bloomberg_data_safe(TICKERS)
+
+    # Only the tail was requested, but the CSV history is kept
+    start_dates = {pd.Timestamp(call['start_date']) for call in processor.bdh.calls}
+    assert min(start_dates) > dates[0]
+    assert merged.index.min() == dates[0]
+    assert len(merged) > len(dates)
+
+    store = TickerHistoryStore(str(store_dir))
+    assert store.exists()
+    assert len(store.dates) == len(merged)
+    saved = pd.read_csv(tmp_path / 'bloomberg_raw_data.csv', index_col=0, parse_dates=True)
+    assert len(saved) == len(merged)
+
+    # Dates before the requested tail come from the CSV unchanged
+    kept = original.index[original.index < min(start_dates)]
+    np.testing.assert_array_equal(merged.loc[kept].to_numpy(), original.loc[kept].to_numpy())
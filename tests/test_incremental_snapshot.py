@@ -0,0 +1,194 @@
+"""Incremental recomputation and compact mode equal a full evaluation (user-017, user-018, user-020)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation_engine import AggregationEngine, SumifsTerm, demand_output_definitions
+from incremental_snapshot import OutputSnapshot, evaluate_incremental, first_changed_row
+from sumifs_index import SumifsCriteriaIndex
+
+N_ROWS = 120
+DEFINITIONS = demand_output_definitions()
+
+
+def demand_metadata():
+    """Two columns per SUMIFS term of the demand outputs."""
+    metadata = {}
+    for terms in DEFINITIONS.values():
+        for term in terms:
+            if not isinstance(term, SumifsTerm):
+                continue
+            subcategory = term.subcategory if term.subcategory is not None else 'Other'
+            for copy in range(2):
+                col = f'{term.category}|{term.region}|{subcategory}|{copy}'
+                metadata[col] = {'category': term.category, 'region': term.region, 'subcategory': subcategory}
+    return metadata
+
+
+METADATA = demand_metadata()
+COLUMNS = list(METADATA)
+GTP_COLUMNS = [position for position, col in enumerate(COLUMNS) if col.startswith('Demand|France|Gas-to-Power')]
+
+
+def make_engine():
+    index, _ = SumifsCriteriaIndex.from_metadata(METADATA, COLUMNS)
+    engine = AggregationEngine(index, use_sparse=False)
+    engine.define_all(DEFINITIONS)
+    return engine
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0.0, 50.0, (N_ROWS, len(COLUMNS)))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    # France Gas-to-Power sums to less than zero: excluded from the total (if_positive)
+    values[:, GTP_COLUMNS] = 0.0
+    values[0, GTP_COLUMNS[0]] = -25.0
+    dates = pd.date_range('2022-01-01', periods=N_ROWS).to_numpy()
+    return values, dates
+
+
+def run(values, dates, snapshot):
+    return evaluate_incremental(make_engine(), values, dates, pd.Index(dates), snapshot, 'demand', COLUMNS)
+
+
+def full(values, dates):
+    return make_engine().evaluate(values, dates=dates)
+
+
+def prime(tmp_path, values, dates):
+    snapshot = OutputSnapshot(str(tmp_path / 'snapshot'))
+    run(values, dates, snapshot)
+    assert snapshot.last_report['first_changed_row'] == 0
+    return snapshot
+
+
+def test_unchanged_input_recomputes_nothing(tmp_path, history):
+    values, dates = history
+    snapshot = prime(tmp_path, values, dates)
+
+    result = run(values, dates, snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(values, dates))
+    assert snapshot.last_report['changed_columns'] == []
+    assert snapshot.last_report['recomputed_outputs'] == []
+
+
+@pytest.mark.parametrize('first_row', [N_ROWS - 3, N_ROWS // 2])
+def test_revision_matches_full_recompute(tmp_path, history, first_row):
+    values, dates = history
+    snapshot = prime(tmp_path, values, dates)
+
+    revised = values.copy()
+    column = COLUMNS.index('Demand|Belgium|Industrial|0')
+    revised[first_row:, column] += 7.5
+
+    result = run(revised, dates, snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(revised, dates))
+    report = snapshot.last_report
+    assert report['first_changed_row'] == first_row
+    assert report['changed_columns'] == ['Demand|Belgium|Industrial|0']
+    assert set(report['recomputed_outputs']) == {'Belgium_Industrial', 'Total_Industrial_Demand',
+                                                'Belgium', 'Total'}
+
+
+def test_appended_rows_match_full_recompute(tmp_path, history):
+    values, dates = history
+    snapshot = prime(tmp_path, values[:-5], dates[:-5])
+
+    result = run(values, dates, snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(values, dates))
+    assert snapshot.last_report['first_changed_row'] == N_ROWS - 5
+    assert snapshot.last_report['changed_columns'] == []
+    assert snapshot.last_report['new_rows'] == 5
+
+
+def test_revision_plus_append_recomputes_only_revised_outputs(tmp_path, history):
+    values, dates = history
+    snapshot = prime(tmp_path, values[:-1], dates[:-1])
+
+    revised = values.copy()
+    column = COLUMNS.index('Demand|Belgium|Industrial|0')
+    revised[-4:-1, column] += 7.5
+
+    result = run(revised, dates, snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(revised, dates))
+    report = snapshot.last_report
+    assert report['changed_columns'] == ['Demand|Belgium|Industrial|0']
+    assert set(report['recomputed_outputs']) == {'Belgium_Industrial', 'Total_Industrial_Demand',
+                                                'Belgium', 'Total'}
+    assert report['first_changed_row'] == N_ROWS - 4
+    assert report['new_rows'] == 1
+
+
+def test_dropped_rows_match_full_recompute(tmp_path, history):
+    values, dates = history
+    snapshot = prime(tmp_path, values, dates)
+
+    result = run(values[:-3], dates[:-3], snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(values[:-3], dates[:-3]))
+    assert snapshot.last_report['changed_columns'] == []
+    assert snapshot.last_report['recomputed_outputs'] == []
+    # The truncated history is the new snapshot
+    run(values[:-3], dates[:-3], snapshot)
+    assert snapshot.last_report['first_changed_row'] == N_ROWS - 3
+
+
+@pytest.mark.parametrize('direction', ['on', 'off'])
+def test_if_positive_flip_matches_full_recompute(tmp_path, history, direction):
+    values, dates = history
+    flipped = values.copy()
+    flipped[-2:, GTP_COLUMNS[0]] = 25.0
+    before, after = (values, flipped) if direction == 'on' else (flipped, values)
+    snapshot = prime(tmp_path, before, dates)
+
+    result = run(after, dates, snapshot)
+
+    expected = full(after, dates)
+    np.testing.assert_array_equal(result.to_numpy(), expected)
+    # The decision covers the whole history, so the first row of the total changes too
+    total = make_engine().output_names.index('Total_Gas_to_Power_Demand')
+    assert not np.array_equal(full(before, dates)[0, total], expected[0, total])
+    assert snapshot.last_report['first_changed_row'] == 0
+
+
+def test_compact_mode_within_rounding_bound(history):
+    values, dates = history
+    values = np.where(np.isnan(values), np.nan, values * 1e3 + 1 / 3)
+    compact = values.astype(np.float32)
+    engine = make_engine()
+
+    exact = engine.evaluate(values, dates=dates)
+    approximate = engine.evaluate(compact, dates=dates)
+    bound = engine.rounding_bound(compact, dates)
+
+    error = np.abs(approximate - exact)
+    assert (error <= bound).all()
+    assert error.max() > 0
+
+
+def test_compact_and_full_precision_snapshots_do_not_mix(tmp_path, history):
+    values, dates = history
+    snapshot = prime(tmp_path, values, dates)
+
+    compact = values.astype(np.float32)
+    result = run(compact, dates, snapshot)
+
+    np.testing.assert_array_equal(result.to_numpy(), full(compact, dates))
+    assert snapshot.last_report['first_changed_row'] == 0
+
+
+def test_first_changed_row_is_nan_safe():
+    dates = pd.date_range('2022-01-01', periods=4).to_numpy()
+    old = np.array([[1.0, np.nan], [2.0, np.nan], [3.0, 4.0], [5.0, 6.0]])
+    new = old.copy()
+    assert first_changed_row(dates, old, dates, new) == 4
+    new[2, 1] = 4.5
+    assert first_changed_row(dates, old, dates, new) == 2
+    assert first_changed_row(dates[:3], old[:3], dates, new) == 2
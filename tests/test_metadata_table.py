@@ -0,0 +1,94 @@
+"""Immutable metadata table and the precompiled SUMIFS index (user-010, user-021)."""
+
+import numpy as np
+import pytest
+
+from metadata_table import MetadataTable
+from sumifs_index import SumifsCriteriaIndex
+
+METADATA = {
+    'Col_3': {'category': 'Demand', 'region': 'France', 'subcategory': 'Industrial'},
+    'Col_4': {'category': 'Demand', 'region': 'Netherlands', 'subcategory': 'Zebra'},
+    'Col_5': {'category': 'Demand', 'region': 'France', 'subcategory': 'Industrial', 'cutoff_dates': ['2022-06-30']},
+    'Col_6': {'category': 'Demand', 'region': 'Germany', 'subcategory': 'zebra',
+              'corrected_category': 'Industrial and Power'},
+    'Col_7': {'category': 'Import', 'region': 'LNG', 'subcategory': 'Belgium'},
+}
+
+
+def test_round_trip_keeps_every_field():
+    table = MetadataTable.from_dict(METADATA)
+    restored = table.to_dict()
+
+    # Lists are interned as tuples
+    assert restored['Col_5'].pop('cutoff_dates') == ('2022-06-30',)
+    expected = {col: {field: value for field, value in info.items() if field != 'cutoff_dates'}
+                for col, info in METADATA.items()}
+    assert restored == expected
+    assert list(table) == list(METADATA)
+
+
+def test_table_is_read_only():
+    table = MetadataTable.from_dict(METADATA)
+    with pytest.raises(TypeError):
+        table['Col_3']['subcategory'] = 'LDZ'
+    with pytest.raises(ValueError):
+        table.codes('subcategory')[0] = 0
+
+
+def test_assign_derives_a_new_table():
+    table = MetadataTable.from_dict(METADATA)
+    zebra = table.match('subcategory', lambda label: str(label).lower() == 'zebra')
+    np.testing.assert_array_equal(zebra, [False, True, False, True, False])
+
+    corrected = table.assign(zebra, subcategory='Industrial', original_subcategory='Zebra')
+
+    assert table['Col_4']['subcategory'] == 'Zebra'
+    assert corrected['Col_4']['subcategory'] == 'Industrial'
+    assert corrected['Col_4']['original_subcategory'] == 'Zebra'
+    assert 'original_subcategory' not in corrected['Col_3']
+    # Unassigned fields are shared, not copied
+    assert corrected.codes('region') is table.codes('region')
+    assert table.assign(np.zeros(len(table), dtype=bool), subcategory='LDZ') is table
+
+
+def test_fingerprint_depends_on_content_only():
+    table = MetadataTable.from_dict(METADATA)
+    reordered = MetadataTable.from_dict({col: dict(reversed(list(info.items()))) for col, info in METADATA.items()})
+    assert table.fingerprint == reordered.fingerprint
+
+    changed = table.assign(table.equals('region', 'LNG'), subcategory='Spain')
+    assert changed.fingerprint != table.fingerprint
+    assert changed.fields_fingerprint(['category']) == table.fields_fingerprint(['category'])
+
+
+def test_positions_use_corrected_category():
+    table = MetadataTable.from_dict(METADATA)
+    np.testing.assert_array_equal(table.positions('Demand', 'France', 'Industrial'), [0, 2])
+    np.testing.assert_array_equal(table.positions('Demand', 'Germany', 'Industrial and Power'), [3])
+    np.testing.assert_array_equal(table.positions('Demand', 'Germany', 'zebra'), [])
+    np.testing.assert_array_equal(table.positions('Demand', 'France'), [0, 2])
+
+
+@pytest.mark.parametrize('criteria', [
+    ('Demand', 'France', 'Industrial'),
+    ('Demand', 'France', None),
+    ('Demand', 'Germany', 'Industrial and Power'),
+    ('Demand', 'Germany', 'zebra'),
+    ('Import', 'LNG', '*'),
+    ('Import', 'LNG', 'Spain'),
+])
+def test_index_from_table_matches_index_from_dict(criteria):
+    columns = list(METADATA)[1:]
+    from_dict, dict_columns = SumifsCriteriaIndex.from_metadata(METADATA, columns)
+    from_table, table_columns = SumifsCriteriaIndex.from_metadata(MetadataTable.from_dict(METADATA), columns)
+
+    assert dict_columns == table_columns == columns
+    np.testing.assert_array_equal(from_dict.positions(*criteria), from_table.positions(*criteria))
+
+
+def test_sumifs_treats_nan_as_zero():
+    index = SumifsCriteriaIndex(['Import', 'Import', 'Export'], ['LNG', 'LNG', 'LNG'], ['A', 'B', 'A'])
+    values = np.array([[1.0, np.nan, 5.0], [np.nan, np.nan, 5.0]])
+    np.testing.assert_array_equal(index.sumifs(values, 'Import', 'LNG', '*'), [1.0, 0.0])
+    np.testing.assert_array_equal(index.sumifs(values, 'Import', 'LNG', 'C'), [0.0, 0.0])
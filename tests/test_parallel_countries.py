@@ -0,0 +1,72 @@
+"""Process-pool country processing (user-025)."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gas_market_bloomberg_chunked import BloombergGasMarketProcessor
+
+CATEGORIES = ['Industrial', 'Industrial and Power', 'Zebra', 'Gas-to-Power', 'LDZ', 'Residential', 'Power']
+REGIONS = ['France', 'Germany', 'Italy', 'Spain', 'Netherlands', 'Belgium', 'UK']
+
+
+@pytest.fixture(scope='module')
+def multiticker_data():
+    rng = np.random.default_rng(0)
+    tickers = [{'ticker': f'T{i} Index', 'category': str(rng.choice(CATEGORIES)),
+                'region_from': str(rng.choice(REGIONS)), 'region_to': ''} for i in range(60)]
+    dates = pd.date_range('2016-10-01', periods=90)
+    data = pd.DataFrame(rng.normal(50, 20, (len(dates), len(tickers))), index=dates,
+                        columns=[t['ticker'] for t in tickers])
+    data[data < 5] = np.nan
+    return BloombergGasMarketProcessor().create_multiticker_format(data, tickers)
+
+
+class ScaledProcessor(BloombergGasMarketProcessor):
+    """Subclass whose override needs an attribute set in __init__."""
+
+    def __init__(self, scale, **kwargs):
+        super().__init__(**kwargs)
+        self.scale = scale
+
+    def process_country_demand(self, multiticker_data, country):
+        return super().process_country_demand(multiticker_data, country) * self.scale
+
+
+class WorkerFailingProcessor(BloombergGasMarketProcessor):
+    """Fails in worker processes only."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.parent_pid = os.getpid()
+
+    def process_country_demand(self, multiticker_data, country):
+        if os.getpid() != self.parent_pid:
+            raise RuntimeError("worker failure")
+        return super().process_country_demand(multiticker_data, country)
+
+
+def serial_result(processor, multiticker_data):
+    return processor.process_countries_step_by_step(multiticker_data, max_workers=1)
+
+
+def test_parallel_matches_serial(multiticker_data):
+    serial = serial_result(BloombergGasMarketProcessor(), multiticker_data)
+    parallel = BloombergGasMarketProcessor(country_workers=3).process_countries_step_by_step(multiticker_data)
+    pd.testing.assert_frame_equal(serial, parallel, check_exact=True)
+    assert serial.abs().to_numpy().sum() > 0
+
+
+def test_workers_see_subclass_attributes(multiticker_data):
+    expected = serial_result(ScaledProcessor(2.0), multiticker_data)
+    parallel = ScaledProcessor(2.0, country_workers=3).process_countries_step_by_step(multiticker_data)
+    pd.testing.assert_frame_equal(expected, parallel, check_exact=True)
+    pd.testing.assert_frame_equal(expected, serial_result(BloombergGasMarketProcessor(), multiticker_data) * 2.0)
+
+
+def test_task_failure_falls_back_to_serial(multiticker_data):
+    expected = serial_result(BloombergGasMarketProcessor(), multiticker_data)
+    result = WorkerFailingProcessor(country_workers=3).process_countries_step_by_step(multiticker_data)
+    pd.testing.assert_frame_equal(expected, result, check_exact=True)
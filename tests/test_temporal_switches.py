@@ -0,0 +1,79 @@
+"""Temporal "calculated then actual" switches (user-019)."""
+
+import numpy as np
+import pandas as pd
+
+from aggregation_engine import AggregationEngine, SumifsTerm, temporal_switches
+from incremental_snapshot import OutputSnapshot, evaluate_incremental
+from sumifs_index import SumifsCriteriaIndex
+
+COLUMNS = ['SWITCHED', 'PART1', 'PART2', 'OTHER']
+METADATA = {
+    'SWITCHED': {'category': 'Demand', 'region': 'France', 'subcategory': 'Industrial (calculated to 30/6/22 then actual)',
+                 'temporal_logic': True, 'cutoff_date': '2022-06-30',
+                 'pre_cutoff_method': 'calculated', 'post_cutoff_method': 'actual',
+                 'calculated_terms': [('Demand', 'France', 'Component', 1.0)]},
+    'PART1': {'category': 'Demand', 'region': 'France', 'subcategory': 'Component'},
+    'PART2': {'category': 'Demand', 'region': 'France', 'subcategory': 'Component'},
+    'OTHER': {'category': 'Demand', 'region': 'Germany', 'subcategory': 'LDZ'},
+}
+DEFINITIONS = {
+    'France_Industrial': [SumifsTerm('Demand', 'France', 'Industrial (calculated to 30/6/22 then actual)')],
+    'Germany_LDZ': [SumifsTerm('Demand', 'Germany', 'LDZ')],
+}
+
+
+def make_engine(switched=True):
+    index, columns = SumifsCriteriaIndex.from_metadata(METADATA, COLUMNS)
+    engine = AggregationEngine(index, use_sparse=False)
+    engine.define_all(DEFINITIONS)
+    if switched:
+        engine.set_temporal_switches(temporal_switches(METADATA, columns))
+    return engine
+
+
+def make_values(n_rows):
+    rng = np.random.default_rng(0)
+    return rng.uniform(1.0, 100.0, (n_rows, len(COLUMNS)))
+
+
+def test_declared_switch_uses_calculation_before_cutoff():
+    dates = pd.date_range('2022-06-26', '2022-07-05').to_numpy()
+    values = make_values(len(dates))
+    engine = make_engine()
+
+    outputs = engine.evaluate(values, dates=dates)
+    france = outputs[:, engine.output_names.index('France_Industrial')]
+
+    before = dates <= np.datetime64('2022-06-30')
+    np.testing.assert_allclose(france[before], values[before, 1] + values[before, 2])
+    np.testing.assert_array_equal(france[~before], values[~before, 0])
+
+    # Without the switch the column's own values are used throughout
+    plain = make_engine(switched=False).evaluate(values, dates=dates)
+    assert not np.allclose(plain[before, 0], france[before])
+    np.testing.assert_array_equal(plain[:, 1], outputs[:, 1])
+
+
+def test_switch_dependencies_include_calculation_sources():
+    engine = make_engine()
+    assert engine.switched_outputs() == ['France_Industrial']
+    assert engine.affected_outputs([1]) == ['France_Industrial']
+    assert engine.affected_outputs([3]) == ['Germany_LDZ']
+
+
+def test_date_only_change_recomputes_switched_outputs(tmp_path):
+    values = make_values(10)
+    old_dates = pd.date_range('2022-06-21', '2022-06-30').to_numpy()
+    # Same values, last five rows moved past the cutoff
+    new_dates = np.concatenate([old_dates[:5], pd.date_range('2022-07-01', '2022-07-05').to_numpy()])
+
+    snapshot = OutputSnapshot(str(tmp_path / 'snapshot'))
+    engine = make_engine()
+    evaluate_incremental(engine, values, old_dates, pd.Index(old_dates), snapshot, 'key')
+    result = evaluate_incremental(engine, values, new_dates, pd.Index(new_dates), snapshot, 'key')
+
+    expected = make_engine().evaluate(values, dates=new_dates)
+    np.testing.assert_array_equal(result.to_numpy(), expected)
+    assert snapshot.last_report['first_changed_row'] == 5
+    assert snapshot.last_report['recomputed_outputs'] == ['France_Industrial']
@@ -0,0 +1,40 @@
+"""Shared TickerList registry (user-009)."""
+
+import pandas as pd
+import pytest
+
+from gas_market_bloomberg_chunked import BloombergGasMarketProcessor
+from ticker_registry import TICKERLIST_SKIPROWS, load_ticker_registry
+
+
+@pytest.fixture
+def use4_file(tmp_path):
+    table = pd.DataFrame({
+        'Ticker': ['AAA Index', 'BBB Comdty', 'not a ticker'],
+        'Description': ['France industrial', 'Germany LDZ', ''],
+        'Category': ['Demand', 'Demand', 'Demand'],
+        'Region from': ['France', 'Germany', 'Italy'],
+        'Region to': ['Industrial', 'LDZ', 'LDZ'],
+    })
+    path = tmp_path / 'use4.xlsx'
+    table.to_excel(path, sheet_name='TickerList', startrow=TICKERLIST_SKIPROWS, index=False)
+    return str(path)
+
+
+def test_registry_is_shared_between_loads(use4_file):
+    assert load_ticker_registry(use4_file) is load_ticker_registry(use4_file)
+
+
+def test_processor_config_does_not_alias_the_shared_table(use4_file):
+    processor = BloombergGasMarketProcessor(use4_file=use4_file)
+    tickers = processor.load_ticker_configuration()
+    assert [info['ticker'] for info in tickers] == ['AAA Index', 'BBB Comdty']
+
+    processor.ticker_config.loc[0, 'Ticker'] = 'CHANGED Index'
+    processor.ticker_config.drop(columns=['Description'], inplace=True)
+
+    table = load_ticker_registry(use4_file).table
+    assert table.loc[0, 'Ticker'] == 'AAA Index'
+    assert 'Description' in table.columns
+    reloaded = BloombergGasMarketProcessor(use4_file=use4_file).load_ticker_configuration()
+    assert [info['ticker'] for info in reloaded] == ['AAA Index', 'BBB Comdty']
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Ticker History Store
+====================
+
+Persistent on-disk store for the daily ticker history (dates × tickers).
+
+Layout of a store directory:
+- values.npy   : contiguous float64 matrix, one row per date, one column per ticker
+- dates.npy    : datetime64[ns] date vector
+- tickers.json : sidecar with ticker, category, region, subcategory, units and
+                 normalization for every column
+
+values.npy is opened memory-mapped (read-only), so RestoredDemandPipeline,
+LiveSheetSupplyReplicator and BloombergGasMarketProcessor read the history
+zero-copy instead of parsing Excel into object-dtype DataFrames.
+
+Build a store from a workbook:
+    python ticker_history_store.py use4.xlsx ticker_history
+"""
+
+import os
+import sys
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from multiticker_cache import MultiTickerSheet, load_multiticker_sheet, DATA_START_ROW
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+DEFAULT_STORE_DIR = 'ticker_history'
+
+TICKER_FIELDS = ['ticker', 'category', 'region', 'subcategory', 'units', 'normalization']
+
+
+def ticker_column_name(column) -> str:
+    """Bloomberg column label → ticker ('X Index', ('X Index', 'PX_LAST'), 'X Index_PX_LAST')."""
+    if isinstance(column, tuple):
+        column = column[0]
+    column = str(column)
+    if column.endswith('_PX_LAST'):
+        column = column[:-len('_PX_LAST')]
+    return column
+
+
+class TickerHistoryStore:
+    """
+    Memory-mapped dates × tickers history with a ticker metadata sidecar.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self._values = None
+        self._dates = None
+        self._tickers = None
+
+    def exists(self) -> bool:
+        """True if the store directory holds a complete store."""
+        return (self.store_dir / 'tickers.json').exists()
+
+    @property
+    def values(self) -> np.ndarray:
+        """Read-only memory-mapped float64 matrix (dates × tickers)."""
+        if self._values is None:
+            self._open()
+        return self._values
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Date vector of the store."""
+        if self._dates is None:
+            self._open()
+        return self._dates
+
+    @property
+    def tickers(self) -> List[Dict]:
+        """Per-column ticker metadata (ticker, category, region, subcategory, units, normalization)."""
+        if self._tickers is None:
+            self._open()
+        return self._tickers
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def _open(self):
+        if not self.exists():
+            raise FileNotFoundError(f"No ticker history store in {self.store_dir}")
+
+        with open(self.store_dir / 'tickers.json') as handle:
+            sidecar = json.load(handle)
+        if sidecar.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported ticker history store version: {sidecar.get('version')}")
+
+        values = np.load(self.store_dir / 'values.npy', mmap_mode='r')
+        dates = np.load(self.store_dir / 'dates.npy')
+
+        if values.shape != (len(dates), len(sidecar['tickers'])):
+            raise ValueError(f"Store {self.store_dir} is inconsistent: {values.shape} vs "
+                             f"{len(dates)} dates × {len(sidecar['tickers'])} tickers")
+
+        self._values = values
+        self._dates = pd.DatetimeIndex(dates)
+        self._tickers = sidecar['tickers']
+
+    def close(self):
+        """Drop the memory map so the files can be replaced."""
+        self._values = None
+        self._dates = None
+        self._tickers = None
+
+    def write(self, dates, values: np.ndarray, tickers: List[Dict]):
+        """
+        Replace the store contents.
+
+        Args:
+            dates: Date vector (one per row of values)
+            values: 2D array dates × tickers (converted to contiguous float64)
+            tickers: One metadata dict per column
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        dates = pd.DatetimeIndex(dates).values.astype('datetime64[ns]')
+
+        if values.shape != (len(dates), len(tickers)):
+            raise ValueError(f"Shape mismatch: values {values.shape}, "
+                             f"{len(dates)} dates, {len(tickers)} tickers")
+
+        self.close()
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        # Sidecar goes last: a store without tickers.json is treated as missing
+        sidecar_file = self.store_dir / 'tickers.json'
+        if sidecar_file.exists():
+            sidecar_file.unlink()
+
+        self._write_array('values.npy', values)
+        self._write_array('dates.npy', dates)
+
+        sidecar = {
+            'version': STORE_VERSION,
+            'dtype': 'float64',
+            'shape': list(values.shape),
+            'tickers': [self._normalize_ticker_info(info, i) for i, info in enumerate(tickers)]
+        }
+        tmp_file = self.store_dir / 'tickers.json.tmp'
+        with open(tmp_file, 'w') as handle:
+            json.dump(sidecar, handle, indent=1)
+        os.replace(tmp_file, sidecar_file)
+
+        logger.info(f"💾 Ticker history store written: {values.shape[0]} dates × {values.shape[1]} tickers → {self.store_dir}")
+
+    def _write_array(self, name: str, array: np.ndarray):
+        tmp_file = self.store_dir / f'{name}.tmp.npy'
+        np.save(tmp_file, array)
+        os.replace(tmp_file, self.store_dir / name)
+
+    @staticmethod
+    def _normalize_ticker_info(info: Dict, position: int) -> Dict:
+        normalization = info.get('normalization', 1.0)
+        try:
+            normalization = float(normalization)
+        except (TypeError, ValueError):
+            normalization = 1.0
+        if np.isnan(normalization):
+            normalization = 1.0
+
+        def text(field):
+            value = info.get(field)
+            return '' if value is None or pd.isna(value) else str(value)
+
+        return {
+            'ticker': text('ticker') or f'Col_{position + 1}',
+            'category': text('category'),
+            'region': text('region'),
+            'subcategory': text('subcategory'),
+            'units': text('units'),
+            'normalization': normalization
+        }
+
+    def to_frame(self, labels: str = 'ticker', date_index: bool = True) -> pd.DataFrame:
+        """
+        DataFrame view over the memory-mapped matrix (no copy).
+
+        Args:
+            labels: 'ticker' for ticker names, 'position' for Col_1..Col_n
+            date_index: Index by date (True) or by row position (False)
+        """
+        if labels == 'position':
+            columns = [f'Col_{i}' for i in range(1, len(self.tickers) + 1)]
+        else:
+            columns = [info['ticker'] for info in self.tickers]
+        index = self.dates if date_index else None
+        return pd.DataFrame(self.values, index=index, columns=columns, copy=False)
+
+    def column_metadata(self) -> Dict[str, Dict[str, str]]:
+        """Metadata keyed by Col_n, in the format used by the demand pipeline."""
+        return {
+            f'Col_{i}': {
+                'category': info['category'],
+                'region': info['region'],
+                'subcategory': info['subcategory']
+            }
+            for i, info in enumerate(self.tickers, start=1)
+        }
+
+    def header_rows(self) -> Dict[int, List[str]]:
+        """Criteria rows 13-15 (category, region from, region to) as in the MultiTicker sheet."""
+        return {
+            13: [info['category'] for info in self.tickers],
+            14: [info['region'] for info in self.tickers],
+            15: [info['subcategory'] for info in self.tickers]
+        }
+
+    @classmethod
+    def from_multiticker_sheet(cls, sheet: MultiTickerSheet, store_dir: str = DEFAULT_STORE_DIR,
+                               first_row: int = DATA_START_ROW,
+                               extra_header_rows: Optional[Dict[str, int]] = None) -> 'TickerHistoryStore':
+        """
+        Build a store from a parsed MultiTicker sheet.
+
+        Args:
+            sheet: Parsed sheet (see multiticker_cache)
+            store_dir: Target directory
+            first_row: First data row (20 for use4.xlsx, 25 for the LiveSheet)
+            extra_header_rows: Optional {'ticker'|'units'|'normalization': row} for
+                header rows 16-19, whose layout differs between workbooks
+        """
+        dates = sheet.date_series(first_row)
+        valid = dates.notna().values
+        values = sheet.data_block(first_row)[valid]
+
+        header_map = {'category': 13, 'region': 14, 'subcategory': 15}
+        header_map.update(extra_header_rows or {})
+
+        tickers = []
+        for col in range(values.shape[1]):
+            info = {field: sheet.header_row(row)[col] for field, row in header_map.items()}
+            tickers.append(info)
+
+        store = cls(store_dir)
+        store.write(dates[valid].values, values, tickers)
+        return store
+
+    @classmethod
+    def from_workbook(cls, file_path: str, store_dir: str = DEFAULT_STORE_DIR,
+                      sheet_name: str = 'MultiTicker', first_row: int = DATA_START_ROW) -> 'TickerHistoryStore':
+        """Build a store from a workbook's MultiTicker sheet (via the binary cache)."""
+        logger.info(f"🏗️ Building ticker history store from {file_path}")
+        sheet = load_multiticker_sheet(file_path, sheet_name)
+        return cls.from_multiticker_sheet(sheet, store_dir, first_row)
+
+    @classmethod
+    def from_bloomberg_frame(cls, bloomberg_data: pd.DataFrame, tickers: List[Dict],
+                             store_dir: str = DEFAULT_STORE_DIR) -> 'TickerHistoryStore':
+        """
+        Build a store from Bloomberg history (xbbg.bdh output or bloomberg_raw_data.csv).
+
+        Column order follows the ticker configuration; tickers without data are skipped.
+        """
+        frame = ticker_frame(bloomberg_data)
+
+        columns = []
+        ticker_infos = []
+        for info in tickers:
+            if info['ticker'] in frame.columns:
+                columns.append(info['ticker'])
+                ticker_infos.append(bloomberg_ticker_info(info))
+
+        store = cls(store_dir)
+        store.write(frame.index, frame[columns].to_numpy(dtype=np.float64), ticker_infos)
+        return store
+
+    def last_date(self) -> Optional[pd.Timestamp]:
+        """Last date held in the store (None for an empty or missing store)."""
+        if not self.exists() or len(self.dates) == 0:
+            return None
+        return self.dates.max()
+
+    def merge_frame(self, bloomberg_data: pd.DataFrame, tickers: List[Dict]) -> pd.DataFrame:
+        """
+        Overlay freshly downloaded history onto the store.
+
+        Fresh values win on overlapping dates (revisions), dates after the stored
+        history are appended and unknown tickers are added as new columns. Fresh
+        NaNs never erase stored values.
+
+        Returns:
+            The merged dates × tickers frame (memory-mapped view of the new store)
+        """
+        fresh = ticker_frame(bloomberg_data)
+
+        if self.exists():
+            existing = self.to_frame(labels='ticker')
+            known = list(self.tickers)
+        else:
+            existing = pd.DataFrame(dtype=np.float64)
+            known = []
+
+        known_names = [info['ticker'] for info in known]
+        known_set = set(known_names)
+        config = {info['ticker']: info for info in tickers}
+
+        # New tickers follow the ticker configuration order
+        new_names = [info['ticker'] for info in tickers
+                     if info['ticker'] in fresh.columns and info['ticker'] not in known_set]
+        new_names += [name for name in fresh.columns
+                      if name not in known_set and name not in config]
+
+        merged = fresh.combine_first(existing)
+        merged = merged.reindex(columns=known_names + new_names).sort_index()
+        values = merged.to_numpy(dtype=np.float64)
+        dates = merged.index
+
+        ticker_infos = known + [bloomberg_ticker_info(config.get(name, {'ticker': name})) for name in new_names]
+
+        # Release the memory map before the files are replaced
+        del existing, merged
+        self.close()
+
+        self.write(dates, values, ticker_infos)
+        logger.info(f"🔗 Merged {len(fresh)} fresh dates × {fresh.shape[1]} tickers "
+                    f"({len(new_names)} new tickers) into {self.store_dir}")
+
+        return self.to_frame(labels='ticker')
+
+
+def ticker_frame(bloomberg_data: pd.DataFrame) -> pd.DataFrame:
+    """Bloomberg history with ticker column names, numeric values and a DatetimeIndex."""
+    frame = bloomberg_data.copy()
+    frame.columns = [ticker_column_name(col) for col in frame.columns]
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    frame.index = pd.to_datetime(frame.index)
+    return frame.apply(pd.to_numeric, errors='coerce').astype(np.float64)
+
+
+def bloomberg_ticker_info(info: Dict) -> Dict:
+    """Map a ticker configuration entry (load_ticker_configuration) onto store metadata."""
+    return {
+        'ticker': info['ticker'],
+        'category': info.get('category', ''),
+        'region': info.get('region_from', ''),
+        'subcategory': info.get('region_to', ''),
+        'units': info.get('units', ''),
+        'normalization': info.get('normalization', 1.0)
+    }
+
+
+def main():
+    """Build a ticker history store from a workbook's MultiTicker sheet."""
+    file_path = sys.argv[1] if len(sys.argv) > 1 else 'use4.xlsx'
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE_DIR
+    first_row = int(sys.argv[3]) if len(sys.argv) > 3 else DATA_START_ROW
+
+    store = TickerHistoryStore.from_workbook(file_path, store_dir, first_row=first_row)
+    logger.info(f"✅ Store ready: {store.shape[0]} dates × {store.shape[1]} tickers")
+    logger.info(f"📅 {store.dates.min().date()} to {store.dates.max().date()}")
+    return store
+
+
+if __name__ == "__main__":
+    main()
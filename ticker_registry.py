@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Ticker Registry
+===============
+
+Indexed view of the use4.xlsx TickerList sheet, built once and shared by every
+module that needs ticker metadata.
+
+- Hashed lookup by ticker (first occurrence wins, as the old row scans did)
+- Position indexes by category, region from and region to
+- Cached Bloomberg-ticker selections per suffix list
+- Persisted to .ticker_registry/ next to the workbook and rebuilt only when
+  the workbook changes (same fingerprint rules as the MultiTicker cache)
+
+Usage:
+    registry = load_ticker_registry('use4.xlsx')
+    info = registry.get('SGIE7FIN Index')
+    france_demand = registry.lookup(category='Demand', region='France')
+"""
+
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from multiticker_cache import content_hash, file_fingerprint
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REGISTRY_VERSION = 1
+REGISTRY_DIR_NAME = '.ticker_registry'
+
+# TickerList header sits below 8 rows of notes
+TICKERLIST_SKIPROWS = 8
+
+# Suffix filter used by the download pipelines
+PIPELINE_SUFFIXES = ('Index', 'Comdty', 'BGN', 'Equity')
+# Broader filter used for MultiTicker extraction
+BLOOMBERG_SUFFIXES = ('Index', 'Comdty', 'BGN', 'Curncy', 'Govt', 'Corp', 'Equity')
+
+
+def _key(value) -> Optional[str]:
+    """Index key for a metadata cell (None for blanks)."""
+    if pd.isna(value):
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _text(row: Dict, column: str, default: str = '') -> str:
+    value = row.get(column, default)
+    return str(value).strip() if pd.notna(value) else default
+
+
+def ticker_metadata(row: Dict) -> Dict:
+    """Normalized MultiTicker metadata for a TickerList row (blanks become defaults)."""
+    normalization = row.get('Normalization factor', 1.0)
+    return {
+        'ticker': str(row['Ticker']).strip(),
+        'description': _text(row, 'Description'),
+        'category': _text(row, 'Category'),
+        'region_from': _text(row, 'Region from'),
+        'region_to': _text(row, 'Region to'),
+        'units': _text(row, 'Units', 'GWh'),
+        'normalization_factor': normalization if pd.notna(normalization) else 1.0,
+        'positive_negative': _text(row, 'Positive/Negative'),
+        'start_date': _text(row, 'Start date'),
+        'other_notes': _text(row, 'Other notes or comments')
+    }
+
+
+class TickerRegistry:
+    """
+    TickerList rows with O(1) ticker lookup and category/region indexes.
+
+    `table` is the sheet as read by pd.read_excel(skiprows=8); rows are
+    addressed by position (0..n-1).
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table.reset_index(drop=True)
+        self._records = self.table.to_dict('records')
+
+        if 'Ticker' in self.table.columns:
+            self.tickers = [str(ticker).strip() for ticker in self.table['Ticker']]
+        else:
+            self.tickers = [''] * len(self.table)
+
+        self.positions: Dict[str, int] = {}
+        for position, ticker in enumerate(self.tickers):
+            self.positions.setdefault(ticker, position)
+
+        self.by_category = self._build_index('Category')
+        self.by_region_from = self._build_index('Region from')
+        self.by_region_to = self._build_index('Region to')
+        self._selections: Dict[tuple, np.ndarray] = {}
+
+    def _build_index(self, column: str) -> Dict[str, np.ndarray]:
+        """{value: row positions} for a metadata column."""
+        if column not in self.table.columns:
+            return {}
+        keys = pd.Series([_key(value) for value in self.table[column]], dtype=object).dropna()
+        rows = keys.index.to_numpy(dtype=np.int64)
+        return {key: rows[offsets] for key, offsets in keys.groupby(keys).indices.items()}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.positions
+
+    def position(self, ticker) -> Optional[int]:
+        """Row position of a ticker (None if unknown)."""
+        return self.positions.get(ticker)
+
+    def get(self, ticker) -> Optional[Dict]:
+        """Raw TickerList row for a ticker as a dict (None if unknown)."""
+        position = self.positions.get(ticker)
+        return None if position is None else self._records[position]
+
+    def records(self, positions: Optional[Sequence[int]] = None) -> List[Dict]:
+        """Raw rows as dicts, for all rows or the given positions."""
+        if positions is None:
+            return list(self._records)
+        return [self._records[position] for position in positions]
+
+    def bloomberg_positions(self, suffixes: Sequence[str] = BLOOMBERG_SUFFIXES) -> np.ndarray:
+        """Positions of rows whose ticker contains one of the suffixes (cached per suffix list)."""
+        key = tuple(suffixes)
+        if key not in self._selections:
+            pattern = '|'.join(re.escape(suffix) for suffix in key)
+            mask = pd.Series(self.tickers, dtype=object).str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            self._selections[key] = np.flatnonzero(mask)
+        return self._selections[key]
+
+    def bloomberg_tickers(self, suffixes: Sequence[str] = BLOOMBERG_SUFFIXES) -> List[str]:
+        """Bloomberg ticker symbols in sheet order."""
+        return [self.tickers[position] for position in self.bloomberg_positions(suffixes)]
+
+    def lookup(self, category: Optional[str] = None, region: Optional[str] = None,
+               region_to: Optional[str] = None) -> np.ndarray:
+        """
+        Row positions matching every given field (region = 'Region from').
+
+        Returns positions in sheet order.
+        """
+        result = None
+        for index, value in ((self.by_category, category), (self.by_region_from, region),
+                             (self.by_region_to, region_to)):
+            if value is None:
+                continue
+            positions = index.get(value, np.empty(0, dtype=np.int64))
+            result = positions if result is None else np.intersect1d(result, positions)
+
+        if result is None:
+            return np.arange(len(self.table))
+        return np.sort(result)
+
+
+class TickerRegistryCache:
+    """
+    Persists TickerRegistry tables next to the workbook and keeps built
+    registries in memory for the lifetime of the process.
+    """
+
+    _loaded: Dict[tuple, tuple] = {}
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Override cache root (default: <workbook dir>/.ticker_registry)
+        """
+        self.cache_dir = cache_dir
+
+    def entry_dir(self, file_path: str, sheet_name: str) -> Path:
+        """Cache directory for a workbook/sheet pair."""
+        workbook = Path(file_path).resolve()
+        root = Path(self.cache_dir) if self.cache_dir else workbook.parent / REGISTRY_DIR_NAME
+        return root / f"{workbook.stem}__{sheet_name}".replace(' ', '_')
+
+    def is_fresh(self, file_path: str, sheet_name: str) -> bool:
+        """True when the persisted table matches the workbook (size/mtime, then content hash)."""
+        meta_file = self.entry_dir(file_path, sheet_name) / 'meta.json'
+        try:
+            with open(meta_file) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return False
+
+        if meta.get('version') != REGISTRY_VERSION or meta.get('sheet_name') != sheet_name:
+            return False
+
+        fingerprint = file_fingerprint(file_path)
+        if meta['source']['path'] != fingerprint['path'] or meta['source']['size'] != fingerprint['size']:
+            return False
+        if meta['source']['mtime_ns'] == fingerprint['mtime_ns']:
+            return True
+        return content_hash(file_path) == meta['source']['sha256']
+
+    def load(self, file_path: str, sheet_name: str = 'TickerList') -> TickerRegistry:
+        """Return the registry for a workbook, reading the sheet only when it changed."""
+        fingerprint = file_fingerprint(file_path)
+        memory_key = (fingerprint['path'], sheet_name, str(self.entry_dir(file_path, sheet_name)))
+
+        cached = self._loaded.get(memory_key)
+        if cached is not None and cached[0] == (fingerprint['size'], fingerprint['mtime_ns']):
+            return cached[1]
+
+        table = None
+        if self.is_fresh(file_path, sheet_name):
+            try:
+                table = pd.read_pickle(self.entry_dir(file_path, sheet_name) / 'table.pkl')
+                logger.info(f"⚡ Loaded {sheet_name} registry from cache: {len(table)} rows")
+            except Exception as e:
+                logger.warning(f"⚠️ Registry cache read failed ({str(e)}), rebuilding...")
+
+        if table is None:
+            table = self.build(file_path, sheet_name)
+
+        registry = TickerRegistry(table)
+        self._loaded[memory_key] = ((fingerprint['size'], fingerprint['mtime_ns']), registry)
+        return registry
+
+    def build(self, file_path: str, sheet_name: str = 'TickerList') -> pd.DataFrame:
+        """Read the TickerList sheet and persist it."""
+        fingerprint = file_fingerprint(file_path)
+        fingerprint['sha256'] = content_hash(file_path)
+
+        table = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=TICKERLIST_SKIPROWS)
+
+        entry = self.entry_dir(file_path, sheet_name)
+        entry.mkdir(parents=True, exist_ok=True)
+
+        # Sidecar is removed first and written last
+        meta_file = entry / 'meta.json'
+        if meta_file.exists():
+            meta_file.unlink()
+
+        tmp_table = entry / 'table.tmp.pkl'
+        table.to_pickle(tmp_table)
+        os.replace(tmp_table, entry / 'table.pkl')
+
+        tmp_meta = entry / 'meta.tmp'
+        with open(tmp_meta, 'w') as handle:
+            json.dump({'version': REGISTRY_VERSION, 'sheet_name': sheet_name, 'source': fingerprint}, handle)
+        os.replace(tmp_meta, meta_file)
+
+        logger.info(f"💾 Cached {sheet_name} registry to {entry}: {len(table)} rows")
+        return table
+
+
+def load_ticker_registry(file_path: str = 'use4.xlsx', sheet_name: str = 'TickerList') -> TickerRegistry:
+    """Load the shared ticker registry for a workbook."""
+    return TickerRegistryCache().load(file_path, sheet_name)